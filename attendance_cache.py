@@ -0,0 +1,180 @@
+import pandas as pd
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from config import Config
+from data_processor import compact_attendance_frame
+import logging
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = ['userId', 'name', 'email', 'role', 'workerId']
+
+def _require_pyarrow():
+    """Import pyarrow lazily; it is only needed when the cache is used"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The attendance cache requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+class AttendanceCache:
+    """Columnar on-disk snapshot of the users and attendance frames
+    
+    Snapshots are keyed by date range and stored as Parquet, with
+    attendance partitioned by month:
+        
+        <CACHE_DIR>/<start>_<end>/manifest.json
+        <CACHE_DIR>/<start>_<end>/users.parquet
+        <CACHE_DIR>/<start>_<end>/attendance/month=YYYY-MM.parquet
+    
+    A snapshot is invalid when its schema version or attendance fields differ
+    from the current Config, or when shift cutoffs are configured but it was
+    written without the shift column. Ranges that end before
+    Config.CACHE_CLOSED_AFTER_DAYS ago are immutable; other ranges expire
+    after Config.CACHE_MAX_AGE_HOURS.
+    """
+    
+    VERSION = 2
+    
+    def __init__(self, start_date=None, end_date=None, cache_dir=None):
+        self.start_date = start_date or Config.START_DATE
+        self.end_date = end_date or Config.END_DATE
+        self.path = os.path.join(cache_dir or Config.CACHE_DIR, f'{self.start_date}_{self.end_date}')
+        self.manifest_path = os.path.join(self.path, 'manifest.json')
+    
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+    
+    def is_valid(self, ignore_age=False):
+        """Check whether a usable snapshot exists for this date range"""
+        manifest = self._read_manifest()
+        if manifest is None:
+            logger.info(f"No attendance cache at {self.path}")
+            return False
+        
+        if manifest.get('version') != self.VERSION or manifest.get('fields') != Config.ATTENDANCE_FIELDS:
+            logger.info("Attendance cache schema is out of date")
+            return False
+        
+        if Config.SHIFT_PUNCTUALITY_CUTOFFS and Config.SHIFT_COLUMN not in manifest.get('columns', []):
+            logger.info("Attendance cache has no shift column, which Config.SHIFT_PUNCTUALITY_CUTOFFS needs")
+            return False
+        
+        if ignore_age or self._is_closed_range():
+            return True
+        
+        age = datetime.now() - datetime.fromisoformat(manifest['created_at'])
+        if age > timedelta(hours=Config.CACHE_MAX_AGE_HOURS):
+            logger.info(f"Attendance cache expired ({age} old)")
+            return False
+        
+        return True
+    
+    def _is_closed_range(self):
+        """Ranges far enough in the past no longer change in Firestore"""
+        closed_before = datetime.now() - timedelta(days=Config.CACHE_CLOSED_AFTER_DAYS)
+        return datetime.strptime(self.end_date, '%Y-%m-%d') < closed_before
+    
+    def write(self, workers_df, attendance_df):
+        """Write a snapshot, replacing any existing one for this range"""
+        _require_pyarrow()
+        
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(os.path.join(self.path, 'attendance'))
+        
+        user_columns = [
+            column for column in dict.fromkeys(USER_COLUMNS + [Config.SITE_COLUMN] + Config.PARTITION_COLUMNS)
+            if column in workers_df
+        ]
+        workers_df[user_columns].astype({'userId': 'string'}).to_parquet(
+            os.path.join(self.path, 'users.parquet'), index=False
+        )
+        
+        columns = ['attendanceId'] + [field for field in Config.ATTENDANCE_FIELDS if field != 'attendanceId']
+        # Shift-specific punctuality cutoffs need the shift column offline too
+        columns.append(Config.SHIFT_COLUMN)
+        attendance_df = attendance_df[[column for column in columns if column in attendance_df]]
+        # Fixed column types keep every monthly partition on the same schema
+        column_types = {
+            'attendanceId': 'string',
+            'userId': 'category',
+            'status': 'category',
+            'workMinutes': 'float64',
+            Config.SHIFT_COLUMN: 'string'
+        }
+        attendance_df = attendance_df.astype({
+            column: dtype for column, dtype in column_types.items() if column in attendance_df
+        })
+        
+        months = attendance_df['date'].dt.strftime('%Y-%m')
+        if months.isna().any():
+            logger.warning(f"Not caching {int(months.isna().sum())} attendance records without a date")
+        for month, month_df in attendance_df.groupby(months, sort=True):
+            month_df.to_parquet(
+                os.path.join(self.path, 'attendance', f'month={month}.parquet'),
+                index=False
+            )
+        
+        manifest = {
+            'version': self.VERSION,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'fields': Config.ATTENDANCE_FIELDS,
+            'columns': list(attendance_df.columns),
+            'months': sorted(months.dropna().unique().tolist()),
+            'records': int(months.notna().sum()),
+            'workers': len(workers_df),
+            'created_at': datetime.now().isoformat()
+        }
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        logger.info(f"Cached {manifest['records']} attendance records in {len(manifest['months'])} monthly partitions at {self.path}")
+    
+    def _month_paths(self):
+        manifest = self._read_manifest()
+        return [
+            os.path.join(self.path, 'attendance', f'month={month}.parquet')
+            for month in manifest['months']
+        ]
+    
+    def iter_attendance(self, batch_size=None, columns=None):
+        """Yield the cached attendance in record batches, partition by partition"""
+        pa = _require_pyarrow()
+        batch_size = batch_size or Config.STREAMING_CHUNK_SIZE
+        for path in self._month_paths():
+            parquet_file = pa.parquet.ParquetFile(path, memory_map=True)
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                yield compact_attendance_frame(batch.to_pandas(), log_memory=False)
+    
+    def read_workers(self):
+        """Load only the cached users frame"""
+        pa = _require_pyarrow()
+        return pa.parquet.read_table(
+            os.path.join(self.path, 'users.parquet'), memory_map=True
+        ).to_pandas()
+    
+    def read(self, columns=None):
+        """Load the snapshot memory-mapped; returns (workers_df, attendance_df)"""
+        pa = _require_pyarrow()
+        
+        workers_df = self.read_workers()
+        
+        tables = [
+            pa.parquet.read_table(path, columns=columns, memory_map=True)
+            for path in self._month_paths()
+        ]
+        if tables:
+            attendance_df = compact_attendance_frame(pa.concat_tables(tables).to_pandas())
+        else:
+            attendance_df = pd.DataFrame(columns=columns or Config.ATTENDANCE_FIELDS)
+        
+        logger.info(f"Loaded {len(workers_df)} workers and {len(attendance_df)} attendance records from cache")
+        return workers_df, attendance_df
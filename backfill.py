@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Performance history backfill from one pass over attendance
+
+Attendance is reduced once to a per-worker daily rollup (the
+DataProcessor.aggregate_attendance statistics: records, approved days,
+work minutes, minutes squared, punctual days) with prefix sums over days.
+The statistics for any window are then two lookups per worker, so every
+monthly, quarterly and rolling snapshot costs about as much as one:
+
+    python backfill.py [--windows monthly quarterly rolling] [--offline]
+
+Each window's features use that window's working days (per site), so a
+snapshot matches running DataProcessor on only that window's records.
+With a saved model every snapshot is also scored.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+from data_processor import DataProcessor, AGGREGATE_COLUMNS, parse_attendance_times
+from attendance_cache import AttendanceCache
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+WINDOW_KINDS = ('monthly', 'quarterly', 'rolling')
+
+def backfill_windows(kinds=None, start_date=None, end_date=None):
+    """(kind, label, start, end) for every window in the date range, ends inclusive
+    
+    Calendar windows are clipped to the range; rolling windows of
+    Config.BACKFILL_ROLLING_DAYS end every Config.BACKFILL_ROLLING_STEP_DAYS,
+    counting back from the last day.
+    """
+    start = pd.Timestamp(start_date or Config.START_DATE)
+    end = pd.Timestamp(end_date or Config.END_DATE)
+    
+    windows = []
+    for kind in kinds or Config.BACKFILL_WINDOWS:
+        if kind in ('monthly', 'quarterly'):
+            for period in pd.period_range(start, end, freq='M' if kind == 'monthly' else 'Q'):
+                windows.append((kind, str(period), max(period.start_time, start), min(period.end_time.normalize(), end)))
+        elif kind == 'rolling':
+            length = pd.Timedelta(days=Config.BACKFILL_ROLLING_DAYS - 1)
+            step = pd.Timedelta(days=Config.BACKFILL_ROLLING_STEP_DAYS)
+            n_windows = (end - start - length) // step + 1 if end >= start + length else 0
+            for window_end in [end - step * i for i in reversed(range(n_windows))]:
+                windows.append((kind, window_end.strftime('%Y-%m-%d'), window_end - length, window_end))
+        else:
+            raise ValueError(f"Unknown backfill window '{kind}' (expected one of {', '.join(WINDOW_KINDS)})")
+    
+    return windows
+
+class DailyRollup:
+    """Per-worker daily attendance statistics with prefix sums over days
+    
+    Rows are keyed by worker * n_days + day and sorted, so a worker's days
+    are contiguous and window_aggregates finds a window's bounds for every
+    worker with one searchsorted.
+    """
+    
+    def __init__(self, data_processor=None):
+        self.data_processor = data_processor or DataProcessor()
+        self.worker_ids = pd.Index([])
+        self.first_day = None
+        self.n_days = 0
+        self.n_rows = 0
+        self._keys = np.empty(0, dtype=np.int64)
+        self._prefix = np.zeros((1, len(AGGREGATE_COLUMNS)))
+    
+    def build(self, attendance_df):
+        """Roll attendance up to one row per worker and day"""
+        attendance_df = parse_attendance_times(attendance_df)
+        if 'date' not in attendance_df:
+            raise ValueError("Attendance has no date column to roll up by")
+        
+        days = attendance_df['date'].dt.normalize()
+        dated = days.notna().to_numpy()
+        if not dated.all():
+            logger.warning(f"Ignoring {int((~dated).sum())} attendance records without a date")
+            attendance_df, days = attendance_df[dated], days[dated]
+        if attendance_df.empty:
+            return self
+        
+        worker_codes, worker_ids = pd.factorize(attendance_df['userId'].to_numpy())
+        self.worker_ids = pd.Index(worker_ids)
+        self.first_day = days.min()
+        self.n_days = (days.max() - self.first_day).days + 1
+        keys = worker_codes.astype(np.int64) * self.n_days + (days - self.first_day).dt.days.to_numpy()
+        
+        # The aggregates are additive, so rolling up by (worker, day) key gives mergeable daily rows
+        daily = self.data_processor.aggregate_attendance(attendance_df.assign(userId=keys)).sort_index()
+        self.n_rows = len(daily)
+        self._keys = daily.index.to_numpy(dtype=np.int64)
+        self._prefix = np.vstack([
+            np.zeros((1, len(AGGREGATE_COLUMNS))),
+            np.cumsum(daily.to_numpy(dtype=float), axis=0)
+        ])
+        
+        logger.info(
+            f"Daily rollup: {len(attendance_df)} records -> {self.n_rows} worker-days "
+            f"for {len(self.worker_ids)} workers over {self.n_days} days"
+        )
+        return self
+    
+    def window_aggregates(self, start_date, end_date):
+        """aggregate_attendance totals of every worker for records dated start_date..end_date"""
+        if self.first_day is None:
+            return pd.DataFrame(columns=AGGREGATE_COLUMNS, dtype=float)
+        
+        first = max((pd.Timestamp(start_date) - self.first_day).days, 0)
+        last = min((pd.Timestamp(end_date) - self.first_day).days, self.n_days - 1)
+        offsets = np.arange(len(self.worker_ids), dtype=np.int64) * self.n_days
+        
+        lower = np.searchsorted(self._keys, offsets + first)
+        upper = np.searchsorted(self._keys, offsets + last + 1) if last >= first else lower
+        return pd.DataFrame(self._prefix[upper] - self._prefix[lower], index=self.worker_ids, columns=AGGREGATE_COLUMNS)
+
+class HistoricalBackfill:
+    """Worker features (and scores) for every backfill window from one rollup"""
+    
+    def __init__(self, windows=None, data_processor=None, scorer=None):
+        self.windows = list(windows or Config.BACKFILL_WINDOWS)
+        self.data_processor = data_processor or DataProcessor()
+        self.scorer = scorer
+        self.rollup = DailyRollup(self.data_processor)
+    
+    def run(self, workers_df, attendance_df, start_date=None, end_date=None):
+        """One row per worker and window with the four features and, with a scorer, the label"""
+        started = time.perf_counter()
+        self.rollup.build(attendance_df)
+        rollup_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        snapshots = []
+        windows = backfill_windows(self.windows, start_date, end_date)
+        for kind, label, window_start, window_end in windows:
+            snapshot = self.data_processor.process_worker_aggregates(
+                workers_df, self.rollup.window_aggregates(window_start, window_end),
+                window_start.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d')
+            ).copy()
+            snapshot.insert(0, 'window_type', kind)
+            snapshot.insert(1, 'window', label)
+            snapshot.insert(2, 'window_start', window_start.strftime('%Y-%m-%d'))
+            snapshot.insert(3, 'window_end', window_end.strftime('%Y-%m-%d'))
+            snapshots.append(snapshot)
+        
+        history = pd.concat(snapshots, ignore_index=True) if snapshots else pd.DataFrame()
+        if self.scorer is not None and not history.empty:
+            feature_matrix = history[self.scorer.predictor.feature_names].to_numpy(dtype=float)
+            clusters, _, margins = self.scorer.score_matrix(feature_matrix)
+            history['cluster'] = clusters
+            history['performance_label'] = self.scorer.predictor.labels(clusters)
+            history['confidence_margin'] = margins
+        
+        logger.info(
+            f"Backfilled {len(windows)} windows ({len(history)} rows) in {time.perf_counter() - started:.2f}s "
+            f"after a {rollup_seconds:.2f}s rollup"
+        )
+        return history
+    
+    @staticmethod
+    def write(history, output_path):
+        """Write the history to CSV or Parquet, chosen by the file extension"""
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if output_path.endswith('.parquet'):
+            history.to_parquet(output_path, index=False)
+        else:
+            history.to_csv(output_path, index=False)
+        logger.info(f"Performance history written to {output_path}")
+
+def parse_args(argv=None):
+    """Parse command line options for the history backfill"""
+    parser = argparse.ArgumentParser(description="Backfill monthly, quarterly and rolling worker performance history")
+    parser.add_argument(
+        '--windows', nargs='+', choices=WINDOW_KINDS, default=None,
+        help="Window kinds to compute (defaults to Config.BACKFILL_WINDOWS)"
+    )
+    parser.add_argument('--start-date', default=None, help="First attendance day (defaults to Config.START_DATE)")
+    parser.add_argument('--end-date', default=None, help="Last attendance day (defaults to Config.END_DATE)")
+    parser.add_argument('--output', default=Config.BACKFILL_PATH, help="CSV or .parquet file for the history")
+    parser.add_argument(
+        '--use-cache', action='store_true',
+        help="Read users/attendance from the local columnar cache when valid"
+    )
+    parser.add_argument('--offline', action='store_true', help="Run from the local cache only")
+    parser.add_argument('--no-score', action='store_true', help="Only compute features, even if a model is saved")
+    return parser.parse_args(argv)
+
+def load_attendance(args):
+    """(workers_df, attendance_df) for the backfill range from the cache or Firestore"""
+    cache = AttendanceCache()
+    if (args.offline or args.use_cache) and cache.is_valid(ignore_age=args.offline):
+        return cache.read()
+    if args.offline:
+        logger.error(f"No usable attendance cache at {cache.path} for offline mode")
+        return None
+    
+    # firebase_admin is slow to import, only load it when Firestore is used
+    from firebase_client import FirebaseClient
+    result = FirebaseClient().get_worker_performance_data()
+    if not isinstance(result, tuple):
+        logger.error("No attendance data found for the backfill range")
+        return None
+    return result
+
+def main(args=None):
+    """History backfill pipeline"""
+    if args is None:
+        args = parse_args()
+    
+    # The range drives the fetch and the cache key; windows are cut from it
+    Config.START_DATE = args.start_date or Config.START_DATE
+    Config.END_DATE = args.end_date or Config.END_DATE
+    logger.info(f"Backfilling performance history from {Config.START_DATE} to {Config.END_DATE}")
+    
+    scorer = None
+    if not args.no_score:
+        from score import BatchScorer
+        scorer = BatchScorer()
+        if not scorer.load():
+            logger.warning("No saved model, backfilling features without scores")
+            scorer = None
+    
+    result = load_attendance(args)
+    if result is None:
+        return False
+    workers_df, attendance_df = result
+    if workers_df.empty or attendance_df.empty:
+        logger.error("No workers or attendance to backfill")
+        return False
+    
+    backfill = HistoricalBackfill(windows=args.windows, scorer=scorer)
+    history = backfill.run(workers_df, attendance_df)
+    backfill.write(history, args.output)
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
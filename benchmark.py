@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Parity and performance benchmark for the exported predictors
+
+Runs the scikit-learn model (WorkerKMeansModel.predict_cluster), the NumPy
+predictor and every exported TFLite variant on a synthetic feature matrix
+with realistic ranges. For each predictor and batch size it records the
+throughput and latency percentiles, then checks the predictions against
+scikit-learn:
+
+- the nearest squared distance must be within the predictor's tolerance
+  (Config.BENCHMARK_DISTANCE_TOLERANCE)
+- clusters must match exactly, except for rows whose two nearest centers
+  are closer than twice that tolerance (reported as ambiguous rows, where
+  rounding legitimately decides the tie)
+
+The report is written as JSON; the exit code is 1 when a check fails.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+from datetime import datetime
+import numpy as np
+
+from kmeans_model import WorkerKMeansModel
+from numpy_predictor import NumpyPredictor
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Feature distributions per worker archetype: (share of workers, {feature: (mean, std)})
+SYNTHETIC_ARCHETYPES = [
+    (0.30, {'attendance_rate': (95, 3), 'avg_work_hours': (8.3, 0.5), 'punctuality_score': (90, 6), 'consistency_score': (85, 8)}),
+    (0.45, {'attendance_rate': (80, 6), 'avg_work_hours': (7.2, 0.8), 'punctuality_score': (70, 10), 'consistency_score': (65, 12)}),
+    (0.23, {'attendance_rate': (55, 12), 'avg_work_hours': (5.5, 1.2), 'punctuality_score': (40, 15), 'consistency_score': (35, 15)}),
+]
+SYNTHETIC_INACTIVE_SHARE = 0.02  # Workers without approved days have all-zero features
+FEATURE_LIMITS = {
+    'attendance_rate': (0, 100),
+    'avg_work_hours': (0, 16),
+    'punctuality_score': (0, 100),
+    'consistency_score': (0, 100)
+}
+
+def synthetic_feature_matrix(n_rows, feature_names, random_state=None):
+    """Feature rows drawn from high/medium/low performer archetypes
+    
+    Values are clipped to the ranges DataProcessor produces, and a small
+    share of inactive workers (all zeros) is mixed in.
+    """
+    rng = np.random.default_rng(Config.RANDOM_STATE if random_state is None else random_state)
+    shares = [share for share, _ in SYNTHETIC_ARCHETYPES] + [SYNTHETIC_INACTIVE_SHARE]
+    archetypes = rng.choice(len(shares), size=n_rows, p=np.array(shares) / sum(shares))
+    
+    matrix = np.zeros((n_rows, len(feature_names)))
+    for index, (_, distributions) in enumerate(SYNTHETIC_ARCHETYPES):
+        rows = archetypes == index
+        for column, name in enumerate(feature_names):
+            mean, std = distributions[name]
+            matrix[rows, column] = rng.normal(mean, std, rows.sum())
+    
+    for column, name in enumerate(feature_names):
+        matrix[:, column] = matrix[:, column].clip(*FEATURE_LIMITS[name])
+    
+    return matrix
+
+class PredictorBenchmark:
+    """Time and cross-check every available predictor on the same feature matrix"""
+    
+    def __init__(self, batch_sizes=None, tolerances=None):
+        self.batch_sizes = batch_sizes or Config.BENCHMARK_BATCH_SIZES
+        self.tolerances = tolerances or Config.BENCHMARK_DISTANCE_TOLERANCE
+        self.sklearn_model = None
+        self.predictors = {}
+        self.skipped = {}
+    
+    def load(self, tflite_variants=None):
+        """Load the saved model and every predictor that can run here"""
+        self.sklearn_model = WorkerKMeansModel()
+        if not self.sklearn_model.load_model():
+            return False
+        
+        self.predictors['sklearn'] = self._sklearn_predict
+        
+        try:
+            numpy_predictor = NumpyPredictor.load()
+        except (FileNotFoundError, ValueError) as e:
+            self.skipped['numpy'] = str(e)
+        else:
+            self.predictors['numpy'] = lambda features: self._numpy_predict(numpy_predictor, features)
+        
+        variants = Config.TFLITE_VARIANTS if tflite_variants is None else tflite_variants
+        for variant in variants:
+            name = f'tflite_{variant}'
+            model_path = Config.TFLITE_VARIANT_PATHS[variant]
+            if not os.path.exists(model_path):
+                self.skipped[name] = f"{model_path} not found"
+                continue
+            try:
+                # TensorFlow is only imported when there is a model to run
+                from tflite_converter import load_interpreter, invoke_batch
+                interpreter = load_interpreter(model_path)
+            except ImportError as e:
+                self.skipped[name] = f"TensorFlow unavailable ({e})"
+                continue
+            self.predictors[name] = lambda features, interpreter=interpreter: invoke_batch(interpreter, features)
+        
+        for name, reason in self.skipped.items():
+            logger.warning(f"Skipping {name}: {reason}")
+        return True
+    
+    def _sklearn_predict(self, feature_matrix):
+        clusters = self.sklearn_model.predict_cluster(feature_matrix)
+        return clusters, None
+    
+    @staticmethod
+    def _numpy_predict(predictor, feature_matrix):
+        distances = predictor.distances(feature_matrix)
+        return distances.argmin(axis=1), distances.min(axis=1) ** 2
+    
+    def reference(self, feature_matrix):
+        """scikit-learn clusters and float64 squared distances to every center"""
+        X_scaled = self.sklearn_model.scaler.transform(feature_matrix)
+        centers = self.sklearn_model.model.cluster_centers_
+        squared = ((X_scaled[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        return self.sklearn_model.predict_cluster(feature_matrix), squared
+    
+    def check_parity(self, name, feature_matrix, reference_clusters, reference_squared):
+        """Compare one predictor with scikit-learn on the whole matrix"""
+        clusters, nearest_squared = self.predictors[name](feature_matrix)
+        clusters = np.asarray(clusters).reshape(-1)
+        tolerance = self.tolerances.get(name, 0.0)
+        
+        ordered = np.sort(reference_squared, axis=1)
+        nearest = ordered[:, 0]
+        ambiguous = np.zeros(len(ordered), dtype=bool)
+        if ordered.shape[1] > 1:
+            ambiguous = (ordered[:, 1] - nearest) <= 2 * tolerance
+        mismatches = (clusters != reference_clusters) & ~ambiguous
+        
+        result = {
+            'rows': len(feature_matrix),
+            'agreement': float((clusters == reference_clusters).mean()),
+            'ambiguous_rows': int(ambiguous.sum()),
+            'mismatches': int(mismatches.sum()),
+            'distance_tolerance': tolerance
+        }
+        if nearest_squared is not None:
+            result['max_distance_error'] = float(np.abs(np.asarray(nearest_squared).reshape(-1) - nearest).max())
+        result['passed'] = result['mismatches'] == 0 and result.get('max_distance_error', 0.0) <= tolerance
+        return result
+    
+    def time_predictor(self, name, feature_matrix, batch_size):
+        """Latency percentiles and throughput for one predictor at one batch size"""
+        predict = self.predictors[name]
+        n_starts = len(feature_matrix) - batch_size + 1
+        
+        # Warm up (TFLite resizes its input tensor on the first call of a new shape)
+        predict(feature_matrix[:batch_size])
+        
+        latencies = []
+        elapsed = 0.0
+        while len(latencies) < Config.BENCHMARK_MAX_CALLS and (
+            len(latencies) < Config.BENCHMARK_MIN_CALLS or elapsed < Config.BENCHMARK_TIME_BUDGET_SECONDS
+        ):
+            start = (len(latencies) * batch_size) % n_starts
+            batch = feature_matrix[start:start + batch_size]
+            started = time.perf_counter()
+            predict(batch)
+            latencies.append(time.perf_counter() - started)
+            elapsed += latencies[-1]
+        
+        latencies_ms = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        return {
+            'batch_size': batch_size,
+            'calls': len(latencies),
+            'latency_p50_ms': float(p50),
+            'latency_p95_ms': float(p95),
+            'latency_p99_ms': float(p99),
+            'throughput_rows_per_second': batch_size * len(latencies) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def run(self, feature_matrix):
+        """Parity checks and timings for every loaded predictor"""
+        reference_clusters, reference_squared = self.reference(feature_matrix)
+        
+        report = {
+            'created_at': datetime.now().isoformat(),
+            'rows': len(feature_matrix),
+            'n_clusters': int(reference_squared.shape[1]),
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'cpu_count': os.cpu_count()
+            },
+            'skipped': self.skipped,
+            'predictors': {}
+        }
+        
+        for name in self.predictors:
+            parity = self.check_parity(name, feature_matrix, reference_clusters, reference_squared)
+            timings = [
+                self.time_predictor(name, feature_matrix, batch_size)
+                for batch_size in self.batch_sizes if batch_size <= len(feature_matrix)
+            ]
+            report['predictors'][name] = {'parity': parity, 'timings': timings}
+            
+            logger.info(
+                f"{name}: {'PASS' if parity['passed'] else 'FAIL'} "
+                f"(agreement {parity['agreement']:.4%}, {parity['mismatches']} mismatches, "
+                f"{parity['ambiguous_rows']} ambiguous rows)"
+            )
+            for timing in timings:
+                logger.info(
+                    f"  batch {timing['batch_size']:>6}: p50 {timing['latency_p50_ms']:.3f}ms, "
+                    f"p99 {timing['latency_p99_ms']:.3f}ms, {timing['throughput_rows_per_second']:,.0f} rows/s"
+                )
+        
+        report['passed'] = all(result['parity']['passed'] for result in report['predictors'].values())
+        return report
+    
+    @staticmethod
+    def save_report(report, path=None):
+        path = path or Config.BENCHMARK_REPORT_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark report saved to {path}")
+
+def parse_args(argv=None):
+    """Parse command line options for the predictor benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark and cross-check the sklearn, NumPy and TFLite predictors")
+    parser.add_argument('--rows', type=int, default=Config.BENCHMARK_ROWS, help="Synthetic feature rows")
+    parser.add_argument(
+        '--batch-sizes', type=int, nargs='+', default=None,
+        help="Batch sizes to time (defaults to Config.BENCHMARK_BATCH_SIZES)"
+    )
+    parser.add_argument(
+        '--variants', nargs='*', default=None, choices=Config.TFLITE_VARIANTS,
+        help="TFLite variants to include (defaults to all exported ones; pass none to skip TFLite)"
+    )
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the synthetic matrix")
+    parser.add_argument('--output', default=Config.BENCHMARK_REPORT_PATH, help="JSON report path")
+    return parser.parse_args(argv)
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    
+    benchmark = PredictorBenchmark(batch_sizes=args.batch_sizes)
+    if not benchmark.load(tflite_variants=args.variants):
+        logger.error("No saved model to benchmark, run main.py first")
+        return False
+    
+    feature_matrix = synthetic_feature_matrix(args.rows, benchmark.sklearn_model.feature_names, args.seed)
+    logger.info(f"Benchmarking {len(benchmark.predictors)} predictor(s) on {len(feature_matrix)} synthetic rows")
+    
+    report = benchmark.run(feature_matrix)
+    report['seed'] = Config.RANDOM_STATE if args.seed is None else args.seed
+    benchmark.save_report(report, args.output)
+    
+    if not report['passed']:
+        logger.error("Predictor parity check failed, see the report for details")
+    return report['passed']
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+import numpy as np
+import time
+from sklearn.metrics import davies_bouldin_score, calinski_harabasz_score, silhouette_samples
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ClusterEvaluator:
+    """Pluggable clustering evaluation with bounded cost
+    
+    Available metrics:
+        silhouette          exact (chunked) up to Config.SILHOUETTE_EXACT_MAX_SAMPLES, sampled above
+        silhouette_exact    exact silhouette computed in row chunks, O(chunk x n) memory
+        silhouette_sampled  stratified-sample silhouette with a bootstrap confidence interval
+        davies_bouldin      Davies-Bouldin index (lower is better)
+        calinski_harabasz   Calinski-Harabasz index (higher is better)
+        inertia             sum of squared distances to the assigned centers
+    """
+    
+    def __init__(self, metrics=None, sample_size=None, chunk_size=None, n_bootstrap=None, random_state=42):
+        self.metrics = metrics or Config.EVALUATION_METRICS
+        self.sample_size = sample_size or Config.SILHOUETTE_SAMPLE_SIZE
+        self.chunk_size = chunk_size or Config.SILHOUETTE_CHUNK_SIZE
+        self.n_bootstrap = n_bootstrap or Config.SILHOUETTE_BOOTSTRAP
+        self.random_state = random_state
+    
+    def evaluate(self, X_scaled, labels, centers=None):
+        """Compute every configured metric; returns {metric: {'value', 'seconds', ...}}"""
+        labels = np.asarray(labels)
+        n_labels = len(np.unique(labels))
+        results = {}
+        
+        for metric in self.metrics:
+            if metric != 'inertia' and not 2 <= n_labels <= len(X_scaled) - 1:
+                logger.warning(f"Skipping {metric}: needs 2 to n_samples - 1 clusters, got {n_labels}")
+                continue
+            
+            started = time.perf_counter()
+            result = self._compute(metric, X_scaled, labels, centers)
+            result['seconds'] = time.perf_counter() - started
+            results[metric] = result
+            
+            logger.info(f"{metric}: {result['value']:.4f} ({result['seconds']:.3f}s)")
+        
+        return results
+    
+    def _compute(self, metric, X_scaled, labels, centers):
+        if metric == 'silhouette':
+            if len(X_scaled) <= Config.SILHOUETTE_EXACT_MAX_SAMPLES:
+                return {**self.chunked_silhouette(X_scaled, labels), 'method': 'exact'}
+            return {**self.sampled_silhouette(X_scaled, labels), 'method': 'sampled'}
+        if metric == 'silhouette_exact':
+            return self.chunked_silhouette(X_scaled, labels)
+        if metric == 'silhouette_sampled':
+            return self.sampled_silhouette(X_scaled, labels)
+        if metric == 'davies_bouldin':
+            return {'value': float(davies_bouldin_score(X_scaled, labels))}
+        if metric == 'calinski_harabasz':
+            return {'value': float(calinski_harabasz_score(X_scaled, labels))}
+        if metric == 'inertia':
+            return {'value': self.inertia(X_scaled, labels, centers)}
+        raise ValueError(f"Unknown evaluation metric: {metric}")
+    
+    def chunked_silhouette(self, X_scaled, labels):
+        """Exact mean silhouette, computing distances one block of rows at a time"""
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        clusters, label_index = np.unique(labels, return_inverse=True)
+        one_hot = np.zeros((len(X_scaled), len(clusters)))
+        one_hot[np.arange(len(X_scaled)), label_index] = 1
+        cluster_sizes = one_hot.sum(axis=0)
+        squared_norms = np.einsum('ij,ij->i', X_scaled, X_scaled)
+        
+        scores = np.empty(len(X_scaled))
+        for start in range(0, len(X_scaled), self.chunk_size):
+            stop = min(start + self.chunk_size, len(X_scaled))
+            block = X_scaled[start:stop]
+            
+            squared = squared_norms[start:stop, None] - 2 * block @ X_scaled.T + squared_norms[None, :]
+            distances = np.sqrt(np.maximum(squared, 0))
+            distances[np.arange(stop - start), np.arange(start, stop)] = 0
+            
+            # Sum of distances from each row to every cluster
+            cluster_sums = distances @ one_hot
+            own = label_index[start:stop]
+            own_sizes = cluster_sizes[own]
+            
+            a = cluster_sums[np.arange(stop - start), own] / np.maximum(own_sizes - 1, 1)
+            mean_distances = cluster_sums / cluster_sizes
+            mean_distances[np.arange(stop - start), own] = np.inf
+            b = mean_distances.min(axis=1)
+            
+            block_scores = (b - a) / np.maximum(a, b)
+            block_scores[own_sizes <= 1] = 0
+            scores[start:stop] = block_scores
+        
+        return {'value': float(scores.mean())}
+    
+    def sampled_silhouette(self, X_scaled, labels):
+        """Silhouette on a stratified sample, with a bootstrap confidence interval"""
+        rng = np.random.default_rng(self.random_state)
+        labels = np.asarray(labels)
+        n_samples = len(X_scaled)
+        
+        if n_samples <= self.sample_size:
+            sample_index = np.arange(n_samples)
+        else:
+            # Sample every cluster in proportion to its size (at least 2 rows each)
+            sample_index = []
+            for cluster in np.unique(labels):
+                members = np.flatnonzero(labels == cluster)
+                take = min(len(members), max(2, int(round(self.sample_size * len(members) / n_samples))))
+                sample_index.append(rng.choice(members, size=take, replace=False))
+            sample_index = np.concatenate(sample_index)
+        
+        sample_scores = silhouette_samples(X_scaled[sample_index], labels[sample_index])
+        
+        bootstrap_means = np.array([
+            rng.choice(sample_scores, size=len(sample_scores), replace=True).mean()
+            for _ in range(self.n_bootstrap)
+        ])
+        ci_low, ci_high = np.percentile(bootstrap_means, [2.5, 97.5])
+        
+        return {
+            'value': float(sample_scores.mean()),
+            'ci_low': float(ci_low),
+            'ci_high': float(ci_high),
+            'sample_size': int(len(sample_index))
+        }
+    
+    def inertia(self, X_scaled, labels, centers):
+        """Sum of squared distances from each row to its cluster center"""
+        X_scaled = np.asarray(X_scaled)
+        if centers is None:
+            centers = np.vstack([X_scaled[labels == cluster].mean(axis=0) for cluster in np.unique(labels)])
+            labels = np.unique(labels, return_inverse=True)[1]
+        return float(((X_scaled - np.asarray(centers)[labels]) ** 2).sum())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Headless cluster plots, rendered off the training critical path
+
+Rendering uses matplotlib's Agg backend through the Figure API, so no
+window is ever opened. Populations above Config.VISUALIZATION_MAX_POINTS
+are drawn as hexbin density with a stratified sample of workers on top
+instead of one marker per worker.
+
+A deferred run (--visualize defer) only saves the plot data; render it
+later with:
+
+    python cluster_plots.py [plot_data.csv] [--output cluster_visualization.png]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = ['attendance_rate', 'avg_work_hours', 'punctuality_score', 'consistency_score']
+PLOT_COLUMNS = FEATURE_COLUMNS + ['cluster', 'performance_label']
+
+def plot_frame(processed_data):
+    """Only the columns the plots use, so little data crosses to the render process"""
+    return processed_data[PLOT_COLUMNS].reset_index(drop=True)
+
+def _stratified_sample(plot_data, max_points, random_state):
+    """About max_points rows, keeping every cluster's share"""
+    if len(plot_data) <= max_points:
+        return plot_data
+    sample = plot_data.groupby('cluster', group_keys=False).sample(
+        frac=max_points / len(plot_data), random_state=random_state
+    )
+    # Shuffle so no cluster is always drawn on top
+    return sample.sample(frac=1, random_state=random_state)
+
+def _scatter_panel(ax, plot_data, sample, x, y, dense):
+    if dense:
+        ax.hexbin(
+            plot_data[x], plot_data[y], gridsize=Config.VISUALIZATION_HEXBIN_GRIDSIZE,
+            bins='log', cmap='Greys', mincnt=1
+        )
+    ax.scatter(
+        sample[x], sample[y], c=sample['cluster'], cmap='viridis',
+        alpha=0.5 if dense else 0.7, s=6 if dense else None
+    )
+
+def render_cluster_plots(plot_data, save_path=None, dpi=None, max_points=None):
+    """Render the 2x2 cluster overview to save_path; returns the render time in seconds"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    
+    started = time.perf_counter()
+    save_path = save_path or Config.VISUALIZATION_PATH
+    max_points = max_points or Config.VISUALIZATION_MAX_POINTS
+    dense = len(plot_data) > max_points
+    sample = _stratified_sample(plot_data, max_points, Config.RANDOM_STATE)
+    density_note = f" (density of {len(plot_data)}, {len(sample)} sampled)" if dense else ""
+    
+    fig = Figure(figsize=(15, 12))
+    axes = fig.subplots(2, 2)
+    
+    # Plot 1: Attendance Rate vs Avg Work Hours
+    _scatter_panel(axes[0, 0], plot_data, sample, 'attendance_rate', 'avg_work_hours', dense)
+    axes[0, 0].set_xlabel('Attendance Rate (%)')
+    axes[0, 0].set_ylabel('Average Work Hours')
+    axes[0, 0].set_title(f'Attendance Rate vs Work Hours{density_note}')
+    
+    # Plot 2: Punctuality vs Consistency
+    _scatter_panel(axes[0, 1], plot_data, sample, 'punctuality_score', 'consistency_score', dense)
+    axes[0, 1].set_xlabel('Punctuality Score (%)')
+    axes[0, 1].set_ylabel('Consistency Score (%)')
+    axes[0, 1].set_title(f'Punctuality vs Consistency{density_note}')
+    
+    # Plot 3: Performance distribution
+    performance_counts = plot_data['performance_label'].value_counts()
+    axes[1, 0].pie(performance_counts.values, labels=performance_counts.index, autopct='%1.1f%%')
+    axes[1, 0].set_title('Performance Distribution')
+    
+    # Plot 4: Feature comparison by cluster
+    cluster_means = plot_data.groupby('performance_label')[FEATURE_COLUMNS].mean()
+    positions = np.arange(len(cluster_means))
+    width = 0.8 / len(FEATURE_COLUMNS)
+    for i, feature in enumerate(FEATURE_COLUMNS):
+        axes[1, 1].bar(positions + (i - (len(FEATURE_COLUMNS) - 1) / 2) * width, cluster_means[feature], width, label=feature)
+    axes[1, 1].set_xticks(positions, cluster_means.index, rotation=45)
+    axes[1, 1].set_title('Average Features by Performance Level')
+    axes[1, 1].set_xlabel('Performance Level')
+    axes[1, 1].set_ylabel('Score')
+    axes[1, 1].legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+    fig.savefig(save_path, dpi=dpi or Config.VISUALIZATION_DPI, bbox_inches='tight')
+    
+    elapsed = time.perf_counter() - started
+    logger.info(f"Visualization saved to {save_path} ({len(plot_data)} workers, {elapsed:.2f}s)")
+    return elapsed
+
+class ClusterPlotJob:
+    """Run the visualization stage according to a mode
+    
+    'background' renders in a separate process while training continues,
+    'inline' renders immediately, 'defer' saves the plot data to
+    Config.VISUALIZATION_DATA_PATH for a later `python cluster_plots.py`,
+    and 'skip' does nothing. Call wait() before exiting.
+    """
+    
+    MODES = ('background', 'inline', 'defer', 'skip')
+    
+    def __init__(self, mode=None, save_path=None):
+        self.mode = mode or Config.VISUALIZATION_MODE
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown visualization mode '{self.mode}' (expected one of {', '.join(self.MODES)})")
+        self.save_path = save_path or Config.VISUALIZATION_PATH
+        self._executor = None
+        self._future = None
+    
+    def start(self, processed_data):
+        """Start (or run, skip or defer) rendering for the labelled worker data"""
+        if self.mode == 'skip':
+            logger.info("Visualization skipped")
+        elif self.mode == 'defer':
+            os.makedirs(os.path.dirname(Config.VISUALIZATION_DATA_PATH) or '.', exist_ok=True)
+            plot_frame(processed_data).to_csv(Config.VISUALIZATION_DATA_PATH, index=False)
+            logger.info(
+                f"Visualization deferred, plot data saved to {Config.VISUALIZATION_DATA_PATH} "
+                f"(render with: python cluster_plots.py)"
+            )
+        elif self.mode == 'inline':
+            render_cluster_plots(plot_frame(processed_data), self.save_path)
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+            self._future = self._executor.submit(render_cluster_plots, plot_frame(processed_data), self.save_path)
+            logger.info("Visualization rendering in a background process")
+    
+    def wait(self, timeout=None):
+        """Wait for a background render; failures are logged, not raised"""
+        if self._future is None:
+            return True
+        try:
+            elapsed = self._future.result(timeout=timeout)
+            logger.info(f"Background visualization finished ({elapsed:.2f}s), saved to {self.save_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Background visualization failed: {e}")
+            return False
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._future = None
+
+def parse_args(argv=None):
+    """Parse command line options for rendering deferred plots"""
+    parser = argparse.ArgumentParser(description="Render the cluster visualization from saved plot data")
+    parser.add_argument('data_path', nargs='?', default=Config.VISUALIZATION_DATA_PATH, help="Plot data CSV")
+    parser.add_argument('--output', default=Config.VISUALIZATION_PATH, help="Image path")
+    parser.add_argument('--dpi', type=int, default=None, help="Resolution (defaults to Config.VISUALIZATION_DPI)")
+    return parser.parse_args(argv)
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    
+    if not os.path.exists(args.data_path):
+        logger.error(f"No plot data at {args.data_path}, train with --visualize defer first")
+        return False
+    
+    render_cluster_plots(pd.read_csv(args.data_path), args.output, dpi=args.dpi)
+    return True
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    success = main()
+    sys.exit(0 if success else 1)
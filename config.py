@@ -12,6 +12,94 @@ class Config:
     START_DATE = '2025-01-01'  # Format: YYYY-MM-DD
     END_DATE = '2025-12-31'    # Format: YYYY-MM-DD
     
+    # Firestore ingestion configuration
+    PARALLEL_INGEST = True
+    INGEST_PARTITION_DAYS = 7
+    INGEST_PAGE_SIZE = 1000
+    INGEST_MAX_WORKERS = 8
+    ATTENDANCE_FIELDS = ['userId', 'status', 'workMinutes', 'date', 'clockInTime', 'clockOutTime']
+    
+    # Batch scoring (score.py)
+    SCORING_BATCH_SIZE = 10000
+    SCORES_COLLECTION = 'workerScores'
+    FIRESTORE_BATCH_SIZE = 500  # Firestore's limit on writes per batch
+    
+    # Inference server (inference_server.py)
+    SERVER_HOST = '127.0.0.1'
+    SERVER_PORT = 8080
+    SERVER_MAX_BATCH_SIZE = 256
+    SERVER_MAX_WAIT_MS = 2  # How long a batch waits for more requests
+    SERVER_METRICS_WINDOW = 10000  # Requests kept for latency percentiles
+    
+    # Predictor benchmark (benchmark.py)
+    BENCHMARK_ROWS = 100000
+    BENCHMARK_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+    BENCHMARK_MIN_CALLS = 5
+    BENCHMARK_MAX_CALLS = 200
+    BENCHMARK_TIME_BUDGET_SECONDS = 1.0  # Per predictor and batch size
+    BENCHMARK_DISTANCE_TOLERANCE = {  # Max error of the nearest squared distance (scaled units)
+        'numpy': 1e-4,
+        'tflite_float32': 1e-3,
+        'tflite_float16': 5e-2,
+        'tflite_int8': 5e-1
+    }
+    BENCHMARK_REPORT_PATH = 'models/benchmark_report.json'
+    
+    # Cluster visualization (cluster_plots.py)
+    VISUALIZATION_MODE = 'background'  # 'background', 'inline', 'defer' (save data only) or 'skip'
+    VISUALIZATION_PATH = 'cluster_visualization.png'
+    VISUALIZATION_DATA_PATH = 'models/cluster_plot_data.csv'
+    VISUALIZATION_DPI = 150
+    VISUALIZATION_MAX_POINTS = 5000  # Larger populations are drawn as hexbin density plus a sample
+    VISUALIZATION_HEXBIN_GRIDSIZE = 60
+    
+    # Pipeline instrumentation (instrumentation.py)
+    INSTRUMENT_STAGES = False  # Same as main.py --instrument
+    RUN_REPORT_PATH = 'models/run_report.json'
+    PROFILE_DIR = 'models'  # cProfile dumps, profile_<stage>.prof
+    PROFILE_TOP_N = 15  # Functions logged from a stage profile
+    
+    # Stage output cache (stage_cache.py)
+    STAGE_CACHE_ENABLED = True  # main.py --no-stage-cache recomputes everything
+    STAGE_CACHE_DIR = 'cache/stages'
+    STAGE_CACHE_KEEP = 3  # Entries kept per stage
+    
+    # Partitioned training (main.py --partition-by, partitioned_training.py)
+    PARTITION_KEY = None  # e.g. 'site'; None trains one global model
+    PARTITION_COLUMNS = ['site', 'department', 'role']  # Worker columns kept in the processed data for grouping
+    PARTITION_DIR = 'models/partitions'  # One model set per partition plus index.json
+    PARTITION_MIN_WORKERS = 20  # Smaller partitions are skipped
+    PARTITION_MISSING_VALUE = 'unassigned'  # Partition of workers without a value
+    PARTITION_MAX_WORKERS = None  # None uses every CPU
+    
+    # Historical backfill (backfill.py)
+    BACKFILL_WINDOWS = ['monthly', 'quarterly', 'rolling']
+    BACKFILL_ROLLING_DAYS = 30
+    BACKFILL_ROLLING_STEP_DAYS = 7  # Days between the ends of consecutive rolling windows
+    BACKFILL_PATH = 'models/performance_history.csv'  # .parquet also works
+    
+    # Incremental feature store (main.py --incremental)
+    FEATURE_STORE_CORRECTION_DAYS = 14  # Trailing days re-fetched every run to pick up late approvals and edits
+    
+    # Streaming feature computation
+    STREAMING_CHUNK_SIZE = 50000
+    
+    # Local attendance cache configuration
+    CACHE_DIR = 'cache'
+    CACHE_MAX_AGE_HOURS = 24
+    CACHE_CLOSED_AFTER_DAYS = 7  # Ranges ending this long ago never expire
+    
+    # Working day calendar configuration
+    WEEKMASK = '1111100'  # Monday to Friday
+    HOLIDAYS = []  # Format: YYYY-MM-DD
+    SITE_COLUMN = 'site'
+    SITE_CALENDARS = {}  # e.g. {'bali': {'weekmask': '1111110', 'holidays': ['2025-03-29']}}
+    
+    # Punctuality configuration
+    PUNCTUALITY_CUTOFF_HOUR = 7  # Punctual if clock in at 7 AM or earlier
+    SHIFT_COLUMN = 'shift'
+    SHIFT_PUNCTUALITY_CUTOFFS = {}  # e.g. {'night': 19}
+    
     # Model configuration
     N_CLUSTERS = 3
     CLUSTER_LABELS = {
@@ -20,6 +108,43 @@ class Config:
         2: 'High Performer'
     }
     
+    # Full K-means training: restarts run in parallel with independent seeds
+    # spawned from RANDOM_STATE; init is 'k-means++', 'k-means||' or 'warm'
+    # (start from the saved model's centers)
+    RANDOM_STATE = 42
+    KMEANS_INIT = 'k-means++'
+    N_RESTARTS = 10
+    RESTART_MAX_WORKERS = None  # None uses every CPU
+    RESTART_AGREEMENT = 3  # Stop once this many restarts reach the best inertia
+    RESTART_TOL = 1e-6  # Relative inertia difference treated as the same solution
+    KMEANS_PARALLEL_ROUNDS = 5
+    STABLE_CLUSTER_IDS = True  # Match new clusters to the saved model's (Hungarian matching on centers)
+    CLUSTER_MATCH_MAX_DRIFT = 2.0  # Skip matching when a matched center moved further (scaled units)
+    
+    # Training mode: 'full' (KMeans), 'minibatch' (MiniBatchKMeans over shuffled
+    # batches) or 'streaming' (scaler and MiniBatchKMeans fitted chunk by chunk)
+    TRAINING_MODE = 'full'
+    MINIBATCH_SIZE = 1024
+    MINIBATCH_MAX_EPOCHS = 20
+    MINIBATCH_TOL = 1e-4  # Stop when no center moves further than this (scaled units)
+    MINIBATCH_INIT_SIZE = 10000  # Reservoir sample used to seed streaming training
+    STREAMING_TRAIN_CHUNK_SIZE = 10000  # Feature rows per partial_fit chunk in streaming training
+    STREAMING_EPOCHS = 5
+    
+    # Cluster evaluation (see cluster_evaluation.ClusterEvaluator)
+    EVALUATION_METRICS = ['silhouette', 'davies_bouldin', 'calinski_harabasz', 'inertia']
+    SILHOUETTE_EXACT_MAX_SAMPLES = 20000  # Above this 'silhouette' switches to the sampled estimate
+    SILHOUETTE_SAMPLE_SIZE = 10000
+    SILHOUETTE_CHUNK_SIZE = 2000  # Rows per block in the chunked exact silhouette
+    SILHOUETTE_BOOTSTRAP = 200  # Bootstrap resamples for the sampled silhouette interval
+    
+    # Model selection (main.py --select-k), see model_selection.KSelector
+    K_CANDIDATES = [2, 3, 4, 5, 6, 7, 8]
+    SELECTION_SEEDS = [0, 1, 2]
+    SELECTION_CRITERION = 'silhouette'  # 'silhouette', 'calinski_harabasz', 'davies_bouldin' or 'elbow'
+    SELECTION_METRICS = ['silhouette_sampled', 'davies_bouldin', 'calinski_harabasz']
+    SELECTION_MAX_WORKERS = None  # None uses every CPU
+    
     # Feature weights for clustering
     FEATURE_WEIGHTS = {
         'attendance_rate': 0.3,
@@ -32,4 +157,21 @@ class Config:
     MODEL_PATH = 'models/kmeans_worker_model.joblib'
     SCALER_PATH = 'models/scaler.joblib'
     TFLITE_MODEL_PATH = 'models/worker_analysis_model.tflite'
-    METADATA_PATH = 'models/model_metadata.json'
\ No newline at end of file
+    METADATA_PATH = 'models/model_metadata.json'
+    TFLITE_INFO_PATH = 'models/tflite_model_info.json'
+    ARTIFACT_PATH = 'models/worker_model.bin'  # Binary artifact, see model_artifact.py
+    FEATURE_STORE_PATH = 'models/feature_store.joblib'
+    SELECTION_REPORT_PATH = 'models/model_selection.json'
+    ASSIGNMENTS_PATH = 'models/worker_assignments.csv'
+    SCORES_PATH = 'worker_scores.csv'
+    
+    # TFLite export variants (dynamic batch dimension)
+    TFLITE_VARIANTS = ['float32', 'float16', 'int8']
+    TFLITE_VARIANT_PATHS = {
+        'float32': TFLITE_MODEL_PATH,
+        'float16': 'models/worker_analysis_model_fp16.tflite',
+        'int8': 'models/worker_analysis_model_int8.tflite'
+    }
+    TFLITE_CALIBRATION_SAMPLES = 1000  # Feature rows used to calibrate the int8 variant
+    TFLITE_BENCHMARK_REPEATS = 20
+    TFLITE_REPORT_PATH = 'models/tflite_export_report.json'
\ No newline at end of file
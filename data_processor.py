@@ -1,13 +1,93 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import logging
+from config import Config
+from working_days import working_days_in_range
 
 logger = logging.getLogger(__name__)
 
+TIME_COLUMNS = ['date', 'clockInTime', 'clockOutTime']
+ATTENDANCE_COLUMNS = ['userId', 'status', 'workMinutes'] + TIME_COLUMNS
+AGGREGATE_COLUMNS = [
+    'total_records', 'approved_records', 'minutes_count',
+    'minutes_sum', 'minutes_sq_sum', 'punctual_count'
+]
+
+def parse_attendance_times(attendance_df):
+    """Ensure date/clock-in/clock-out columns are naive datetime64 values
+    
+    Firestore timestamps are converted to UTC wall-clock time, the same
+    values the old strftime strings carried. Frames that only have the
+    legacy *_string columns are parsed from those instead.
+    """
+    parsed = {}
+    for column in TIME_COLUMNS:
+        if column in attendance_df:
+            values = attendance_df[column]
+            if pd.api.types.is_datetime64_dtype(values):
+                continue
+        elif f'{column}_string' in attendance_df:
+            values = attendance_df[f'{column}_string']
+        else:
+            continue
+        
+        parsed[column] = pd.to_datetime(values, errors='coerce', utc=True).dt.tz_localize(None)
+    
+    if not parsed:
+        return attendance_df
+    return attendance_df.assign(**parsed)
+
+def _downcast_minutes(values):
+    """Store whole-minute values in the smallest integer type that holds them"""
+    values = pd.to_numeric(values, errors='coerce')
+    valid = values.dropna()
+    
+    if not (valid == valid.round()).all():
+        return values.astype('float64')
+    
+    has_missing = len(valid) < len(values)
+    if valid.empty or (valid.min() >= np.iinfo(np.int16).min and valid.max() <= np.iinfo(np.int16).max):
+        return values.astype('Int16' if has_missing else 'int16')
+    return values.astype('Int32' if has_missing else 'int32')
+
+def compact_attendance_frame(attendance_df, log_memory=True):
+    """Keep only the columns feature building needs, in compact dtypes
+    
+    userId/status (and the shift column, if present) become categoricals,
+    workMinutes is downcast to int16/int32 and timestamps are datetime64
+    with no string copies. Logs memory usage before and after.
+    """
+    before = attendance_df.memory_usage(deep=True).sum() if log_memory else 0
+    
+    attendance_df = parse_attendance_times(attendance_df)
+    columns = [column for column in ATTENDANCE_COLUMNS + [Config.SHIFT_COLUMN] if column in attendance_df]
+    
+    compact = pd.DataFrame(index=pd.RangeIndex(len(attendance_df)))
+    for column in columns:
+        values = attendance_df[column].reset_index(drop=True)
+        if column == 'workMinutes':
+            compact[column] = _downcast_minutes(values)
+        elif column in TIME_COLUMNS:
+            compact[column] = values
+        else:
+            compact[column] = values.astype('category')
+    
+    if log_memory:
+        after = compact.memory_usage(deep=True).sum()
+        logger.info(
+            f"Attendance memory: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+            f"({len(attendance_df.columns)} -> {len(compact.columns)} columns)"
+        )
+    
+    return compact
+
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, punctuality_cutoff_hour=None, shift_cutoffs=None):
         self.processed_data = None
+        self.punctuality_cutoff_hour = (
+            Config.PUNCTUALITY_CUTOFF_HOUR if punctuality_cutoff_hour is None else punctuality_cutoff_hour
+        )
+        self.shift_cutoffs = Config.SHIFT_PUNCTUALITY_CUTOFFS if shift_cutoffs is None else shift_cutoffs
     
     def calculate_attendance_rate(self, worker_id, attendance_df):
         """Calculate attendance rate for a worker"""
@@ -38,6 +118,7 @@ class DataProcessor:
     
     def calculate_punctuality_score(self, worker_id, attendance_df):
         """Calculate punctuality score based on clock in/out times"""
+        attendance_df = parse_attendance_times(attendance_df)
         worker_attendance = attendance_df[
             (attendance_df['userId'] == worker_id) & 
             (attendance_df['status'] == 'approved')
@@ -46,19 +127,25 @@ class DataProcessor:
         if worker_attendance.empty:
             return 0
         
-        punctual_days = 0
-        total_days = len(worker_attendance)
+        return self.punctual_flags(worker_attendance).mean() * 100
+    
+    def punctual_flags(self, attendance_df):
+        """Vectorized punctuality check for each attendance record
+        
+        A record is punctual when it has both clock in and clock out times
+        and the clock-in hour is at or before the cutoff for its shift.
+        """
+        if 'clockInTime' not in attendance_df or 'clockOutTime' not in attendance_df:
+            return pd.Series(False, index=attendance_df.index)
+        
+        clock_in = attendance_df['clockInTime']
+        clock_out = attendance_df['clockOutTime']
         
-        for _, record in worker_attendance.iterrows():
-            # Use the string version for easier parsing
-            clock_in_time = record.get('clockInTime_string', '')
-            clock_out_time = record.get('clockOutTime_string', '')
-            
-            # Simple punctuality check (can be enhanced)
-            if self._is_punctual(clock_in_time, clock_out_time):
-                punctual_days += 1
+        cutoff = self.punctuality_cutoff_hour
+        if self.shift_cutoffs and Config.SHIFT_COLUMN in attendance_df:
+            cutoff = attendance_df[Config.SHIFT_COLUMN].map(self.shift_cutoffs).fillna(cutoff)
         
-        return (punctual_days / total_days) * 100 if total_days > 0 else 0
+        return clock_in.notna() & clock_out.notna() & (clock_in.dt.hour <= cutoff)
     
     def calculate_consistency_score(self, worker_id, attendance_df):
         """Calculate work consistency score"""
@@ -81,71 +168,172 @@ class DataProcessor:
         
         return consistency_score
     
+    def compute_worker_features(self, attendance_df, worker_sites=None):
+        """Compute all performance features for every worker in a single groupby pass
+        
+        Returns a DataFrame indexed by userId with the same values the
+        per-worker calculate_* methods produce. worker_sites optionally maps
+        userId to a site so attendance rates use that site's calendar.
+        """
+        attendance_df = parse_attendance_times(attendance_df)
+        
+        total_records = attendance_df.groupby('userId', observed=True).size()
+        
+        approved = attendance_df[attendance_df['status'] == 'approved']
+        work_hours = approved['workMinutes'].astype(float) / 60
+        punctual = self.punctual_flags(approved).astype(float)
+        
+        grouped_hours = work_hours.groupby(approved['userId'], observed=True)
+        approved_days = grouped_hours.size()
+        working_days = self._working_days_for_workers(approved_days.index, worker_sites)
+        
+        features = pd.DataFrame({
+            'attendance_rate': (approved_days / working_days * 100).clip(upper=100).where(working_days > 0, 0),
+            'avg_work_hours': grouped_hours.mean(),
+            'punctuality_score': punctual.groupby(approved['userId'], observed=True).mean() * 100,
+            'consistency_score': self._consistency_from_std(grouped_hours.std(), approved_days)
+        })
+        features = features.reindex(total_records.index.union(features.index))
+        features['total_records'] = total_records.reindex(features.index, fill_value=0)
+        
+        # Workers without approved records keep the 0 defaults
+        approved_features = ['attendance_rate', 'punctuality_score', 'consistency_score']
+        features[approved_features] = features[approved_features].fillna(0)
+        features.loc[~features.index.isin(approved_days.index), 'avg_work_hours'] = 0
+        
+        return features
+    
+    def aggregate_attendance(self, attendance_df):
+        """Reduce attendance records to mergeable per-worker sufficient statistics
+        
+        Aggregates from disjoint sets of records can be combined by adding
+        them, and features_from_aggregates turns them back into features.
+        """
+        attendance_df = parse_attendance_times(attendance_df)
+        
+        approved = attendance_df[attendance_df['status'] == 'approved']
+        minutes = approved['workMinutes'].astype(float)
+        
+        grouped = pd.DataFrame({
+            'minutes': minutes,
+            'minutes_sq': minutes ** 2,
+            'punctual': self.punctual_flags(approved).astype(int)
+        }).groupby(approved['userId'], observed=True)
+        
+        aggregates = pd.DataFrame({
+            'approved_records': grouped.size(),
+            'minutes_count': grouped['minutes'].count(),
+            'minutes_sum': grouped['minutes'].sum(),
+            'minutes_sq_sum': grouped['minutes_sq'].sum(),
+            'punctual_count': grouped['punctual'].sum()
+        })
+        
+        total_records = attendance_df.groupby('userId', observed=True).size()
+        aggregates = aggregates.reindex(total_records.index.union(aggregates.index), fill_value=0)
+        aggregates.insert(0, 'total_records', total_records.reindex(aggregates.index, fill_value=0))
+        
+        return aggregates[AGGREGATE_COLUMNS]
+    
+    def features_from_aggregates(self, aggregates, worker_sites=None, start_date=None, end_date=None):
+        """Derive the four features plus total_records from aggregate_attendance output
+        
+        Streaming aggregates may carry minutes_m2 (sum of squared deviations)
+        in place of minutes_sq_sum. start_date/end_date set the window that
+        working days are counted over (defaults to the Config date range).
+        """
+        approved_days = aggregates['approved_records']
+        minutes_count = aggregates['minutes_count']
+        working_days = self._working_days_for_workers(aggregates.index, worker_sites, start_date, end_date)
+        
+        mean_minutes = aggregates['minutes_sum'] / minutes_count
+        if 'minutes_m2' in aggregates:
+            squared_deviations = aggregates['minutes_m2']
+        else:
+            squared_deviations = (aggregates['minutes_sq_sum'] - aggregates['minutes_sum'] * mean_minutes).clip(lower=0)
+        std_hours = np.sqrt(squared_deviations / (minutes_count - 1)).where(minutes_count >= 2) / 60
+        
+        return pd.DataFrame({
+            'attendance_rate': (approved_days / working_days * 100).clip(upper=100).where(working_days > 0, 0),
+            'avg_work_hours': (mean_minutes / 60).where(approved_days > 0, 0),
+            'punctuality_score': (aggregates['punctual_count'] / approved_days * 100).where(approved_days > 0, 0),
+            'consistency_score': self._consistency_from_std(std_hours, approved_days),
+            'total_records': aggregates['total_records']
+        })
+    
     def process_worker_data(self, workers_df, attendance_df):
         """Process all worker data for clustering"""
-        processed_workers = []
-        
-        for _, worker in workers_df.iterrows():
-            worker_id = worker['userId']
-            
-            # Calculate performance metrics
-            attendance_rate = self.calculate_attendance_rate(worker_id, attendance_df)
-            avg_work_hours = self.calculate_avg_work_hours(worker_id, attendance_df)
-            punctuality_score = self.calculate_punctuality_score(worker_id, attendance_df)
-            consistency_score = self.calculate_consistency_score(worker_id, attendance_df)
-            
-            processed_worker = {
-                'userId': worker_id,
-                'name': worker.get('name', 'Unknown'),
-                'email': worker.get('email', ''),
-                'workerId': worker.get('workerId', ''),
-                'attendance_rate': attendance_rate,
-                'avg_work_hours': avg_work_hours,
-                'punctuality_score': punctuality_score,
-                'consistency_score': consistency_score,
-                'total_records': len(attendance_df[attendance_df['userId'] == worker_id])
-            }
-            
-            processed_workers.append(processed_worker)
-        
-        self.processed_data = pd.DataFrame(processed_workers)
-        logger.info(f"Processed data for {len(processed_workers)} workers")
+        if workers_df.empty:
+            self.processed_data = pd.DataFrame()
+            logger.info("Processed data for 0 workers")
+            return self.processed_data
+        
+        features = self.compute_worker_features(attendance_df, self._worker_sites(workers_df))
+        return self._build_processed_data(workers_df, features)
+    
+    def process_worker_aggregates(self, workers_df, aggregates, start_date=None, end_date=None):
+        """Process worker data from stored aggregates instead of raw attendance"""
+        if workers_df.empty:
+            self.processed_data = pd.DataFrame()
+            logger.info("Processed data for 0 workers")
+            return self.processed_data
+        
+        features = self.features_from_aggregates(aggregates, self._worker_sites(workers_df), start_date, end_date)
+        return self._build_processed_data(workers_df, features)
+    
+    def _worker_sites(self, workers_df):
+        """userId to site mapping, if workers carry a site column"""
+        if Config.SITE_COLUMN not in workers_df:
+            return None
+        return workers_df.set_index('userId')[Config.SITE_COLUMN]
+    
+    def _build_processed_data(self, workers_df, features):
+        """Join per-worker features onto the worker list"""
+        worker_ids = workers_df['userId']
+        worker_features = features.reindex(worker_ids.values)
+        
+        self.processed_data = pd.DataFrame({
+            'userId': worker_ids.values,
+            'name': workers_df['name'].values if 'name' in workers_df else 'Unknown',
+            'email': workers_df['email'].values if 'email' in workers_df else '',
+            'workerId': workers_df['workerId'].values if 'workerId' in workers_df else '',
+            'attendance_rate': worker_features['attendance_rate'].fillna(0).values,
+            'avg_work_hours': worker_features['avg_work_hours'].where(features.index.get_indexer(worker_ids.values) >= 0, 0).values,
+            'punctuality_score': worker_features['punctuality_score'].fillna(0).values,
+            'consistency_score': worker_features['consistency_score'].fillna(0).values,
+            'total_records': worker_features['total_records'].fillna(0).astype(int).values
+        })
+        # Grouping columns for partitioned training
+        for column in Config.PARTITION_COLUMNS:
+            if column in workers_df:
+                self.processed_data[column] = workers_df[column].values
+        logger.info(f"Processed data for {len(self.processed_data)} workers")
         
         return self.processed_data
     
-    def _calculate_working_days_from_config(self):
-        """Calculate working days from config date range excluding weekends"""
-        from config import Config
-        start_date = datetime.strptime(Config.START_DATE, '%Y-%m-%d')
-        end_date = datetime.strptime(Config.END_DATE, '%Y-%m-%d')
-        
-        working_days = 0
-        current_date = start_date
-        
-        while current_date <= end_date:
-            # Monday = 0, Sunday = 6
-            if current_date.weekday() < 5:  # Monday to Friday
-                working_days += 1
-            current_date += timedelta(days=1)
-        
-        return working_days
-    
-    def _is_punctual(self, clock_in_time, clock_out_time):
-        """Check if worker was punctual (simplified logic)"""
-        try:
-            # Parse time strings (format: "2024-12-19 09:43:30")
-            if not clock_in_time or not clock_out_time:
-                return False
-            
-            # Extract hour from clock in time (format: "2024-12-19 09:43:30")
-            time_part = clock_in_time.split(' ')[1]  # Get "09:43:30"
-            clock_in_hour = int(time_part.split(':')[0])  # Get hour
-            
-            # Consider punctual if clocked in before 8 AM (adjust as needed)
-            # You can modify this logic based on your company's work hours
-            return clock_in_hour <= 7  # Punctual if clock in at 7 AM or earlier
-        except:
-            return False
+    @staticmethod
+    def _consistency_from_std(std_dev, approved_days):
+        """Convert work-hour standard deviation to a 0-100 consistency score"""
+        max_std = 4  # Assume max std deviation of 4 hours
+        consistency_score = ((max_std - std_dev) / max_std * 100).clip(lower=0).fillna(0)
+        return consistency_score.where(approved_days >= 2, 0)
+    
+    def _calculate_working_days_from_config(self, site=None, start_date=None, end_date=None):
+        """Calculate working days from config date range using the site calendar"""
+        return working_days_in_range(start_date, end_date, site=site)
+    
+    def _working_days_for_workers(self, worker_ids, worker_sites=None, start_date=None, end_date=None):
+        """Working days for each worker, resolved once per distinct site"""
+        default_days = self._calculate_working_days_from_config(None, start_date, end_date)
+        
+        if worker_sites is None:
+            return pd.Series(default_days, index=worker_ids, dtype=float)
+        
+        sites = worker_sites[~worker_sites.index.duplicated()].reindex(worker_ids)
+        days_by_site = {
+            site: self._calculate_working_days_from_config(site, start_date, end_date)
+            for site in sites.dropna().unique()
+        }
+        return sites.map(days_by_site).fillna(default_days).astype(float)
     
     def get_feature_matrix(self):
         """Get feature matrix for clustering"""
@@ -0,0 +1,145 @@
+import pandas as pd
+import joblib
+import os
+from datetime import datetime, timedelta
+from config import Config
+from data_processor import AGGREGATE_COLUMNS, parse_attendance_times
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Config values the stored aggregates (or the features built from them) depend on
+STATE_CONFIG = [
+    'START_DATE', 'PUNCTUALITY_CUTOFF_HOUR', 'SHIFT_COLUMN', 'SHIFT_PUNCTUALITY_CUTOFFS',
+    'HOLIDAYS', 'WEEKMASK', 'SITE_CALENDARS'
+]
+
+def _state_config():
+    return {name: getattr(Config, name) for name in STATE_CONFIG}
+
+class FeatureStore:
+    """Persistent per-worker attendance aggregates with a high-water mark per source
+    
+    Aggregates are the mergeable sufficient statistics produced by
+    DataProcessor.aggregate_attendance. Days up to the watermark are settled
+    and summed into `aggregates`; the trailing
+    Config.FEATURE_STORE_CORRECTION_DAYS are kept per day in `recent` and
+    re-fetched on every run, so late approvals and edits to recent
+    attendance replace what was stored instead of being missed.
+    """
+    
+    VERSION = 2
+    
+    def __init__(self, path=None):
+        self.path = path or Config.FEATURE_STORE_PATH
+        self.config = _state_config()
+        self.aggregates = pd.DataFrame(columns=AGGREGATE_COLUMNS, dtype=float)
+        self.recent = {}
+        self.watermarks = {}
+    
+    def load(self):
+        """Load the store from disk; returns False if it is missing or stale"""
+        if not os.path.exists(self.path):
+            logger.info(f"No feature store found at {self.path}, starting empty")
+            return False
+        
+        try:
+            state = joblib.load(self.path)
+        except Exception as e:
+            logger.error(f"Error loading feature store: {e}")
+            return False
+        
+        if state.get('version') != self.VERSION or state.get('config') != self.config:
+            logger.warning("Feature store was built for a different version or feature settings, rebuilding")
+            return False
+        
+        self.aggregates = state['aggregates']
+        self.recent = state['recent']
+        self.watermarks = state['watermarks']
+        logger.info(f"Loaded feature store with {len(self.aggregates)} workers, watermarks: {self.watermarks}")
+        return True
+    
+    def save(self):
+        """Persist aggregates and watermarks"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        joblib.dump({
+            'version': self.VERSION,
+            'config': self.config,
+            'aggregates': self.aggregates,
+            'recent': self.recent,
+            'watermarks': self.watermarks
+        }, self.path)
+        logger.info(f"Feature store saved to {self.path}")
+    
+    def pending_range(self, source='attendance', through_date=None):
+        """Date range (inclusive 'YYYY-MM-DD' strings) to fetch for a source
+        
+        Starts after the settled watermark, so it includes the correction
+        window. Only complete days are merged: through_date defaults to
+        yesterday, capped at Config.END_DATE. Returns None when there is
+        nothing to fetch.
+        """
+        if through_date is None:
+            through_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        through_date = min(through_date, Config.END_DATE)
+        
+        watermark = self.watermarks.get(source)
+        if watermark is None:
+            start_date = Config.START_DATE
+        else:
+            start_date = (datetime.strptime(watermark, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        if start_date > through_date:
+            return None
+        return start_date, through_date
+    
+    @staticmethod
+    def daily_aggregates(data_processor, attendance_df):
+        """aggregate_attendance per day, indexed by (date 'YYYY-MM-DD', userId); None when empty"""
+        attendance_df = parse_attendance_times(attendance_df)
+        days = attendance_df['date'].dt.strftime('%Y-%m-%d')
+        daily = {
+            day: data_processor.aggregate_attendance(day_df)
+            for day, day_df in attendance_df.groupby(days, sort=True)
+        }
+        if not daily:
+            return None
+        return pd.concat(daily, names=['date', 'userId'])
+    
+    def merge(self, new_daily_aggregates, through_date, source='attendance'):
+        """Replace the fetched range with new daily aggregates and settle days past the correction window
+        
+        new_daily_aggregates (from daily_aggregates) covers everything
+        pending_range returned and may be None when it had no records.
+        """
+        settle_through = (
+            datetime.strptime(through_date, '%Y-%m-%d') - timedelta(days=Config.FEATURE_STORE_CORRECTION_DAYS)
+        ).strftime('%Y-%m-%d')
+        settle_through = max(settle_through, self.watermarks.get(source, ''))
+        
+        settled_workers = 0
+        recent = None
+        if new_daily_aggregates is not None:
+            days = new_daily_aggregates.index.get_level_values('date')
+            settled = new_daily_aggregates[days <= settle_through]
+            if not settled.empty:
+                settled = settled[AGGREGATE_COLUMNS].groupby(level='userId').sum()
+                self.aggregates = self.aggregates.add(settled, fill_value=0)
+                settled_workers = len(settled)
+            recent = new_daily_aggregates[days > settle_through]
+        
+        self.recent[source] = recent
+        if settle_through >= Config.START_DATE:
+            self.watermarks[source] = settle_through
+        logger.info(
+            f"Settled aggregates for {settled_workers} workers, {source} watermark now {settle_through}, "
+            f"days after it are re-fetched next run"
+        )
+    
+    def totals(self):
+        """Settled aggregates plus the current correction window, per worker"""
+        totals = self.aggregates
+        for recent in self.recent.values():
+            if recent is not None and not recent.empty:
+                totals = totals.add(recent[AGGREGATE_COLUMNS].groupby(level='userId').sum(), fill_value=0)
+        return totals
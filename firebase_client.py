@@ -0,0 +1,275 @@
+import firebase_admin
+from firebase_admin import credentials, firestore
+from config import Config
+from data_processor import compact_attendance_frame
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FirebaseClient:
+    def __init__(self, db=None):
+        """Initialize Firebase client
+        
+        Pass db to use an existing client instead of the Admin SDK, e.g. a
+        local_firestore.LocalFirestoreClient. Setting FIRESTORE_EMULATOR_HOST
+        points the Admin SDK client at the Firestore emulator.
+        """
+        self.last_ingest_stats = None
+        
+        if db is not None:
+            self.db = db
+            logger.info("Firebase client initialized with provided database")
+            return
+        
+        try:
+            # Initialize Firebase Admin SDK
+            cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS_PATH)
+            firebase_admin.initialize_app(cred)
+            self.db = firestore.client()
+            logger.info("Firebase client initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing Firebase: {e}")
+            raise
+    
+    def get_users_data(self):
+        """Fetch all users data from Firestore"""
+        try:
+            users_ref = self.db.collection('users')
+            users = users_ref.stream()
+            
+            users_data = []
+            for user in users:
+                user_data = user.to_dict()
+                user_data['userId'] = user.id
+                users_data.append(user_data)
+            
+            logger.info(f"Fetched {len(users_data)} users")
+            return users_data
+        except Exception as e:
+            logger.error(f"Error fetching users: {e}")
+            return []
+    
+    def get_attendance_data(self):
+        """Fetch attendance data from Firestore for the configured date range
+        
+        Timestamps are kept as the datetime objects Firestore returns; they
+        are parsed into datetime64 columns once in get_worker_performance_data.
+        """
+        try:
+            # Use configured date range instead of days_back
+            start_date = datetime.strptime(Config.START_DATE, '%Y-%m-%d')
+            end_date = datetime.strptime(Config.END_DATE, '%Y-%m-%d')
+            
+            # Debug: Print date range
+            logger.info(f"Searching attendance from {Config.START_DATE} to {Config.END_DATE}")
+            
+            attendance_ref = self.db.collection('attendance')
+            
+            # Since Firestore uses DatetimeWithNanoseconds, we need to filter differently
+            # Convert our datetime to Firestore timestamp format
+            start_timestamp = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            end_timestamp = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+            
+            # Query with timestamp comparison
+            query = attendance_ref.where('date', '>=', start_timestamp).where('date', '<=', end_timestamp)
+            
+            attendance_docs = query.stream()
+            
+            attendance_data = []
+            for doc in attendance_docs:
+                attendance_record = doc.to_dict()
+                attendance_record['attendanceId'] = doc.id
+                attendance_data.append(attendance_record)
+            
+            # If no data found with date filter, try without filter
+            if not attendance_data:
+                logger.warning("No data found with date filter, trying to get recent data...")
+                recent_query = attendance_ref.order_by('date', direction=firestore.Query.DESCENDING).limit(100)
+                recent_docs = recent_query.stream()
+                
+                for doc in recent_docs:
+                    attendance_record = doc.to_dict()
+                    attendance_record['attendanceId'] = doc.id
+                    
+                    # Check if this record is within our date range
+                    if 'date' in attendance_record and attendance_record['date']:
+                        record_date = attendance_record['date'].replace(tzinfo=None)
+                        if start_date <= record_date <= end_date:
+                            attendance_data.append(attendance_record)
+                
+                logger.info(f"Found {len(attendance_data)} attendance records within date range")
+            
+            logger.info(f"Total fetched: {len(attendance_data)} attendance records")
+            
+            # Debug: Show sample of processed data
+            if attendance_data:
+                logger.info("Sample processed attendance:")
+                sample = attendance_data[0]
+                logger.info(f"  Date: {sample.get('date', 'N/A')}")
+                logger.info(f"  User ID: {sample.get('userId', 'N/A')}")
+                logger.info(f"  Work Minutes: {sample.get('workMinutes', 'N/A')}")
+                logger.info(f"  Status: {sample.get('status', 'N/A')}")
+            
+            return attendance_data
+        except Exception as e:
+            logger.error(f"Error fetching attendance: {e}")
+            return []
+    
+    def get_attendance_frame(self, start_date=None, end_date=None):
+        """Fetch attendance as a DataFrame using parallel, cursor-paginated reads
+        
+        The date range is split into partitions of Config.INGEST_PARTITION_DAYS
+        that are fetched concurrently. Each partition is paged with
+        start_after cursors and only Config.ATTENDANCE_FIELDS are selected,
+        appending straight into per-column lists.
+        """
+        start_date = datetime.strptime(start_date or Config.START_DATE, '%Y-%m-%d')
+        end_date = datetime.strptime(end_date or Config.END_DATE, '%Y-%m-%d') + timedelta(days=1)
+        
+        fields = list(Config.ATTENDANCE_FIELDS)
+        if Config.SHIFT_PUNCTUALITY_CUTOFFS and Config.SHIFT_COLUMN not in fields:
+            fields.append(Config.SHIFT_COLUMN)
+        
+        partitions = self._partition_date_range(start_date, end_date, Config.INGEST_PARTITION_DAYS)
+        logger.info(
+            f"Fetching attendance from {start_date:%Y-%m-%d} to {end_date - timedelta(days=1):%Y-%m-%d} "
+            f"in {len(partitions)} partitions"
+        )
+        
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=Config.INGEST_MAX_WORKERS) as executor:
+            partition_columns = list(executor.map(
+                lambda bounds: self._fetch_partition(bounds[0], bounds[1], fields),
+                partitions
+            ))
+        elapsed = time.perf_counter() - started
+        
+        # Partitions are returned in date order; concatenate column by column
+        columns = {column: [] for column in ['attendanceId'] + fields}
+        for partition in partition_columns:
+            for column, values in partition.items():
+                columns[column].extend(values)
+        
+        attendance_df = pd.DataFrame(columns)
+        records = len(attendance_df)
+        
+        self.last_ingest_stats = {
+            'records': records,
+            'partitions': len(partitions),
+            'seconds': elapsed,
+            'records_per_second': records / elapsed if elapsed > 0 else 0.0
+        }
+        logger.info(
+            f"Fetched {records} attendance records in {elapsed:.2f}s "
+            f"({self.last_ingest_stats['records_per_second']:.0f} records/s)"
+        )
+        
+        return attendance_df
+    
+    def _partition_date_range(self, start_date, end_date, partition_days):
+        """Split [start_date, end_date) into consecutive half-open partitions"""
+        partitions = []
+        current = start_date
+        while current < end_date:
+            partition_end = min(current + timedelta(days=partition_days), end_date)
+            partitions.append((current, partition_end))
+            current = partition_end
+        return partitions
+    
+    def _fetch_partition(self, start, end, fields):
+        """Fetch one date partition page by page into column lists"""
+        columns = {column: [] for column in ['attendanceId'] + fields}
+        
+        for page in self._iter_partition_pages(start, end, fields):
+            for column, values in page.items():
+                columns[column].extend(values)
+        
+        return columns
+    
+    def _iter_partition_pages(self, start, end, fields):
+        """Yield one date partition as column lists, one cursor page at a time"""
+        query = (
+            self.db.collection('attendance')
+            .where('date', '>=', start)
+            .where('date', '<', end)
+            .order_by('date')
+            .select(fields)
+        )
+        
+        last_doc = None
+        while True:
+            page_query = query.limit(Config.INGEST_PAGE_SIZE)
+            if last_doc is not None:
+                page_query = page_query.start_after(last_doc)
+            
+            columns = {column: [] for column in ['attendanceId'] + fields}
+            for doc in page_query.stream():
+                record = doc.to_dict()
+                columns['attendanceId'].append(doc.id)
+                for field in fields:
+                    columns[field].append(record.get(field))
+                last_doc = doc
+            
+            page_size = len(columns['attendanceId'])
+            if page_size:
+                yield columns
+            
+            if page_size < Config.INGEST_PAGE_SIZE:
+                break
+    
+    def iter_attendance_chunks(self, start_date=None, end_date=None, chunk_size=None):
+        """Yield attendance as compact DataFrames of about chunk_size records
+        
+        Pages are read sequentially and buffered only until a chunk is full,
+        so memory stays bounded by the chunk size.
+        """
+        chunk_size = chunk_size or Config.STREAMING_CHUNK_SIZE
+        start_date = datetime.strptime(start_date or Config.START_DATE, '%Y-%m-%d')
+        end_date = datetime.strptime(end_date or Config.END_DATE, '%Y-%m-%d') + timedelta(days=1)
+        
+        fields = list(Config.ATTENDANCE_FIELDS)
+        if Config.SHIFT_PUNCTUALITY_CUTOFFS and Config.SHIFT_COLUMN not in fields:
+            fields.append(Config.SHIFT_COLUMN)
+        
+        buffer = {column: [] for column in ['attendanceId'] + fields}
+        for start, end in self._partition_date_range(start_date, end_date, Config.INGEST_PARTITION_DAYS):
+            for page in self._iter_partition_pages(start, end, fields):
+                for column, values in page.items():
+                    buffer[column].extend(values)
+                
+                if len(buffer['attendanceId']) >= chunk_size:
+                    yield compact_attendance_frame(pd.DataFrame(buffer), log_memory=False)
+                    buffer = {column: [] for column in buffer}
+        
+        if buffer['attendanceId']:
+            yield compact_attendance_frame(pd.DataFrame(buffer), log_memory=False)
+    
+    def get_workers_frame(self):
+        """Fetch users as a DataFrame, keeping only workers (not admin/HRD)"""
+        users_df = pd.DataFrame(self.get_users_data())
+        if users_df.empty:
+            return users_df
+        return users_df[users_df['role'] != 'admin'].copy()
+    
+    def get_worker_performance_data(self):
+        """Get comprehensive worker performance data"""
+        # Convert to DataFrames for easier processing
+        workers_df = self.get_workers_frame()
+        if Config.PARALLEL_INGEST:
+            attendance_df = self.get_attendance_frame()
+        else:
+            attendance_df = pd.DataFrame(self.get_attendance_data())
+        
+        if attendance_df.empty:
+            logger.warning("No attendance data found")
+            return pd.DataFrame()
+        
+        # Parse timestamps once and drop everything feature building doesn't use
+        attendance_df = compact_attendance_frame(attendance_df)
+        
+        return workers_df, attendance_df
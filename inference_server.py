@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Local HTTP inference service for worker performance prediction
+
+    POST /predict   {"features": [attendance_rate, avg_work_hours, punctuality_score, consistency_score]}
+                    {"features": {"attendance_rate": 95.0, ...}}
+                    {"instances": [[...], [...]]}
+    GET  /metrics   p50/p99 latency, throughput and batch statistics
+    GET  /health
+
+Concurrent requests are micro-batched into one vectorized distance
+computation. Only the standard library and NumPy are used at serve time.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from collections import deque
+from http import HTTPStatus
+import numpy as np
+
+from numpy_predictor import NumpyPredictor
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+class LatencyMetrics:
+    """Rolling request latency percentiles and throughput"""
+    
+    def __init__(self, window=None):
+        self.latencies = deque(maxlen=window or Config.SERVER_METRICS_WINDOW)
+        self.batch_sizes = deque(maxlen=window or Config.SERVER_METRICS_WINDOW)
+        self.requests = 0
+        self.predictions = 0
+        self.errors = 0
+        self.started_at = time.perf_counter()
+    
+    def record_request(self, seconds, predictions):
+        self.latencies.append(seconds)
+        self.requests += 1
+        self.predictions += predictions
+    
+    def record_batch(self, size):
+        self.batch_sizes.append(size)
+    
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started_at
+        latencies_ms = np.array(self.latencies) * 1000
+        p50, p99 = np.percentile(latencies_ms, [50, 99]) if len(latencies_ms) else (0.0, 0.0)
+        return {
+            'requests': self.requests,
+            'predictions': self.predictions,
+            'errors': self.errors,
+            'uptime_seconds': uptime,
+            'throughput_rps': self.requests / uptime if uptime > 0 else 0.0,
+            'latency_p50_ms': float(p50),
+            'latency_p99_ms': float(p99),
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0
+        }
+
+class MicroBatcher:
+    """Collect concurrent predictions and run them as one NumPy batch
+    
+    A batch is flushed when it reaches Config.SERVER_MAX_BATCH_SIZE rows or
+    Config.SERVER_MAX_WAIT_MS after its first row arrived.
+    """
+    
+    def __init__(self, mean, scale, centers, metrics, max_batch_size=None, max_wait_ms=None):
+        self.mean = mean
+        self.scale = scale
+        self.centers = centers
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size or Config.SERVER_MAX_BATCH_SIZE
+        self.max_wait = (Config.SERVER_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self.queue = asyncio.Queue()
+        self._task = None
+    
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+    
+    async def predict(self, rows):
+        """Queue feature rows; resolves to (clusters, distances) for those rows"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row in rows:
+            future = loop.create_future()
+            await self.queue.put((row, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                self._compute(batch)
+            except Exception as e:
+                # Fail only this batch's requests; the batcher keeps serving
+                logger.error(f"Batch of {len(batch)} rows failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def _compute(self, batch):
+        X = (np.array([row for row, _ in batch], dtype=np.float64) - self.mean) / self.scale
+        squared = ((X[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=2)
+        clusters = squared.argmin(axis=1)
+        distances = np.sqrt(squared)
+        
+        self.metrics.record_batch(len(batch))
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((int(clusters[i]), distances[i]))
+
+class InferenceServer:
+    """Minimal HTTP/1.1 server around the saved K-means model (binary artifact)"""
+    
+    def __init__(self, host=None, port=None):
+        self.host = host or Config.SERVER_HOST
+        self.port = port or Config.SERVER_PORT
+        self.predictor = None
+        self.metrics = LatencyMetrics()
+        self.batcher = None
+        self.performance_mapping = None
+    
+    def load(self):
+        """Load the model artifact once and keep its parameters resident as arrays"""
+        try:
+            self.predictor = NumpyPredictor.load()
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"Error loading model: {e}")
+            return False
+        
+        self.performance_mapping = self.predictor.performance_mapping
+        self.batcher = MicroBatcher(
+            mean=self.predictor.mean,
+            scale=self.predictor.scale,
+            centers=self.predictor.centers,
+            metrics=self.metrics
+        )
+        return True
+    
+    def _parse_rows(self, payload):
+        feature_names = self.predictor.feature_names
+        rows = payload['instances'] if 'instances' in payload else [payload['features']]
+        
+        parsed = []
+        for row in rows:
+            if isinstance(row, dict):
+                row = [row[name] for name in feature_names]
+            if len(row) != len(feature_names):
+                raise ValueError(f"Expected {len(feature_names)} features ({', '.join(feature_names)}), got {len(row)}")
+            parsed.append([float(value) for value in row])
+        if not np.isfinite(np.array(parsed, dtype=np.float64)).all():
+            raise ValueError("Features must be finite numbers (no NaN or Infinity)")
+        return parsed
+    
+    async def _predict(self, payload):
+        started = time.perf_counter()
+        rows = self._parse_rows(payload)
+        results = await self.batcher.predict(rows)
+        
+        predictions = []
+        for cluster, distances in results:
+            # Relative gap between the nearest and second-nearest center
+            sorted_distances = np.sort(distances)
+            margin = 1.0
+            if len(sorted_distances) > 1 and sorted_distances[1] > 0:
+                margin = float((sorted_distances[1] - sorted_distances[0]) / sorted_distances[1])
+            
+            predictions.append({
+                'cluster': cluster,
+                'performance_label': self.performance_mapping.get(cluster),
+                'distances': distances.tolist(),
+                'confidence_margin': margin
+            })
+        
+        self.metrics.record_request(time.perf_counter() - started, len(predictions))
+        return {'predictions': predictions}
+    
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'n_clusters': self.predictor.n_clusters}
+        if method == 'GET' and path == '/metrics':
+            return HTTPStatus.OK, self.metrics.snapshot()
+        if method == 'POST' and path == '/predict':
+            try:
+                return HTTPStatus.OK, await self._predict(json.loads(body or b'{}'))
+            except (ValueError, KeyError, TypeError) as e:
+                self.metrics.errors += 1
+                return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+            except Exception as e:
+                self.metrics.errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+        return HTTPStatus.NOT_FOUND, {'error': f"No route for {method} {path}"}
+    
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection (keep-alive) until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, response = await self._route(method, path.split('?', 1)[0], body)
+                
+                payload = json.dumps(response).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def serve(self):
+        """Start the batcher and serve until cancelled"""
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        logger.info(f"Inference server listening on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+def parse_args(argv=None):
+    """Parse command line options for the inference server"""
+    parser = argparse.ArgumentParser(description="Serve worker performance predictions over HTTP")
+    parser.add_argument('--host', default=None, help="Bind address (defaults to Config.SERVER_HOST)")
+    parser.add_argument('--port', type=int, default=None, help="Port (defaults to Config.SERVER_PORT)")
+    return parser.parse_args(argv)
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    
+    server = InferenceServer(host=args.host, port=args.port)
+    if not server.load():
+        logger.error("No saved model to serve, run main.py first")
+        return False
+    
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        logger.info(f"Shutting down, final metrics: {server.metrics.snapshot()}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
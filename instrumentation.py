@@ -0,0 +1,165 @@
+"""
+Per-stage wall time, CPU time, memory and throughput for pipeline runs.
+
+    profiler = RunProfiler(enabled=True, profile_stage='train')
+    with profiler.stage('train', rows_in=len(feature_matrix)) as stage:
+        labels = model.train_model(...)
+        stage['rows_out'] = len(labels)
+    profiler.save_report(success=True)
+
+A disabled profiler still runs the stages, it just records nothing. Peak
+RSS is per stage on Linux (the kernel high-water mark is reset through
+/proc/self/clear_refs at each stage start); elsewhere it is the process
+peak so far, and the report says which.
+"""
+
+import os
+import json
+import time
+import cProfile
+import pstats
+import platform
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+import logging
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+def _status_kb(field):
+    """A VmRSS/VmHWM style value from /proc/self/status in kB, or None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss():
+    """Reset the kernel's RSS high-water mark; returns False where unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_kb():
+    peak = _status_kb('VmHWM')
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak
+
+def _children_cpu_seconds():
+    """CPU time of finished child processes (process pools shut down within a stage)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class RunProfiler:
+    def __init__(self, enabled=False, profile_stage=None):
+        self.enabled = enabled or profile_stage is not None
+        self.profile_stage = profile_stage
+        self.stages = []
+        self.profile_path = None
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Measure one stage; the yielded dict takes rows_out and extra details"""
+        record = {'stage': name, 'rows_in': rows_in}
+        if not self.enabled:
+            yield record
+            return
+        
+        per_stage_peak = _reset_peak_rss()
+        rss_start = _status_kb('VmRSS')
+        cpu_start = time.process_time()
+        children_start = _children_cpu_seconds()
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        
+        started = time.perf_counter()
+        status = 'failed'
+        try:
+            if profiler is not None:
+                profiler.enable()
+            yield record
+            status = 'ok'
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - started
+            rows = record.get('rows_out') if record.get('rows_in') is None else record['rows_in']
+            peak = _peak_rss_kb()
+            
+            record.update({
+                'status': status,
+                'wall_seconds': wall,
+                'cpu_seconds': time.process_time() - cpu_start,
+                'child_cpu_seconds': _children_cpu_seconds() - children_start,
+                'rss_start_mb': rss_start / 1024 if rss_start is not None else None,
+                'rss_end_mb': _status_kb('VmRSS') / 1024 if rss_start is not None else None,
+                'rss_peak_mb': peak / 1024 if peak is not None else None,
+                'rss_peak_scope': 'stage' if per_stage_peak else 'process',
+                'rows_per_second': rows / wall if rows and wall > 0 else None
+            })
+            self.stages.append(record)
+            
+            logger.info(
+                f"[stage] {name}: {wall:.2f}s wall, {record['cpu_seconds']:.2f}s CPU"
+                + (f", peak RSS {record['rss_peak_mb']:.0f} MB" if peak is not None else "")
+                + (f", {record['rows_per_second']:,.0f} rows/s" if record['rows_per_second'] else "")
+            )
+            if profiler is not None:
+                self._dump_profile(profiler, name)
+    
+    def _dump_profile(self, profiler, name):
+        """Write a pstats dump (snakeviz, gprof2dot and flameprof read it) and log the top entries"""
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        self.profile_path = os.path.join(Config.PROFILE_DIR, f'profile_{name}.prof')
+        profiler.dump_stats(self.profile_path)
+        
+        stats = pstats.Stats(profiler)
+        top = [
+            f"{func[2]} ({os.path.basename(func[0])}:{func[1]}) {stat[3]:.3f}s"
+            for func, stat in sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:Config.PROFILE_TOP_N]
+        ]
+        logger.info(f"Profile of stage '{name}' saved to {self.profile_path}, top cumulative:\n  " + "\n  ".join(top))
+    
+    def report(self, success, **extra):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+        return {
+            'created_at': self.started_at.isoformat(),
+            'success': success,
+            'total_wall_seconds': time.perf_counter() - self._started,
+            'process_peak_rss_mb': peak / 1024 if peak is not None else None,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'profile_path': self.profile_path,
+            'stages': self.stages,
+            **extra
+        }
+    
+    def save_report(self, success, path=None, **extra):
+        """Write the JSON run report (Config.RUN_REPORT_PATH); no-op when disabled"""
+        if not self.enabled:
+            return None
+        
+        path = path or Config.RUN_REPORT_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(success, **extra), f, indent=2, default=str)
+        logger.info(f"Run report saved to {path}")
+        return path
@@ -0,0 +1,177 @@
+import numpy as np
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.cluster import KMeans
+from sklearn.metrics import pairwise_distances_argmin_min
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+def kmeans_parallel_init(X, n_clusters, random_state, oversampling=None, rounds=None):
+    """k-means|| seeding (Bahmani et al.)
+    
+    Each round samples about `oversampling` points in proportion to their
+    squared distance from the current candidates. The weighted candidates
+    are then reduced to n_clusters centers with k-means++.
+    """
+    rng = np.random.default_rng(random_state)
+    oversampling = oversampling or 2 * n_clusters
+    rounds = rounds or Config.KMEANS_PARALLEL_ROUNDS
+    
+    candidates = X[[rng.integers(len(X))]]
+    closest_sq = pairwise_distances_argmin_min(X, candidates)[1] ** 2
+    
+    for _ in range(rounds):
+        cost = closest_sq.sum()
+        if cost == 0:
+            break
+        chosen = rng.random(len(X)) < np.minimum(oversampling * closest_sq / cost, 1)
+        if not chosen.any():
+            continue
+        new_candidates = X[chosen]
+        candidates = np.vstack([candidates, new_candidates])
+        closest_sq = np.minimum(closest_sq, pairwise_distances_argmin_min(X, new_candidates)[1] ** 2)
+    
+    if len(candidates) <= n_clusters:
+        # Too few distinct candidates to reduce; let k-means++ seed from the data
+        return 'k-means++'
+    
+    weights = np.bincount(pairwise_distances_argmin_min(X, candidates)[0], minlength=len(candidates))
+    return KMeans(
+        n_clusters=n_clusters, init='k-means++', n_init=1, random_state=random_state
+    ).fit(candidates, sample_weight=weights).cluster_centers_
+
+def _fit_restart(X_scaled, n_clusters, init, seed):
+    """One K-means run from the given init strategy or starting centers"""
+    started = time.perf_counter()
+    if isinstance(init, str) and init == 'k-means||':
+        init = kmeans_parallel_init(np.asarray(X_scaled), n_clusters, seed)
+    model = KMeans(n_clusters=n_clusters, init=init, n_init=1, max_iter=300, random_state=seed).fit(X_scaled)
+    
+    return {
+        'seed': seed,
+        'inertia': float(model.inertia_),
+        'n_iter': int(model.n_iter_),
+        'seconds': time.perf_counter() - started,
+        'centers': model.cluster_centers_
+    }
+
+def _run_restart(matrix_path, n_clusters, init, seed):
+    """Worker process entry point: run one restart on the shared memory-mapped matrix"""
+    return _fit_restart(np.load(matrix_path, mmap_mode='r'), n_clusters, init, seed)
+
+class ParallelKMeans:
+    """K-means with restarts spread over a process pool
+    
+    init is 'k-means++', 'k-means||' or an array of starting centers (warm
+    start, run once). Restarts get independent seeds spawned from
+    Config.RANDOM_STATE and stop early once Config.RESTART_AGREEMENT
+    restarts reach the same inertia (within Config.RESTART_TOL). Cold-start
+    clusters are renumbered in a canonical order (ascending weighted center
+    score) so cluster IDs do not depend on which seed won.
+    """
+    
+    def __init__(self, n_clusters=None, init=None, n_restarts=None, max_workers=None, feature_names=None):
+        self.n_clusters = n_clusters or Config.N_CLUSTERS
+        self.init = Config.KMEANS_INIT if init is None else init
+        self.n_restarts = n_restarts or Config.N_RESTARTS
+        self.max_workers = max_workers or Config.RESTART_MAX_WORKERS or os.cpu_count()
+        self.feature_names = feature_names
+        self.restarts_ = []
+        self.model_ = None
+    
+    @property
+    def warm_start(self):
+        return not isinstance(self.init, str)
+    
+    def _seeds(self):
+        children = np.random.SeedSequence(Config.RANDOM_STATE).spawn(self.n_restarts)
+        return [int(child.generate_state(1)[0]) for child in children]
+    
+    def _agreed(self, results):
+        """Best result by (inertia, restart index) once enough restarts agree with it, else None"""
+        best = min(results, key=lambda result: (result['inertia'], result['index']))
+        agreeing = [result for result in results if result['inertia'] <= best['inertia'] * (1 + Config.RESTART_TOL)]
+        if len(agreeing) < Config.RESTART_AGREEMENT:
+            return None
+        return best
+    
+    def fit(self, X_scaled):
+        """Run the restarts and return a fitted sklearn KMeans for the best one"""
+        started = time.perf_counter()
+        
+        if self.warm_start:
+            self.restarts_ = [{'index': 0, **_fit_restart(X_scaled, self.n_clusters, self.init, Config.RANDOM_STATE)}]
+            best = self.restarts_[0]
+        elif self.n_restarts == 1 or self.max_workers == 1:
+            self.restarts_ = []
+            best = None
+            for index, seed in enumerate(self._seeds()):
+                self.restarts_.append({'index': index, **_fit_restart(X_scaled, self.n_clusters, self.init, seed)})
+                best = self._agreed(self.restarts_)
+                if best is not None:
+                    break
+        else:
+            best = self._fit_parallel(X_scaled)
+        
+        stopped_early = len(self.restarts_) < self.n_restarts and not self.warm_start
+        if best is None:
+            best = min(self.restarts_, key=lambda result: (result['inertia'], result['index']))
+        
+        centers = best['centers'] if self.warm_start else self._canonical_order(best['centers'])
+        
+        # Refit from the winning centers to get a complete estimator (converges immediately)
+        self.model_ = KMeans(n_clusters=self.n_clusters, init=centers, n_init=1, max_iter=300).fit(X_scaled)
+        
+        logger.info(
+            f"K-means ({'warm start' if self.warm_start else self.init}) finished {len(self.restarts_)} "
+            f"restart(s){' (stopped early, restarts agreed)' if stopped_early else ''} in "
+            f"{time.perf_counter() - started:.2f}s, inertia {self.model_.inertia_:.4f}"
+        )
+        return self.model_
+    
+    def _fit_parallel(self, X_scaled):
+        """Run restarts in waves of max_workers, checking agreement after each wave
+        
+        No restart is left running when the restarts agree, and the results
+        seen at each check do not depend on completion order.
+        """
+        self.restarts_ = []
+        seeds = list(enumerate(self._seeds()))
+        wave_size = min(self.max_workers, self.n_restarts)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            matrix_path = os.path.join(tmp_dir, 'X_scaled.npy')
+            np.save(matrix_path, X_scaled)
+            
+            with ProcessPoolExecutor(max_workers=wave_size) as executor:
+                for start in range(0, len(seeds), wave_size):
+                    futures = [
+                        (index, executor.submit(_run_restart, matrix_path, self.n_clusters, self.init, seed))
+                        for index, seed in seeds[start:start + wave_size]
+                    ]
+                    self.restarts_.extend({'index': index, **future.result()} for index, future in futures)
+                    best = self._agreed(self.restarts_)
+                    if best is not None:
+                        return best
+        return None
+    
+    def _canonical_order(self, centers):
+        """Order centers by their weighted score so cluster IDs are reproducible"""
+        if self.feature_names is not None and all(name in Config.FEATURE_WEIGHTS for name in self.feature_names):
+            weights = np.array([Config.FEATURE_WEIGHTS[name] for name in self.feature_names])
+        else:
+            weights = np.ones(centers.shape[1])
+        order = np.lexsort(centers.T[::-1])  # tie-break on the coordinates
+        order = order[np.argsort((centers @ weights)[order], kind='stable')]
+        return centers[order]
+    
+    @property
+    def trace(self):
+        """Per-restart summary for the convergence trace"""
+        return [
+            {key: result[key] for key in ('index', 'seed', 'inertia', 'n_iter', 'seconds')}
+            for result in sorted(self.restarts_, key=lambda result: result['index'])
+        ]
@@ -1,49 +1,321 @@
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score
-import matplotlib.pyplot as plt
-import seaborn as sns
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
 import joblib
 import json
 import os
 from config import Config
+from cluster_evaluation import ClusterEvaluator
+from kmeans_engine import ParallelKMeans
+from model_artifact import ModelArtifact
 import logging
 
 logger = logging.getLogger(__name__)
 
+def performance_tier_labels(n_clusters):
+    """Performance label names ordered from lowest to highest scoring cluster"""
+    if n_clusters == len(Config.CLUSTER_LABELS):
+        return [Config.CLUSTER_LABELS[i] for i in range(n_clusters)]
+    if n_clusters == 1:
+        return ['Medium Performer']
+    
+    middle = ['Medium Performer'] if n_clusters == 3 else [
+        f'Medium Performer {tier}' for tier in range(1, n_clusters - 1)
+    ]
+    return ['Low Performer'] + middle + ['High Performer']
+
+def model_paths(model_dir=None):
+    """Artifact paths of a model set; the Config paths, or the same file names under model_dir"""
+    paths = {
+        'model': Config.MODEL_PATH,
+        'scaler': Config.SCALER_PATH,
+        'metadata': Config.METADATA_PATH,
+        'artifact': Config.ARTIFACT_PATH,
+        'assignments': Config.ASSIGNMENTS_PATH
+    }
+    if model_dir is None:
+        return paths
+    return {name: os.path.join(model_dir, os.path.basename(path)) for name, path in paths.items()}
+
 class WorkerKMeansModel:
-    def __init__(self):
+    def __init__(self, n_clusters=None, model_dir=None):
+        self.n_clusters = n_clusters or Config.N_CLUSTERS
+        self.paths = model_paths(model_dir)
         self.model = None
         self.scaler = StandardScaler()
         self.feature_names = None
         self.cluster_centers_ = None
         self.labels_ = None
+        self.evaluation_ = {}
+        self.cluster_matching_ = None
+        self.performance_mapping_ = None
+        self.assignments_ = None
+        self.label_changes_ = None
+        self.training_mode = None
+        self.convergence_trace_ = []
+        self._init_sample = None
+        self._init_sample_keys = None
+        self._sample_rng = np.random.default_rng(42)
+        
+    def train_model(self, feature_matrix, feature_names, mode=None, init=None):
+        """Train K-means clustering model
+        
+        mode is 'full' (KMeans), 'minibatch' (MiniBatchKMeans over shuffled
+        batches) or 'streaming' (train_streaming over chunks of
+        Config.STREAMING_TRAIN_CHUNK_SIZE rows); defaults to
+        Config.TRAINING_MODE. init ('k-means++',
+        'k-means||' or 'warm') selects the seeding for full training and
+        defaults to Config.KMEANS_INIT.
         
-    def train_model(self, feature_matrix, feature_names):
-        """Train K-means clustering model"""
+        With Config.STABLE_CLUSTER_IDS, clusters are renumbered to match the
+        saved model's so IDs keep their meaning across retrains.
+        """
         self.feature_names = feature_names
+        self.training_mode = mode or Config.TRAINING_MODE
+        init = init or Config.KMEANS_INIT
+        
+        previous_centers = None
+        if Config.STABLE_CLUSTER_IDS or (self.training_mode == 'full' and init == 'warm'):
+            previous_centers = self._previous_centers(feature_matrix)
+        
+        # Standardize features (streaming fits the scaler chunk by chunk instead)
+        if self.training_mode != 'streaming':
+            X_scaled = self.scaler.fit_transform(feature_matrix)
+        
+        if self.training_mode == 'minibatch':
+            self._train_minibatch(X_scaled)
+            self.labels_ = self.model.predict(X_scaled)
+        elif self.training_mode == 'full':
+            # Train K-means model (parallel restarts, or one run from the previous centers)
+            if init == 'warm':
+                if previous_centers is None:
+                    logger.warning("Warm start unavailable, using k-means++")
+                    init = 'k-means++'
+                else:
+                    init = self.scaler.transform(previous_centers)
+            engine = ParallelKMeans(n_clusters=self.n_clusters, init=init, feature_names=feature_names)
+            self.model = engine.fit(X_scaled)
+            
+            self.labels_ = self.model.labels_
+            self.convergence_trace_ = engine.trace + [
+                {'iteration': self.model.n_iter_, 'inertia': float(self.model.inertia_)}
+            ]
+        elif self.training_mode == 'streaming':
+            chunk_size = Config.STREAMING_TRAIN_CHUNK_SIZE
+            self.train_streaming(
+                lambda: (feature_matrix[start:start + chunk_size] for start in range(0, len(feature_matrix), chunk_size)),
+                feature_names, epochs=Config.STREAMING_EPOCHS
+            )
+            X_scaled = self.scaler.transform(feature_matrix)
+            self.labels_ = self.model.predict(X_scaled)
+        else:
+            raise ValueError(f"Unknown training mode: {self.training_mode}")
+        
+        self.cluster_centers_ = self.model.cluster_centers_
+        if Config.STABLE_CLUSTER_IDS and previous_centers is not None:
+            self.match_previous_clusters(previous_centers)
+        
+        # Evaluate clustering quality (metrics from Config.EVALUATION_METRICS)
+        self.evaluation_ = ClusterEvaluator().evaluate(X_scaled, self.labels_, self.cluster_centers_)
+        if 'silhouette' in self.evaluation_:
+            logger.info(f"Silhouette Score: {self.evaluation_['silhouette']['value']:.3f}")
+        
+        return self.labels_
+    
+    def _previous_centers(self, feature_matrix):
+        """Centers of the saved model in raw feature units, or None if unusable"""
+        try:
+            previous_model = joblib.load(self.paths['model'])
+            previous_scaler = joblib.load(self.paths['scaler'])
+        except Exception as e:
+            logger.info(f"No previous model found ({e})")
+            return None
+        
+        centers = previous_model.cluster_centers_
+        if centers.shape != (self.n_clusters, np.shape(feature_matrix)[1]):
+            logger.warning(f"Previous model has centers of shape {centers.shape}, not reusing it")
+            return None
+        
+        return previous_scaler.inverse_transform(centers)
+    
+    def match_previous_clusters(self, previous_centers):
+        """Renumber clusters to line up with the previous model's
+        
+        Solves the assignment problem (Hungarian algorithm) on the distances
+        between new and previous centers, both in the current scaled space,
+        then permutes the model's centers, labels and (mini-batch) center
+        counts accordingly. When a
+        matched center moved further than Config.CLUSTER_MATCH_MAX_DRIFT the
+        previous model is treated as unrelated and IDs are left as trained.
+        """
+        previous_scaled = self.scaler.transform(previous_centers)
+        cost = cdist(self.model.cluster_centers_, previous_scaled)
+        new_ids, previous_ids = linear_sum_assignment(cost)
         
-        # Standardize features
-        X_scaled = self.scaler.fit_transform(feature_matrix)
+        center_drift = cost[new_ids, previous_ids][np.argsort(previous_ids)].tolist()
+        if max(center_drift) > Config.CLUSTER_MATCH_MAX_DRIFT:
+            self.cluster_matching_ = {
+                'skipped': True,
+                'reason': f"center drift above {Config.CLUSTER_MATCH_MAX_DRIFT}",
+                'center_drift': center_drift
+            }
+            logger.warning(
+                f"Not matching clusters to the previous model: center drift {center_drift} exceeds "
+                f"{Config.CLUSTER_MATCH_MAX_DRIFT} scaled units, cluster IDs may change meaning"
+            )
+            return
+        
+        # permutation[new_id] = id of the matching previous cluster
+        permutation = np.empty(self.n_clusters, dtype=int)
+        permutation[new_ids] = previous_ids
+        
+        order = np.argsort(permutation)
+        self.model.cluster_centers_ = self.model.cluster_centers_[order]
+        # MiniBatchKMeans keeps one running weight per center for later partial_fit calls
+        if hasattr(self.model, '_counts'):
+            self.model._counts = self.model._counts[order]
+        if getattr(self.model, 'labels_', None) is not None:
+            self.model.labels_ = permutation[self.model.labels_]
+        self.labels_ = permutation[self.labels_]
+        self.cluster_centers_ = self.model.cluster_centers_
         
-        # Train K-means model
-        self.model = KMeans(
-            n_clusters=Config.N_CLUSTERS,
+        renumbered = int((permutation != np.arange(self.n_clusters)).sum())
+        self.cluster_matching_ = {
+            'skipped': False,
+            'permutation': permutation.tolist(),
+            'renumbered_clusters': renumbered,
+            'center_drift': center_drift
+        }
+        logger.info(f"Matched clusters to previous model: {renumbered} renumbered, center drift {self.cluster_matching_['center_drift']}")
+    
+    def _new_minibatch_model(self, init_centers=None):
+        if init_centers is not None:
+            return MiniBatchKMeans(
+                n_clusters=self.n_clusters,
+                init=init_centers,
+                random_state=42,
+                batch_size=Config.MINIBATCH_SIZE,
+                n_init=1,
+                # Chunks may arrive sorted (e.g. by site or date); random
+                # reassignment would move seeded centers onto one chunk's points
+                reassignment_ratio=0
+            )
+        return MiniBatchKMeans(
+            n_clusters=self.n_clusters,
             random_state=42,
-            n_init=10,
-            max_iter=300
+            batch_size=Config.MINIBATCH_SIZE,
+            n_init=3
         )
+    
+    def _train_minibatch(self, X_scaled):
+        """Run epochs of shuffled mini-batch updates until the centers settle"""
+        self.model = self._new_minibatch_model()
+        self.convergence_trace_ = []
+        rng = np.random.default_rng(42)
+        
+        for epoch in range(Config.MINIBATCH_MAX_EPOCHS):
+            order = rng.permutation(len(X_scaled))
+            entry = self._partial_fit_scaled(X_scaled[order])
+            entry['epoch'] = epoch + 1
+            self.convergence_trace_.append(entry)
+            
+            if entry['center_shift'] is not None and entry['center_shift'] < Config.MINIBATCH_TOL:
+                logger.info(f"Mini-batch K-means converged after {epoch + 1} epochs")
+                break
+    
+    def _partial_fit_scaled(self, X_scaled):
+        """Feed already scaled rows through MiniBatchKMeans in batches"""
+        previous_centers = None
+        if hasattr(self.model, 'cluster_centers_'):
+            previous_centers = self.model.cluster_centers_.copy()
+        
+        for start in range(0, len(X_scaled), Config.MINIBATCH_SIZE):
+            self.model.partial_fit(X_scaled[start:start + Config.MINIBATCH_SIZE])
         
-        self.labels_ = self.model.fit_predict(X_scaled)
+        center_shift = None
+        if previous_centers is not None:
+            center_shift = float(np.linalg.norm(self.model.cluster_centers_ - previous_centers, axis=1).max())
+        
+        return {
+            'samples': len(X_scaled),
+            'inertia': float(-self.model.score(X_scaled) / len(X_scaled)),
+            'center_shift': center_shift
+        }
+    
+    def partial_fit_scaler(self, feature_chunk):
+        """First streaming pass: accumulate scaler statistics from a feature chunk
+        
+        Also keeps a uniform reservoir sample of rows (smallest random keys)
+        used to seed the centers, so chunk order does not bias initialization.
+        """
+        self.scaler.partial_fit(feature_chunk)
+        
+        keys = self._sample_rng.random(len(feature_chunk))
+        if self._init_sample is not None:
+            keys = np.concatenate([self._init_sample_keys, keys])
+            feature_chunk = np.vstack([self._init_sample, feature_chunk])
+        
+        keep = np.argsort(keys)[:Config.MINIBATCH_INIT_SIZE]
+        self._init_sample_keys = keys[keep]
+        self._init_sample = np.asarray(feature_chunk)[keep]
+    
+    def partial_fit(self, feature_chunk, feature_names=None):
+        """Second streaming pass: update mini-batch K-means with a feature chunk
+        
+        The scaler must already have seen every chunk (partial_fit_scaler) so
+        all chunks are standardized with the same statistics.
+        """
+        if not hasattr(self.scaler, 'mean_'):
+            raise ValueError("Scaler not fitted. Call partial_fit_scaler on every chunk first.")
+        
+        if feature_names is not None:
+            self.feature_names = feature_names
+        if self.model is None or not isinstance(self.model, MiniBatchKMeans):
+            init_centers = None
+            if self._init_sample is not None and len(self._init_sample) >= self.n_clusters:
+                init_centers = KMeans(
+                    n_clusters=self.n_clusters,
+                    random_state=42,
+                    n_init=10
+                ).fit(self.scaler.transform(self._init_sample)).cluster_centers_
+            self.model = self._new_minibatch_model(init_centers)
+            self.training_mode = 'minibatch'
+            self.convergence_trace_ = []
+        
+        entry = self._partial_fit_scaled(self.scaler.transform(feature_chunk))
+        entry['chunk'] = len(self.convergence_trace_) + 1
+        self.convergence_trace_.append(entry)
         self.cluster_centers_ = self.model.cluster_centers_
         
-        # Calculate silhouette score
-        silhouette_avg = silhouette_score(X_scaled, self.labels_)
-        logger.info(f"Silhouette Score: {silhouette_avg:.3f}")
+        return self
+    
+    def train_streaming(self, chunk_factory, feature_names, epochs=1):
+        """Train from feature chunks that don't fit in memory
         
-        return self.labels_
+        chunk_factory is called once per pass and must return a fresh
+        iterable of feature matrices: one pass fits the scaler, then each
+        epoch streams the chunks through partial_fit. train_model's
+        'streaming' mode (main.py --training-mode streaming) feeds it
+        chunks of the worker features built from streamed attendance.
+        """
+        self.feature_names = feature_names
+        self.scaler = StandardScaler()
+        self.model = None
+        self._init_sample = None
+        
+        for chunk in chunk_factory():
+            self.partial_fit_scaler(chunk)
+        
+        for epoch in range(epochs):
+            for chunk in chunk_factory():
+                self.partial_fit(chunk)
+        self.training_mode = 'streaming'
+        
+        logger.info(f"Streaming K-means trained on {len(self.convergence_trace_)} chunks")
+        return self
     
     def predict_cluster(self, feature_matrix):
         """Predict cluster for new data"""
@@ -65,8 +337,7 @@ class WorkerKMeansModel:
         
         # Calculate overall performance score for each cluster
         cluster_scores = {}
-        for cluster_id in range(Config.N_CLUSTERS):
-            cluster_data = cluster_means.loc[cluster_id]
+        for cluster_id, cluster_data in cluster_means.iterrows():
             
             # Weighted performance score
             score = (
@@ -80,15 +351,11 @@ class WorkerKMeansModel:
         # Sort clusters by performance score
         sorted_clusters = sorted(cluster_scores.items(), key=lambda x: x[1])
         
-        # Assign labels: lowest score = Low, highest = High
+        # Assign labels: lowest score = Low, highest = High, Medium tiers in between
+        tier_labels = performance_tier_labels(len(sorted_clusters))
         performance_mapping = {}
         for i, (cluster_id, score) in enumerate(sorted_clusters):
-            if i == 0:
-                performance_mapping[cluster_id] = 'Low Performer'
-            elif i == 1:
-                performance_mapping[cluster_id] = 'Medium Performer'
-            else:
-                performance_mapping[cluster_id] = 'High Performer'
+            performance_mapping[cluster_id] = tier_labels[i]
         
         # Add performance labels to data
         processed_data['performance_label'] = processed_data['cluster'].map(performance_mapping)
@@ -97,81 +364,105 @@ class WorkerKMeansModel:
         for cluster_id, label in performance_mapping.items():
             logger.info(f"Cluster {cluster_id}: {label} (Score: {cluster_scores[cluster_id]:.2f})")
         
+        self.performance_mapping_ = {int(cluster_id): label for cluster_id, label in performance_mapping.items()}
+        if 'userId' in processed_data:
+            self.assignments_ = processed_data[['userId', 'cluster', 'performance_label']]
+            self.label_changes_ = self._compare_with_previous_assignments(self.assignments_)
+        
         return processed_data, performance_mapping
     
-    def visualize_clusters(self, processed_data, save_path='cluster_visualization.png'):
-        """Create visualization of clusters"""
-        plt.figure(figsize=(15, 10))
-        
-        # Create subplots for different feature combinations
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # Plot 1: Attendance Rate vs Avg Work Hours
-        scatter1 = axes[0, 0].scatter(
-            processed_data['attendance_rate'], 
-            processed_data['avg_work_hours'],
-            c=processed_data['cluster'], 
-            cmap='viridis', 
-            alpha=0.7
-        )
-        axes[0, 0].set_xlabel('Attendance Rate (%)')
-        axes[0, 0].set_ylabel('Average Work Hours')
-        axes[0, 0].set_title('Attendance Rate vs Work Hours')
-        
-        # Plot 2: Punctuality vs Consistency
-        scatter2 = axes[0, 1].scatter(
-            processed_data['punctuality_score'], 
-            processed_data['consistency_score'],
-            c=processed_data['cluster'], 
-            cmap='viridis', 
-            alpha=0.7
-        )
-        axes[0, 1].set_xlabel('Punctuality Score (%)')
-        axes[0, 1].set_ylabel('Consistency Score (%)')
-        axes[0, 1].set_title('Punctuality vs Consistency')
-        
-        # Plot 3: Performance distribution
-        performance_counts = processed_data['performance_label'].value_counts()
-        axes[1, 0].pie(performance_counts.values, labels=performance_counts.index, autopct='%1.1f%%')
-        axes[1, 0].set_title('Performance Distribution')
+    def _compare_with_previous_assignments(self, assignments):
+        """Count workers whose performance label differs from the saved assignments"""
+        if not os.path.exists(self.paths['assignments']):
+            return None
         
-        # Plot 4: Feature comparison by cluster
-        cluster_means = processed_data.groupby('performance_label')[
-            ['attendance_rate', 'avg_work_hours', 'punctuality_score', 'consistency_score']
-        ].mean()
-        
-        cluster_means.plot(kind='bar', ax=axes[1, 1])
-        axes[1, 1].set_title('Average Features by Performance Level')
-        axes[1, 1].set_xlabel('Performance Level')
-        axes[1, 1].set_ylabel('Score')
-        axes[1, 1].legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        axes[1, 1].tick_params(axis='x', rotation=45)
+        previous = pd.read_csv(self.paths['assignments'], dtype={'userId': str})
+        merged = assignments.astype({'userId': str}).merge(
+            previous, on='userId', how='left', suffixes=('', '_previous')
+        )
+        known = merged['performance_label_previous'].notna()
+        changed = int((merged['performance_label'] != merged['performance_label_previous'])[known].sum())
         
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.show()
+        label_changes = {
+            'compared_workers': int(known.sum()),
+            'changed_workers': changed,
+            'new_workers': int((~known).sum())
+        }
+        logger.info(
+            f"{changed} of {label_changes['compared_workers']} workers changed performance label "
+            f"since the previous model ({label_changes['new_workers']} new workers)"
+        )
+        return label_changes
+    
+    def visualize_clusters(self, processed_data, save_path=None):
+        """Render the cluster visualization now (headless, see cluster_plots.ClusterPlotJob for background runs)"""
+        from cluster_plots import plot_frame, render_cluster_plots
         
-        logger.info(f"Visualization saved to {save_path}")
+        render_cluster_plots(plot_frame(processed_data), save_path)
     
     def save_model(self):
         """Save trained model and scaler"""
-        os.makedirs('models', exist_ok=True)
+        os.makedirs(os.path.dirname(self.paths['model']) or '.', exist_ok=True)
+        
+        previous_mapping = None
+        if os.path.exists(self.paths['metadata']):
+            with open(self.paths['metadata'], 'r') as f:
+                previous_mapping = json.load(f).get('performance_mapping')
         
         # Save model and scaler
-        joblib.dump(self.model, Config.MODEL_PATH)
-        joblib.dump(self.scaler, Config.SCALER_PATH)
+        joblib.dump(self.model, self.paths['model'])
+        joblib.dump(self.scaler, self.paths['scaler'])
+        
+        performance_mapping = None
+        if self.performance_mapping_ is not None:
+            performance_mapping = {str(cluster_id): label for cluster_id, label in self.performance_mapping_.items()}
+        if self.assignments_ is not None:
+            self.assignments_.to_csv(self.paths['assignments'], index=False)
+        
+        created_at = pd.Timestamp.now().isoformat()
+        
+        # Save the binary artifact used for inference and export
+        artifact_checksum = ModelArtifact.write(
+            self.paths['artifact'],
+            mean=self.scaler.mean_,
+            scale=self.scaler.scale_,
+            centers=self.model.cluster_centers_,
+            feature_names=self.feature_names,
+            performance_mapping=self.performance_mapping_ or dict(enumerate(performance_tier_labels(self.n_clusters))),
+            extra={
+                'model_type': type(self.model).__name__,
+                'training_mode': self.training_mode,
+                'created_at': created_at
+            }
+        )
         
         # Save metadata
         metadata = {
-            'model_type': 'KMeans',
-            'n_clusters': Config.N_CLUSTERS,
+            'model_type': type(self.model).__name__,
+            'training_mode': self.training_mode,
+            'n_clusters': self.n_clusters,
             'feature_names': self.feature_names,
-            'cluster_labels': Config.CLUSTER_LABELS,
+            'cluster_labels': dict(enumerate(performance_tier_labels(self.n_clusters))),
             'feature_weights': Config.FEATURE_WEIGHTS,
-            'created_at': pd.Timestamp.now().isoformat()
+            'convergence_trace': self.convergence_trace_,
+            'evaluation': self.evaluation_,
+            # Parameters for the NumPy predictor (numpy_predictor.py)
+            'scaler_params': {
+                'mean': self.scaler.mean_.tolist(),
+                'scale': self.scaler.scale_.tolist()
+            },
+            'cluster_centers': self.model.cluster_centers_.tolist(),
+            'performance_mapping': performance_mapping,
+            # Clients can keep their cached mapping when this is False
+            'mapping_changed': performance_mapping != previous_mapping,
+            'cluster_matching': self.cluster_matching_,
+            'label_changes': self.label_changes_,
+            'artifact_path': self.paths['artifact'],
+            'artifact_checksum': artifact_checksum,
+            'created_at': created_at
         }
         
-        with open(Config.METADATA_PATH, 'w') as f:
+        with open(self.paths['metadata'], 'w') as f:
             json.dump(metadata, f, indent=2)
         
         logger.info("Model saved successfully")
@@ -179,12 +470,17 @@ class WorkerKMeansModel:
     def load_model(self):
         """Load trained model and scaler"""
         try:
-            self.model = joblib.load(Config.MODEL_PATH)
-            self.scaler = joblib.load(Config.SCALER_PATH)
+            self.model = joblib.load(self.paths['model'])
+            self.scaler = joblib.load(self.paths['scaler'])
             
-            with open(Config.METADATA_PATH, 'r') as f:
+            with open(self.paths['metadata'], 'r') as f:
                 metadata = json.load(f)
                 self.feature_names = metadata['feature_names']
+            self.n_clusters = self.model.n_clusters
+            if metadata.get('performance_mapping'):
+                self.performance_mapping_ = {
+                    int(cluster_id): label for cluster_id, label in metadata['performance_mapping'].items()
+                }
             
             logger.info("Model loaded successfully")
             return True
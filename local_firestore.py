@@ -0,0 +1,241 @@
+"""
+In-memory stand-in for the Firestore client used by FirebaseClient.
+
+Supports the subset of the API the pipeline relies on (collection/document
+reads and writes, where/order_by/limit/start_after/select queries and
+batched writes), so ingestion can be exercised offline:
+
+    client = FirebaseClient(db=LocalFirestoreClient())
+"""
+
+import copy
+import itertools
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from datetime import datetime, timezone
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _comparable(value):
+    """Compare timestamps the way Firestore does: naive datetimes are UTC"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b,
+}
+
+class LocalDocumentSnapshot:
+    def __init__(self, doc_id, data, fields=None):
+        self.id = doc_id
+        self._data = data
+        self._fields = fields
+        self.exists = data is not None
+    
+    def to_dict(self):
+        if self._data is None:
+            return None
+        if self._fields is None:
+            return dict(self._data)
+        return {field: self._data[field] for field in self._fields if field in self._data}
+    
+    def get(self, field):
+        return self._data.get(field) if self._data else None
+
+class LocalDocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+    
+    def set(self, data, merge=False):
+        with self._collection._lock:
+            current = self._collection._docs.get(self.id, {}) if merge else {}
+            self._collection._docs[self.id] = {**current, **copy.deepcopy(data)}
+            self._collection._version += 1
+    
+    def update(self, data):
+        self.set(data, merge=True)
+    
+    def delete(self):
+        with self._collection._lock:
+            self._collection._docs.pop(self.id, None)
+            self._collection._version += 1
+    
+    def get(self):
+        return LocalDocumentSnapshot(self.id, self._collection._docs.get(self.id))
+
+class LocalQuery:
+    def __init__(self, collection, filters=(), order=None, limit=None, cursor=None, fields=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = order
+        self._limit = limit
+        self._cursor = cursor
+        self._fields = fields
+    
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters,
+            'order': self._order,
+            'limit': self._limit,
+            'cursor': self._cursor,
+            'fields': self._fields,
+        }
+        state.update(changes)
+        return LocalQuery(self._collection, **state)
+    
+    def where(self, field_path, op_string, value):
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+    
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(order=(field_path, direction == 'DESCENDING'))
+    
+    def limit(self, count):
+        return self._copy(limit=count)
+    
+    def start_after(self, snapshot):
+        return self._copy(cursor=snapshot)
+    
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+    
+    def _sort_key(self, doc_id, data):
+        return (_comparable(data.get(self._order[0])), doc_id)
+    
+    def stream(self):
+        if self._order is not None:
+            yield from self._stream_ordered()
+            return
+        
+        with self._collection._lock:
+            docs = list(self._collection._docs.items())
+        
+        matches = [(doc_id, data) for doc_id, data in docs if self._matches(data)]
+        
+        if self._limit is not None:
+            matches = matches[:self._limit]
+        
+        for doc_id, data in matches:
+            yield LocalDocumentSnapshot(doc_id, data, self._fields)
+
+    def _matches(self, data):
+        return all(
+            field in data and _OPERATORS[op](_comparable(data[field]), _comparable(value))
+            for field, op, value in self._filters
+        )
+    
+    def _stream_ordered(self):
+        """Walk the collection's sorted index so each cursor page costs O(log n + page)"""
+        field_path, descending = self._order
+        # Firestore leaves out documents that lack the ordered field
+        index, docs = self._collection._sorted_index(field_path)
+        
+        key = itemgetter(0)
+        lo, hi = 0, len(index)
+        for field, op, value in self._filters:
+            if field != field_path or op not in ('==', '<', '<=', '>', '>='):
+                continue
+            value = _comparable(value)
+            if op in ('>=', '=='):
+                lo = max(lo, bisect_left(index, value, key=key))
+            if op == '>':
+                lo = max(lo, bisect_right(index, value, key=key))
+            if op in ('<=', '=='):
+                hi = min(hi, bisect_right(index, value, key=key))
+            if op == '<':
+                hi = min(hi, bisect_left(index, value, key=key))
+        
+        if self._cursor is not None:
+            cursor_key = self._sort_key(self._cursor.id, self._cursor._data)
+            if descending:
+                hi = min(hi, bisect_left(index, cursor_key))
+            else:
+                lo = max(lo, bisect_right(index, cursor_key))
+        
+        positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+        yielded = 0
+        for position in positions:
+            if self._limit is not None and yielded >= self._limit:
+                break
+            doc_id = index[position][1]
+            data = docs.get(doc_id)
+            if data is None or not self._matches(data):
+                continue
+            yield LocalDocumentSnapshot(doc_id, data, self._fields)
+            yielded += 1
+
+class LocalCollection(LocalQuery):
+    def __init__(self, name):
+        self.id = name
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._version = 0
+        self._indexes = {}
+        super().__init__(self)
+    
+    def _sorted_index(self, field_path):
+        """(sort key, doc id) pairs ordered by field_path, rebuilt after any write"""
+        with self._lock:
+            version, index = self._indexes.get(field_path, (None, None))
+            if version != self._version:
+                index = sorted(
+                    (_comparable(data[field_path]), doc_id)
+                    for doc_id, data in self._docs.items() if data.get(field_path) is not None
+                )
+                self._indexes[field_path] = (self._version, index)
+            return index, self._docs
+    
+    def document(self, doc_id=None):
+        if doc_id is None:
+            doc_id = f'{self.id}-{next(self._ids):012d}'
+        return LocalDocumentReference(self, doc_id)
+    
+    def add(self, data):
+        doc_ref = self.document()
+        doc_ref.set(data)
+        return None, doc_ref
+
+class LocalWriteBatch:
+    MAX_WRITES = 500
+    
+    def __init__(self):
+        self._writes = []
+    
+    def set(self, doc_ref, data, merge=False):
+        if len(self._writes) >= self.MAX_WRITES:
+            raise ValueError(f"A batch can contain at most {self.MAX_WRITES} writes")
+        self._writes.append((doc_ref, data, merge))
+    
+    def commit(self):
+        for doc_ref, data, merge in self._writes:
+            doc_ref.set(data, merge=merge)
+        committed = len(self._writes)
+        self._writes = []
+        return committed
+
+class LocalFirestoreClient:
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+    
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = LocalCollection(name)
+            return self._collections[name]
+    
+    def collections(self):
+        return list(self._collections.values())
+    
+    def batch(self):
+        return LocalWriteBatch()
@@ -5,6 +5,7 @@ Main script for training K-means worker performance analysis model
 
 import os
 import sys
+import argparse
 import logging
 from datetime import datetime
 
@@ -13,6 +14,14 @@ from firebase_client import FirebaseClient
 from data_processor import DataProcessor
 from kmeans_model import WorkerKMeansModel
 from tflite_converter import TFLiteConverter
+from feature_store import FeatureStore
+from attendance_cache import AttendanceCache
+from streaming_features import StreamingFeatureAggregator
+from model_selection import KSelector
+from partitioned_training import PartitionedTrainer
+from cluster_plots import ClusterPlotJob, plot_frame
+from instrumentation import RunProfiler
+from stage_cache import StageCache, file_checksum
 from config import Config
 
 # Setup logging
@@ -26,47 +35,297 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def main():
+PIPELINE_STAGES = [
+    'init_client', 'fetch', 'process', 'stream_features', 'incremental_features', 'features', 'select_k',
+    'partitioned_train', 'train', 'labels', 'visualize', 'save', 'tflite_convert', 'tflite_test', 'visualize_wait'
+]
+
+# What each cached stage depends on besides its input data: (Config values, modules)
+STAGE_INPUTS = {
+    'process': {
+        'config_names': [
+            'START_DATE', 'END_DATE', 'WEEKMASK', 'HOLIDAYS', 'SITE_COLUMN', 'SITE_CALENDARS',
+            'PUNCTUALITY_CUTOFF_HOUR', 'SHIFT_COLUMN', 'SHIFT_PUNCTUALITY_CUTOFFS', 'PARTITION_COLUMNS'
+        ],
+        'modules': ['data_processor', 'working_days']
+    },
+    'select_k': {
+        'config_names': [
+            'K_CANDIDATES', 'SELECTION_SEEDS', 'SELECTION_CRITERION', 'SELECTION_METRICS',
+            'SILHOUETTE_EXACT_MAX_SAMPLES', 'SILHOUETTE_SAMPLE_SIZE', 'SILHOUETTE_BOOTSTRAP', 'RANDOM_STATE'
+        ],
+        'modules': ['model_selection', 'cluster_evaluation']
+    },
+    'model': {
+        'config_names': [
+            'N_CLUSTERS', 'CLUSTER_LABELS', 'FEATURE_WEIGHTS', 'RANDOM_STATE', 'KMEANS_INIT', 'N_RESTARTS',
+            'RESTART_AGREEMENT', 'RESTART_TOL', 'KMEANS_PARALLEL_ROUNDS', 'STABLE_CLUSTER_IDS',
+            'CLUSTER_MATCH_MAX_DRIFT', 'TRAINING_MODE', 'MINIBATCH_SIZE', 'MINIBATCH_MAX_EPOCHS', 'MINIBATCH_TOL',
+            'MINIBATCH_INIT_SIZE', 'STREAMING_TRAIN_CHUNK_SIZE', 'STREAMING_EPOCHS',
+            'EVALUATION_METRICS', 'SILHOUETTE_EXACT_MAX_SAMPLES', 'SILHOUETTE_SAMPLE_SIZE',
+            'SILHOUETTE_CHUNK_SIZE', 'SILHOUETTE_BOOTSTRAP'
+        ],
+        'modules': ['kmeans_model', 'kmeans_engine', 'cluster_evaluation', 'model_artifact']
+    },
+    'visualize': {
+        'config_names': ['VISUALIZATION_DPI', 'VISUALIZATION_MAX_POINTS', 'VISUALIZATION_HEXBIN_GRIDSIZE', 'RANDOM_STATE'],
+        'modules': ['cluster_plots']
+    },
+    'tflite': {
+        'config_names': ['TFLITE_VARIANTS', 'TFLITE_VARIANT_PATHS', 'TFLITE_CALIBRATION_SAMPLES', 'TFLITE_BENCHMARK_REPEATS'],
+        'modules': ['tflite_converter', 'model_artifact']
+    }
+}
+
+MODEL_OUTPUTS = [
+    Config.MODEL_PATH, Config.SCALER_PATH, Config.METADATA_PATH, Config.ARTIFACT_PATH, Config.ASSIGNMENTS_PATH
+]
+
+def parse_args(argv=None):
+    """Parse command line options for the training pipeline"""
+    parser = argparse.ArgumentParser(description="Train the worker performance K-means model")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="Fetch only attendance newer than the feature store watermark and merge it"
+    )
+    parser.add_argument(
+        '--streaming', action='store_true',
+        help="Compute features chunk by chunk instead of loading all attendance into memory"
+    )
+    parser.add_argument(
+        '--training-mode', choices=['full', 'minibatch', 'streaming'], default=None,
+        help="K-means training mode; 'streaming' also streams the attendance (defaults to Config.TRAINING_MODE)"
+    )
+    parser.add_argument(
+        '--init', choices=['k-means++', 'k-means||', 'warm'], default=None,
+        help="Center seeding for full training; 'warm' starts from the saved model (defaults to Config.KMEANS_INIT)"
+    )
+    parser.add_argument(
+        '--use-cache', action='store_true',
+        help="Read users/attendance from the local columnar cache when valid, and write it after fetching"
+    )
+    parser.add_argument(
+        '--refresh-cache', action='store_true',
+        help="Ignore any cached snapshot, fetch from Firestore and rewrite the cache"
+    )
+    parser.add_argument(
+        '--offline', action='store_true',
+        help="Run entirely from the local cache without contacting Firestore"
+    )
+    parser.add_argument(
+        '--select-k', action='store_true',
+        help="Sweep Config.K_CANDIDATES in parallel and train with the best k instead of Config.N_CLUSTERS"
+    )
+    parser.add_argument(
+        '--partition-by', choices=Config.PARTITION_COLUMNS, default=Config.PARTITION_KEY,
+        help="Train one model per site/department/role in parallel under Config.PARTITION_DIR "
+             "instead of one global model (defaults to Config.PARTITION_KEY)"
+    )
+    parser.add_argument(
+        '--visualize', choices=ClusterPlotJob.MODES, default=None,
+        help="Render plots in a background process, inline, defer them (save the data only) or skip them "
+             "(defaults to Config.VISUALIZATION_MODE)"
+    )
+    parser.add_argument(
+        '--instrument', action='store_true', default=None,
+        help="Record wall/CPU time, peak RSS and rows per stage in Config.RUN_REPORT_PATH "
+             "(defaults to Config.INSTRUMENT_STAGES)"
+    )
+    parser.add_argument(
+        '--profile-stage', default=None, choices=PIPELINE_STAGES,
+        help="cProfile one stage and dump it to Config.PROFILE_DIR (implies --instrument)"
+    )
+    parser.add_argument(
+        '--no-stage-cache', action='store_true',
+        help="Recompute every stage instead of reusing outputs cached under the same input fingerprint"
+    )
+    args = parser.parse_args(argv)
+    
+    if args.offline and args.incremental:
+        parser.error("--offline cannot be combined with --incremental")
+    if args.streaming and args.incremental:
+        parser.error("--streaming cannot be combined with --incremental")
+    # Streaming training fits chunk by chunk; build its features the same way unless the feature store supplies them
+    if (args.training_mode or Config.TRAINING_MODE) == 'streaming' and not args.incremental:
+        args.streaming = True
+    
+    return args
+
+def load_worker_performance_data(firebase_client, args):
+    """Get (workers_df, attendance_df) from the local cache or Firestore"""
+    cache = AttendanceCache()
+    
+    if args.offline or (args.use_cache and not args.refresh_cache):
+        if cache.is_valid(ignore_age=args.offline):
+            return cache.read()
+        if args.offline:
+            logger.error(f"No usable attendance cache at {cache.path} for offline mode")
+            return None
+    
+    result = firebase_client.get_worker_performance_data()
+    
+    if (args.use_cache or args.refresh_cache) and isinstance(result, tuple) and not result[1].empty:
+        cache.write(*result)
+    
+    return result
+
+def fetch_and_process(firebase_client, data_processor, args, profiler=None, stage_cache=None):
+    """Fetch the full date range (from Firestore or the local cache) and process it"""
+    profiler = profiler or RunProfiler()
+    stage_cache = stage_cache or StageCache(enabled=False)
+    
+    # Step 2: Fetch data from Firestore
+    logger.info("Step 2: Fetching data from Firestore...")
+    with profiler.stage('fetch') as stage:
+        result = load_worker_performance_data(firebase_client, args)
+        if isinstance(result, tuple) and len(result) == 2:
+            stage['rows_out'] = len(result[1])
+    
+    if result is None or len(result) == 0:
+        logger.error("No data returned from Firestore. Please check your database.")
+        return None
+    
+    if len(result) != 2:
+        logger.error("Invalid data structure returned from Firestore.")
+        return None
+    
+    workers_df, attendance_df = result
+    
+    if workers_df.empty:
+        logger.error("No workers data found in Firestore.")
+        return None
+    
+    if attendance_df.empty:
+        logger.error("No attendance data found in Firestore.")
+        logger.info("Please check:")
+        logger.info("1. Collection name is 'attendance'")
+        logger.info("2. Date field format is 'YYYY-MM-DD'")
+        logger.info("3. There are attendance records in the last 30 days")
+        return None
+    
+    logger.info(f"Found {len(workers_df)} workers and {len(attendance_df)} attendance records")
+    
+    # Step 3: Process data
+    logger.info("Step 3: Processing worker performance data...")
+    with profiler.stage('process', rows_in=len(attendance_df)) as stage:
+        fingerprint = stage_cache.fingerprint('process', data=(workers_df, attendance_df), **STAGE_INPUTS['process'])
+        hit, processed_data = stage_cache.load('process', fingerprint)
+        if hit:
+            data_processor.processed_data = processed_data
+        else:
+            processed_data = data_processor.process_worker_data(workers_df, attendance_df)
+            stage_cache.store('process', fingerprint, processed_data)
+        stage['cache'] = 'hit' if hit else 'miss'
+        stage['rows_out'] = len(processed_data)
+    
+    return processed_data
+
+def stream_and_process(firebase_client, data_processor, args):
+    """Build features from attendance chunks streamed from the cache or Firestore"""
+    cache = AttendanceCache()
+    use_cache = (args.offline or args.use_cache) and not args.refresh_cache
+    
+    if use_cache and cache.is_valid(ignore_age=args.offline):
+        logger.info("Streaming attendance from the local cache...")
+        workers_df = cache.read_workers()
+        chunks = cache.iter_attendance()
+    elif args.offline:
+        logger.error(f"No usable attendance cache at {cache.path} for offline mode")
+        return None
+    else:
+        logger.info("Streaming attendance from Firestore...")
+        workers_df = firebase_client.get_workers_frame()
+        chunks = firebase_client.iter_attendance_chunks()
+    
+    if workers_df.empty:
+        logger.error("No workers data found.")
+        return None
+    
+    aggregator = StreamingFeatureAggregator(data_processor).consume(chunks)
+    if aggregator.records == 0:
+        logger.error("No attendance data found.")
+        return None
+    
+    return data_processor.process_worker_aggregates(workers_df, aggregator.aggregates)
+
+def load_incremental_features(firebase_client, data_processor):
+    """Update the feature store with new attendance and build features from it"""
+    feature_store = FeatureStore()
+    feature_store.load()
+    
+    pending = feature_store.pending_range()
+    if pending is None:
+        logger.info("Feature store is up to date, no new attendance to fetch")
+    else:
+        start_date, end_date = pending
+        logger.info(f"Fetching attendance from {start_date} to {end_date} (new days and the correction window)...")
+        new_attendance = firebase_client.get_attendance_frame(start_date, end_date)
+        new_aggregates = None if new_attendance.empty else FeatureStore.daily_aggregates(data_processor, new_attendance)
+        feature_store.merge(new_aggregates, end_date)
+        feature_store.save()
+    
+    workers_df = firebase_client.get_workers_frame()
+    if workers_df.empty:
+        logger.error("No workers data found in Firestore.")
+        return None
+    
+    return data_processor.process_worker_aggregates(workers_df, feature_store.totals())
+
+def main(args=None):
     """Main training pipeline"""
+    if args is None:
+        args = parse_args()
+    
+    instrument = Config.INSTRUMENT_STAGES if args.instrument is None else args.instrument
+    profiler = RunProfiler(enabled=instrument, profile_stage=args.profile_stage)
+    
+    stage_cache = StageCache(enabled=Config.STAGE_CACHE_ENABLED and not args.no_stage_cache)
+    
+    success = False
+    try:
+        success = run_pipeline(args, profiler, stage_cache)
+        return success
+    finally:
+        profiler.save_report(success, args=vars(args))
+
+def run_pipeline(args, profiler, stage_cache):
+    """Run the training steps, each measured as a profiler stage
+    
+    Processing, k selection, training (with labelling and saving),
+    visualization and TFLite conversion are skipped when the stage cache
+    holds outputs for the same input fingerprint.
+    """
     logger.info("Starting Worker Performance Analysis Model Training")
     
     try:
         # Step 1: Initialize Firebase client
-        logger.info("Step 1: Initializing Firebase client...")
-        firebase_client = FirebaseClient()
-        
-        # Step 2: Fetch data from Firestore
-        logger.info("Step 2: Fetching data from Firestore...")
-        result = firebase_client.get_worker_performance_data()
+        if args.offline:
+            logger.info("Step 1: Offline mode, skipping Firebase client...")
+            firebase_client = None
+        else:
+            logger.info("Step 1: Initializing Firebase client...")
+            with profiler.stage('init_client'):
+                firebase_client = FirebaseClient()
         
-        if not result:
-            logger.error("No data returned from Firestore. Please check your database.")
-            return False
+        data_processor = DataProcessor()
         
-        if len(result) != 2:
-            logger.error("Invalid data structure returned from Firestore.")
-            return False
-            
-        workers_df, attendance_df = result
+        if args.incremental:
+            # Steps 2-3: Merge new attendance into the feature store
+            logger.info("Steps 2-3: Updating feature store incrementally...")
+            with profiler.stage('incremental_features') as stage:
+                processed_data = load_incremental_features(firebase_client, data_processor)
+                stage['rows_out'] = None if processed_data is None else len(processed_data)
+        elif args.streaming:
+            # Steps 2-3: Stream attendance chunks into running aggregates
+            logger.info("Steps 2-3: Streaming worker performance data...")
+            with profiler.stage('stream_features') as stage:
+                processed_data = stream_and_process(firebase_client, data_processor, args)
+                stage['rows_out'] = None if processed_data is None else len(processed_data)
+        else:
+            processed_data = fetch_and_process(firebase_client, data_processor, args, profiler, stage_cache)
         
-        if workers_df.empty:
-            logger.error("No workers data found in Firestore.")
+        if processed_data is None:
             return False
-            
-        if attendance_df.empty:
-            logger.error("No attendance data found in Firestore.")
-            logger.info("Please check:")
-            logger.info("1. Collection name is 'attendance'")
-            logger.info("2. Date field format is 'YYYY-MM-DD'")
-            logger.info("3. There are attendance records in the last 30 days")
-            return False
-        
-        logger.info(f"Found {len(workers_df)} workers and {len(attendance_df)} attendance records")
-        
-        # Step 3: Process data
-        logger.info("Step 3: Processing worker performance data...")
-        data_processor = DataProcessor()
-        processed_data = data_processor.process_worker_data(workers_df, attendance_df)
         
         if processed_data.empty:
             logger.error("No processed data available for training")
@@ -74,55 +333,150 @@ def main():
         
         # Step 4: Prepare features for clustering
         logger.info("Step 4: Preparing features for clustering...")
-        feature_matrix, feature_names = data_processor.get_feature_matrix()
+        with profiler.stage('features', rows_in=len(processed_data)):
+            feature_matrix, feature_names = data_processor.get_feature_matrix()
         
         logger.info(f"Feature matrix shape: {feature_matrix.shape}")
         logger.info(f"Features: {feature_names}")
         
-        # Step 5: Train K-means model
-        logger.info("Step 5: Training K-means clustering model...")
-        kmeans_model = WorkerKMeansModel()
-        cluster_labels = kmeans_model.train_model(feature_matrix, feature_names)
+        n_clusters = None
+        if args.select_k:
+            logger.info("Step 4b: Selecting the number of clusters...")
+            with profiler.stage('select_k', rows_in=len(feature_matrix)) as stage:
+                fingerprint = stage_cache.fingerprint('select_k', data=(feature_matrix,), **STAGE_INPUTS['select_k'])
+                hit, n_clusters = stage_cache.load('select_k', fingerprint)
+                if not hit:
+                    selector = KSelector()
+                    n_clusters = selector.sweep(feature_matrix)
+                    selector.save_report()
+                    stage_cache.store('select_k', fingerprint, n_clusters, [Config.SELECTION_REPORT_PATH])
+                stage['cache'] = 'hit' if hit else 'miss'
         
-        # Step 6: Assign performance labels
-        logger.info("Step 6: Assigning performance labels...")
-        final_data, performance_mapping = kmeans_model.assign_performance_labels(
-            processed_data, cluster_labels
-        )
+        if args.partition_by:
+            # Step 5: Train one model per partition; each gets its own artifact set
+            logger.info(f"Step 5: Training one model per {args.partition_by}...")
+            with profiler.stage('partitioned_train', rows_in=len(processed_data)) as stage:
+                trainer = PartitionedTrainer(partition_key=args.partition_by)
+                trainer.train(processed_data, n_clusters=n_clusters, mode=args.training_mode, init=args.init)
+                stage['details'] = trainer.summary()
+            
+            summary = trainer.summary()
+            if summary['failed'] or not summary['trained']:
+                logger.error(f"Partitioned training incomplete, see {trainer.index_path}")
+                return False
+            logger.info(f"Partitioned training completed, index saved to {trainer.index_path}")
+            return True
         
-        # Step 7: Create visualizations
-        logger.info("Step 7: Creating visualizations...")
-        kmeans_model.visualize_clusters(final_data)
+        # Training depends on the saved model when cluster IDs are kept stable or it warm starts
+        uses_previous_model = Config.STABLE_CLUSTER_IDS or args.init == 'warm'
+        model_inputs = {
+            'n_clusters': n_clusters,
+            'training_mode': args.training_mode,
+            'init': args.init
+        }
+        
+        def model_fingerprint(previous_model):
+            return stage_cache.fingerprint(
+                'model', data=(feature_matrix, processed_data),
+                extra={**model_inputs, 'previous_model': previous_model}, **STAGE_INPUTS['model']
+            )
         
-        # Step 8: Save the model
-        logger.info("Step 8: Saving the trained model...")
-        kmeans_model.save_model()
+        model_key = model_fingerprint(file_checksum(Config.ARTIFACT_PATH) if uses_previous_model else None)
+        model_hit, model_result = stage_cache.load('model', model_key)
+        if model_hit:
+            logger.info("Steps 5-6: Model for these inputs is cached, skipping training")
+            final_data, performance_mapping = model_result
+        else:
+            # Step 5: Train K-means model
+            logger.info("Step 5: Training K-means clustering model...")
+            kmeans_model = WorkerKMeansModel(n_clusters=n_clusters)
+            with profiler.stage('train', rows_in=len(feature_matrix)) as stage:
+                cluster_labels = kmeans_model.train_model(
+                    feature_matrix, feature_names, mode=args.training_mode, init=args.init
+                )
+                # Evaluation (silhouette etc.) runs inside train_model; break its time out
+                stage['details'] = {
+                    'evaluation_seconds': {
+                        metric: result.get('seconds') for metric, result in (kmeans_model.evaluation_ or {}).items()
+                    }
+                }
+            
+            # Step 6: Assign performance labels
+            logger.info("Step 6: Assigning performance labels...")
+            with profiler.stage('labels', rows_in=len(processed_data)):
+                final_data, performance_mapping = kmeans_model.assign_performance_labels(
+                    processed_data, cluster_labels
+                )
         
-        # Step 9: Convert to TFLite
-        logger.info("Step 9: Converting model to TensorFlow Lite...")
-        tflite_converter = TFLiteConverter()
+        # Step 7: Create visualizations (off the critical path unless inline)
+        logger.info("Step 7: Creating visualizations...")
+        plot_job = ClusterPlotJob(mode=args.visualize)
+        plot_key = None
+        with profiler.stage('visualize', rows_in=len(final_data)) as stage:
+            if plot_job.mode in ('background', 'inline'):
+                plot_key = stage_cache.fingerprint(
+                    'visualize', data=(plot_frame(final_data),), extra=plot_job.save_path, **STAGE_INPUTS['visualize']
+                )
+                plot_hit, _ = stage_cache.load('visualize', plot_key)
+                stage['cache'] = 'hit' if plot_hit else 'miss'
+                if plot_hit:
+                    plot_key = None
+                else:
+                    plot_job.start(final_data)
+            else:
+                plot_job.start(final_data)
         
-        if tflite_converter.load_sklearn_model():
-            if tflite_converter.convert_to_tflite():
+        # Steps 8-11 may fail or return early; the plot render is joined (and cached) either way
+        try:
+            # Step 8: Save the model
+            if not model_hit:
+                logger.info("Step 8: Saving the trained model...")
+                with profiler.stage('save'):
+                    kmeans_model.save_model()
+                # Retraining these inputs from this very model reproduces it, so it is also
+                # valid under the fingerprint that names it as the previous model
+                aliases = [model_fingerprint(file_checksum(Config.ARTIFACT_PATH))] if uses_previous_model else []
+                stage_cache.store('model', model_key, (final_data, performance_mapping), MODEL_OUTPUTS, aliases)
+            
+            # Step 9: Convert to TFLite
+            logger.info("Step 9: Converting model to TensorFlow Lite...")
+            tflite_converter = TFLiteConverter()
+            
+            if not tflite_converter.load_artifact():
+                logger.error("Failed to load model artifact for conversion")
+                return False
+            
+            tflite_key = stage_cache.fingerprint(
+                'tflite', data=(feature_matrix,), extra=tflite_converter.artifact.checksum, **STAGE_INPUTS['tflite']
+            )
+            tflite_hit, _ = stage_cache.load('tflite', tflite_key)
+            if not tflite_hit:
+                with profiler.stage('tflite_convert'):
+                    converted = tflite_converter.convert_to_tflite(calibration_data=feature_matrix)
+                if not converted:
+                    logger.error("TFLite conversion failed")
+                    return False
                 logger.info("TFLite conversion successful!")
                 
-                # Test the TFLite model
+                # Test the TFLite model on every worker in one batched invoke
                 logger.info("Step 10: Testing TFLite model...")
-                test_sample = feature_matrix[:1]  # Use first sample for testing
-                tflite_converter.test_tflite_model(test_sample)
-            else:
-                logger.error("TFLite conversion failed")
-                return False
-        else:
-            logger.error("Failed to load sklearn model for conversion")
-            return False
-        
-        # Step 11: Display results summary
-        logger.info("Step 11: Training completed successfully!")
-        display_results_summary(final_data, performance_mapping)
-        
-        return True
-        
+                with profiler.stage('tflite_test', rows_in=len(feature_matrix)):
+                    tflite_converter.test_tflite_model(feature_matrix)
+                    tflite_converter.evaluate_variants(feature_matrix)
+                
+                stage_cache.store('tflite', tflite_key, output_paths=[
+                    *tflite_converter.exported_variants.values(), Config.TFLITE_INFO_PATH, Config.TFLITE_REPORT_PATH
+                ])
+            
+            # Step 11: Display results summary
+            logger.info("Step 11: Training completed successfully!")
+            display_results_summary(final_data, performance_mapping)
+            return True
+        finally:
+            with profiler.stage('visualize_wait'):
+                if plot_job.wait() and plot_key is not None:
+                    stage_cache.store('visualize', plot_key, output_paths=[plot_job.save_path])
+    
     except Exception as e:
         logger.error(f"Training failed with error: {e}")
         return False
@@ -162,8 +516,9 @@ def display_results_summary(final_data, performance_mapping):
     logger.info(f"  - Scaler: {Config.SCALER_PATH}")
     logger.info(f"  - TFLite Model: {Config.TFLITE_MODEL_PATH}")
     logger.info(f"  - Metadata: {Config.METADATA_PATH}")
-    logger.info(f"  - TFLite Info: models/tflite_model_info.json")
-    logger.info(f"  - Visualization: cluster_visualization.png")
+    logger.info(f"  - Model Artifact: {Config.ARTIFACT_PATH}")
+    logger.info(f"  - TFLite Info: {Config.TFLITE_INFO_PATH}")
+    logger.info(f"  - Visualization: {Config.VISUALIZATION_PATH}")
     logger.info(f"  - Training Log: training.log")
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""
+Single-file binary model artifact, memory-mappable by every process.
+
+Layout (all integers little-endian, every section 64-byte aligned):
+
+    0    8 bytes   magic b'WKMEANS\\0'
+    8    uint32    format version
+    12   uint32    header length in bytes
+    16   32 bytes  SHA-256 of everything from offset 64 to the end of file
+    48   16 bytes  reserved (zero)
+    64   JSON      header: feature names, label mapping, array offsets/shapes
+    ...  float32   scaler mean, scaler scale, cluster centers (C order)
+
+Loading reads the 64-byte prelude and the JSON header and returns the
+arrays as zero-copy views on a read-only memory map, so no pickle is
+involved and forked workers share the same pages.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'WKMEANS\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PRELUDE = struct.Struct('<8sII32s16x')
+ARRAY_NAMES = ('scaler_mean', 'scaler_scale', 'cluster_centers')
+
+def _pad(length):
+    return -length % ALIGNMENT
+
+class ModelArtifact:
+    def __init__(self, arrays, header, checksum=None):
+        self.arrays = arrays
+        self.header = header
+        self.checksum = checksum
+    
+    @property
+    def mean(self):
+        return self.arrays['scaler_mean']
+    
+    @property
+    def scale(self):
+        return self.arrays['scaler_scale']
+    
+    @property
+    def centers(self):
+        return self.arrays['cluster_centers']
+    
+    @property
+    def feature_names(self):
+        return self.header['feature_names']
+    
+    @property
+    def performance_mapping(self):
+        return {int(cluster_id): label for cluster_id, label in self.header['performance_mapping'].items()}
+    
+    @property
+    def n_clusters(self):
+        return self.header['n_clusters']
+    
+    @classmethod
+    def write(cls, path, mean, scale, centers, feature_names, performance_mapping, extra=None):
+        """Write the artifact atomically; returns its hex checksum"""
+        arrays = {
+            'scaler_mean': np.ascontiguousarray(mean, dtype='<f4'),
+            'scaler_scale': np.ascontiguousarray(scale, dtype='<f4'),
+            'cluster_centers': np.ascontiguousarray(centers, dtype='<f4'),
+        }
+        
+        header = {
+            'feature_names': list(feature_names),
+            'performance_mapping': {str(cluster_id): label for cluster_id, label in performance_mapping.items()},
+            'n_clusters': int(arrays['cluster_centers'].shape[0]),
+            'n_features': int(arrays['cluster_centers'].shape[1]),
+            **(extra or {}),
+            'arrays': {}
+        }
+        
+        # Array offsets depend on the header length, so settle the header size first
+        header_bytes = b''
+        while True:
+            offset = PRELUDE.size + len(header_bytes) + _pad(len(header_bytes))
+            for name in ARRAY_NAMES:
+                header['arrays'][name] = {
+                    'offset': offset,
+                    'shape': list(arrays[name].shape),
+                    'dtype': '<f4'
+                }
+                offset += arrays[name].nbytes + _pad(arrays[name].nbytes)
+            encoded = json.dumps(header, sort_keys=True).encode('utf-8')
+            if len(encoded) == len(header_bytes):
+                header_bytes = encoded
+                break
+            header_bytes = encoded
+        
+        body = bytearray(header_bytes + b'\0' * _pad(len(header_bytes)))
+        for name in ARRAY_NAMES:
+            body += arrays[name].tobytes() + b'\0' * _pad(arrays[name].nbytes)
+        
+        digest = hashlib.sha256(body).digest()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(PRELUDE.pack(MAGIC, FORMAT_VERSION, len(header_bytes), digest))
+            f.write(body)
+        os.replace(tmp_path, path)
+        
+        logger.info(f"Model artifact saved to {path} ({PRELUDE.size + len(body)} bytes)")
+        return digest.hex()
+    
+    @classmethod
+    def load(cls, path=None, verify=True):
+        """Memory-map an artifact; arrays are read-only float32 views"""
+        path = path or Config.ARTIFACT_PATH
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        
+        magic, version, header_length, digest = PRELUDE.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a worker model artifact")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model artifact version {version} (expected {FORMAT_VERSION})")
+        if verify and hashlib.sha256(buffer[PRELUDE.size:]).digest() != digest:
+            raise ValueError(f"Checksum mismatch, {path} is corrupted")
+        
+        header = json.loads(bytes(buffer[PRELUDE.size:PRELUDE.size + header_length]))
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            count = int(np.prod(spec['shape']))
+            arrays[name] = np.frombuffer(
+                buffer, dtype=spec['dtype'], count=count, offset=spec['offset']
+            ).reshape(spec['shape'])
+        
+        return cls(arrays, header, checksum=digest.hex())
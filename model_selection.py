@@ -0,0 +1,142 @@
+import numpy as np
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from cluster_evaluation import ClusterEvaluator
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _fit_candidate(matrix_path, n_clusters, seed):
+    """Fit and score one (k, seed) candidate against the shared scaled matrix"""
+    X_scaled = np.load(matrix_path, mmap_mode='r')
+    
+    started = time.perf_counter()
+    model = KMeans(n_clusters=n_clusters, random_state=seed, n_init=1, max_iter=300).fit(X_scaled)
+    fit_seconds = time.perf_counter() - started
+    
+    evaluation = ClusterEvaluator(
+        metrics=Config.SELECTION_METRICS, random_state=seed
+    ).evaluate(X_scaled, model.labels_, model.cluster_centers_)
+    
+    return {
+        'n_clusters': n_clusters,
+        'seed': seed,
+        'inertia': float(model.inertia_),
+        'n_iter': int(model.n_iter_),
+        'fit_seconds': fit_seconds,
+        'metrics': {name: result['value'] for name, result in evaluation.items()},
+        'evaluation': evaluation
+    }
+
+class KSelector:
+    """Parallel sweep over candidate cluster counts and seeds
+    
+    The feature matrix is standardized once and written to a temporary .npy
+    file that every worker process memory-maps, so candidates share one copy
+    of the data. Each candidate is scored with bounded-cost metrics
+    (Config.SELECTION_METRICS) and k is picked by Config.SELECTION_CRITERION:
+    'silhouette', 'calinski_harabasz', 'davies_bouldin' or 'elbow'.
+    """
+    
+    CRITERIA = {
+        'silhouette': ('silhouette_sampled', max),
+        'calinski_harabasz': ('calinski_harabasz', max),
+        'davies_bouldin': ('davies_bouldin', min),
+    }
+    
+    def __init__(self, k_values=None, seeds=None, criterion=None, max_workers=None):
+        self.k_values = list(k_values or Config.K_CANDIDATES)
+        self.seeds = list(seeds or Config.SELECTION_SEEDS)
+        self.criterion = criterion or Config.SELECTION_CRITERION
+        self.max_workers = max_workers or Config.SELECTION_MAX_WORKERS
+        self.candidates_ = []
+        self.results_ = []
+        self.best_k_ = None
+        
+        if self.criterion not in self.CRITERIA and self.criterion != 'elbow':
+            raise ValueError(f"Unknown selection criterion: {self.criterion}")
+    
+    def sweep(self, feature_matrix):
+        """Train every (k, seed) candidate concurrently; returns the chosen k"""
+        X_scaled = StandardScaler().fit_transform(feature_matrix)
+        k_values = [k for k in self.k_values if 2 <= k < len(X_scaled)]
+        if not k_values:
+            raise ValueError(f"No candidate k in {self.k_values} fits {len(X_scaled)} samples")
+        
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            matrix_path = os.path.join(tmp_dir, 'X_scaled.npy')
+            np.save(matrix_path, X_scaled)
+            
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(_fit_candidate, matrix_path, k, seed)
+                    for k in k_values for seed in self.seeds
+                ]
+                self.candidates_ = [future.result() for future in futures]
+        
+        logger.info(f"Trained {len(self.candidates_)} candidates in {time.perf_counter() - started:.2f}s")
+        
+        # Keep the lowest-inertia seed for each k
+        best_by_k = {}
+        for candidate in self.candidates_:
+            current = best_by_k.get(candidate['n_clusters'])
+            if current is None or candidate['inertia'] < current['inertia']:
+                best_by_k[candidate['n_clusters']] = candidate
+        self.results_ = [best_by_k[k] for k in sorted(best_by_k)]
+        
+        self.best_k_ = self._choose_k()
+        self.log_report()
+        return self.best_k_
+    
+    def _choose_k(self):
+        if self.criterion == 'elbow':
+            return self._elbow_k()
+        
+        metric, pick = self.CRITERIA[self.criterion]
+        scored = [result for result in self.results_ if metric in result['metrics']]
+        if not scored:
+            logger.warning(f"No candidate has {metric}, falling back to the elbow")
+            return self._elbow_k()
+        return pick(scored, key=lambda result: result['metrics'][metric])['n_clusters']
+    
+    def _elbow_k(self):
+        """k where normalized inertia falls furthest below the first-to-last chord"""
+        k_values = np.array([result['n_clusters'] for result in self.results_], dtype=float)
+        inertia = np.array([result['inertia'] for result in self.results_])
+        if len(k_values) < 3:
+            return int(k_values[0])
+        
+        x = (k_values - k_values[0]) / (k_values[-1] - k_values[0])
+        y = (inertia - inertia[-1]) / max(inertia[0] - inertia[-1], 1e-12)
+        return int(k_values[np.argmax((1 - x) - y)])
+    
+    def log_report(self):
+        """Log the elbow / metric table for the best seed of each k"""
+        logger.info("K selection report (best seed per k):")
+        for result in self.results_:
+            metrics = ', '.join(f"{name}={value:.4f}" for name, value in result['metrics'].items())
+            marker = ' <- selected' if result['n_clusters'] == self.best_k_ else ''
+            logger.info(f"  k={result['n_clusters']}: inertia={result['inertia']:.2f}, {metrics}{marker}")
+    
+    def save_report(self, path=None):
+        """Write every candidate and the selection to JSON"""
+        path = path or Config.SELECTION_REPORT_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        
+        report = {
+            'criterion': self.criterion,
+            'selected_k': self.best_k_,
+            'results': self.results_,
+            'candidates': self.candidates_
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        
+        logger.info(f"K selection report saved to {path}")
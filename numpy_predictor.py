@@ -0,0 +1,130 @@
+"""
+Lightweight K-means predictor using only NumPy.
+
+Loads the scaler parameters and cluster centers exported next to the model
+(the binary artifact models/worker_model.bin, or the JSON in
+models/tflite_model_info.json / model_metadata.json) and reproduces
+StandardScaler + nearest-center prediction, so scoring jobs never import
+scikit-learn or TensorFlow.
+"""
+
+import json
+import os
+import numpy as np
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class NumpyPredictor:
+    def __init__(self, mean, scale, centers, feature_names=None, performance_mapping=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.feature_names = feature_names
+        self.performance_mapping = performance_mapping or {}
+        self.n_clusters = len(self.centers)
+    
+    @classmethod
+    def from_model_info(cls, path):
+        """Build a predictor from a JSON file carrying scaler_params, cluster_centers and performance_mapping"""
+        with open(path, 'r') as f:
+            info = json.load(f)
+        
+        # cluster_labels lists tier names in score order, not per cluster, so it cannot stand in
+        mapping = info.get('performance_mapping')
+        if not mapping:
+            raise ValueError(f"{path} has no performance_mapping, retrain to export one")
+        return cls(
+            mean=info['scaler_params']['mean'],
+            scale=info['scaler_params']['scale'],
+            centers=info['cluster_centers'],
+            feature_names=info.get('feature_order') or info.get('feature_names'),
+            performance_mapping={int(cluster_id): label for cluster_id, label in mapping.items()}
+        )
+    
+    @classmethod
+    def from_artifact(cls, path=None):
+        """Build a predictor from the memory-mapped binary model artifact"""
+        from model_artifact import ModelArtifact
+        
+        artifact = ModelArtifact.load(path)
+        return cls(
+            mean=artifact.mean,
+            scale=artifact.scale,
+            centers=artifact.centers,
+            feature_names=artifact.feature_names,
+            performance_mapping=artifact.performance_mapping
+        )
+    
+    @classmethod
+    def load(cls, path=None):
+        """Load from path, else the binary artifact, else the newer of the JSON exports"""
+        if path is None and os.path.exists(Config.ARTIFACT_PATH):
+            path = Config.ARTIFACT_PATH
+        if path is not None and path.endswith('.bin'):
+            predictor = cls.from_artifact(path)
+            logger.info(f"NumPy predictor loaded from {path}")
+            return predictor
+        
+        candidates = [path] if path else [Config.TFLITE_INFO_PATH, Config.METADATA_PATH]
+        existing = sorted(
+            (candidate for candidate in candidates if os.path.exists(candidate)),
+            key=os.path.getmtime, reverse=True
+        )
+        unusable = []
+        for candidate in existing:
+            try:
+                predictor = cls.from_model_info(candidate)
+            except KeyError:
+                logger.warning(f"{candidate} has no exported scaler/centers, skipping")
+                continue
+            except ValueError as e:
+                logger.warning(f"{e}, skipping")
+                unusable.append(str(e))
+                continue
+            logger.info(f"NumPy predictor loaded from {candidate}")
+            return predictor
+        
+        if unusable:
+            raise ValueError('; '.join(unusable))
+        raise FileNotFoundError(f"No model parameters found in {', '.join(candidates)}")
+    
+    def transform(self, feature_matrix):
+        """Standardize raw features (StandardScaler.transform)"""
+        return (np.asarray(feature_matrix, dtype=np.float64) - self.mean) / self.scale
+    
+    def distances(self, feature_matrix):
+        """Euclidean distance from each row to every center, in scaled units"""
+        X_scaled = self.transform(feature_matrix)
+        squared = (
+            (X_scaled ** 2).sum(axis=1)[:, None]
+            - 2 * X_scaled @ self.centers.T
+            + (self.centers ** 2).sum(axis=1)[None, :]
+        )
+        return np.sqrt(np.maximum(squared, 0))
+    
+    def predict(self, feature_matrix):
+        """Nearest-center cluster for each row"""
+        return self.distances(feature_matrix).argmin(axis=1)
+    
+    def score(self, feature_matrix):
+        """Returns (clusters, distances, confidence margins) for each row
+        
+        The margin is the relative gap between the nearest and second-nearest
+        center: 0 on a decision boundary, 1 on a center.
+        """
+        distances = self.distances(feature_matrix)
+        clusters = distances.argmin(axis=1)
+        
+        if self.n_clusters > 1:
+            nearest, second = np.sort(distances, axis=1)[:, :2].T
+            margins = np.where(second > 0, (second - nearest) / np.where(second > 0, second, 1), 0)
+        else:
+            margins = np.ones(len(distances))
+        
+        return clusters, distances, margins
+    
+    def labels(self, clusters):
+        """Performance labels for cluster IDs"""
+        return [self.performance_mapping.get(int(cluster_id)) for cluster_id in clusters]
@@ -0,0 +1,193 @@
+"""
+One K-means model per partition of the workforce (site, department, role)
+
+The processed feature frame is grouped by Config.PARTITION_KEY and every
+partition is trained, labelled and saved in its own worker process. Each
+partition gets a full model set (model, scaler, metadata, binary artifact,
+assignments) in its own directory, with the file names of the Config paths
+(WorkerKMeansModel.paths), and index.json lists them all:
+
+    <PARTITION_DIR>/<key>=<value>/kmeans_worker_model.joblib, ...
+    <PARTITION_DIR>/index.json
+
+Partitions run concurrently, so each one trains its restarts serially with
+single-threaded BLAS; the largest partitions are submitted first.
+Cluster IDs of a partition are matched against its own previous model.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
+from data_processor import DataProcessor
+from kmeans_model import WorkerKMeansModel
+from stage_cache import file_checksum
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _train_partition(value, partition_data, model_dir, n_clusters, mode, init):
+    """Train, label and save one partition's model (runs in a worker process)"""
+    # The pool already keeps every CPU busy; nested restarts or BLAS threads would oversubscribe
+    Config.RESTART_MAX_WORKERS = 1
+    started = time.perf_counter()
+    
+    with threadpool_limits(limits=1):
+        data_processor = DataProcessor()
+        data_processor.processed_data = partition_data
+        feature_matrix, feature_names = data_processor.get_feature_matrix()
+        
+        model = WorkerKMeansModel(n_clusters=n_clusters, model_dir=model_dir)
+        labels = model.train_model(feature_matrix, feature_names, mode=mode, init=init)
+        labelled_data, _ = model.assign_performance_labels(partition_data, labels)
+        model.save_model()
+    
+    silhouette = model.evaluation_.get('silhouette', {}).get('value')
+    return {
+        'partition': value,
+        'status': 'trained',
+        'workers': len(partition_data),
+        'n_clusters': model.n_clusters,
+        'model_dir': model_dir,
+        'artifact_path': model.paths['artifact'],
+        'metadata_path': model.paths['metadata'],
+        'artifact_checksum': file_checksum(model.paths['artifact']),
+        'silhouette': silhouette,
+        'performance_counts': labelled_data['performance_label'].value_counts().to_dict(),
+        'seconds': time.perf_counter() - started
+    }
+
+def partition_dir_name(key, value):
+    """Directory name of a partition; unsafe characters are replaced and a hash keeps names unique"""
+    text = str(value)
+    safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', text)
+    if safe != text:
+        safe = f"{safe}_{hashlib.sha1(text.encode()).hexdigest()[:8]}"
+    return f'{key}={safe}'
+
+class PartitionedTrainer:
+    """Train one model per value of a grouping column on a process pool"""
+    
+    def __init__(self, partition_key=None, output_dir=None, max_workers=None, min_workers=None):
+        self.partition_key = partition_key or Config.PARTITION_KEY
+        if not self.partition_key:
+            raise ValueError("No partition key given and Config.PARTITION_KEY is not set")
+        self.output_dir = output_dir or Config.PARTITION_DIR
+        self.max_workers = max_workers or Config.PARTITION_MAX_WORKERS or os.cpu_count()
+        self.min_workers = Config.PARTITION_MIN_WORKERS if min_workers is None else min_workers
+        self.results_ = {}
+        self.seconds_ = None
+    
+    @property
+    def index_path(self):
+        return os.path.join(self.output_dir, 'index.json')
+    
+    def partitions(self, processed_data):
+        """Worker rows per partition value, missing values grouped as Config.PARTITION_MISSING_VALUE"""
+        if self.partition_key not in processed_data:
+            raise ValueError(
+                f"Processed data has no '{self.partition_key}' column "
+                f"(workers need it and it must be in Config.PARTITION_COLUMNS)"
+            )
+        keys = processed_data[self.partition_key].fillna(Config.PARTITION_MISSING_VALUE).astype(str)
+        return {value: group.reset_index(drop=True) for value, group in processed_data.groupby(keys, sort=True)}
+    
+    def train(self, processed_data, n_clusters=None, mode=None, init=None):
+        """Train every large enough partition concurrently; returns results by partition value"""
+        n_clusters = n_clusters or Config.N_CLUSTERS
+        min_workers = max(self.min_workers, n_clusters + 1)
+        partitions = self.partitions(processed_data)
+        
+        self.results_ = {}
+        for value, partition_data in partitions.items():
+            if len(partition_data) < min_workers:
+                self.results_[value] = {
+                    'partition': value,
+                    'status': 'skipped',
+                    'workers': len(partition_data),
+                    'reason': f"fewer than {min_workers} workers"
+                }
+        trainable = sorted(
+            (value for value in partitions if value not in self.results_),
+            key=lambda value: len(partitions[value]), reverse=True
+        )
+        logger.info(
+            f"Training {len(trainable)} {self.partition_key} partitions on {min(self.max_workers, len(trainable) or 1)} "
+            f"processes ({len(self.results_)} skipped as too small)"
+        )
+        
+        started = time.perf_counter()
+        if trainable:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(trainable))) as executor:
+                futures = {
+                    executor.submit(
+                        _train_partition, value, partitions[value],
+                        os.path.join(self.output_dir, partition_dir_name(self.partition_key, value)),
+                        n_clusters, mode, init
+                    ): value
+                    for value in trainable
+                }
+                for future in as_completed(futures):
+                    value = futures[future]
+                    try:
+                        self.results_[value] = future.result()
+                    except Exception as e:
+                        logger.error(f"Partition {self.partition_key}={value} failed: {e}")
+                        self.results_[value] = {
+                            'partition': value,
+                            'status': 'failed',
+                            'workers': len(partitions[value]),
+                            'reason': str(e)
+                        }
+        self.seconds_ = time.perf_counter() - started
+        
+        self.log_report()
+        self.save_index()
+        return self.results_
+    
+    def summary(self):
+        """Partition counts by status and the total training time"""
+        statuses = [result['status'] for result in self.results_.values()]
+        return {
+            'partition_key': self.partition_key,
+            'partitions': len(statuses),
+            'trained': statuses.count('trained'),
+            'skipped': statuses.count('skipped'),
+            'failed': statuses.count('failed'),
+            'seconds': self.seconds_
+        }
+    
+    def log_report(self):
+        summary = self.summary()
+        logger.info(
+            f"Partitioned training by {self.partition_key}: {summary['trained']} trained, "
+            f"{summary['skipped']} skipped, {summary['failed']} failed in {self.seconds_:.2f}s"
+        )
+        for value, result in sorted(self.results_.items()):
+            if result['status'] == 'trained':
+                silhouette = f"{result['silhouette']:.3f}" if result['silhouette'] is not None else 'n/a'
+                logger.info(
+                    f"  {value}: {result['workers']} workers, silhouette {silhouette}, {result['seconds']:.2f}s"
+                )
+            else:
+                logger.info(f"  {value}: {result['status']} ({result['reason']})")
+    
+    def save_index(self, path=None):
+        """Write the index of every partition's model set"""
+        path = path or self.index_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        
+        index = {
+            **self.summary(),
+            'created_at': datetime.now().isoformat(),
+            'results': {value: self.results_[value] for value in sorted(self.results_)}
+        }
+        with open(path, 'w') as f:
+            json.dump(index, f, indent=2)
+        logger.info(f"Partition index saved to {path}")
+        return path
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Score every worker against the saved model without retraining
+"""
+
+import os
+import sys
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+from local_firestore import LocalFirestoreClient
+from data_processor import DataProcessor
+from numpy_predictor import NumpyPredictor
+from attendance_cache import AttendanceCache
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+class BatchScorer:
+    """Vectorized scoring of processed worker features with a saved model
+    
+    Scoring runs on the NumPy predictor (no scikit-learn or TensorFlow
+    import). Each worker gets its cluster, performance label, the distance
+    to every center (in scaled units) and a confidence margin: the relative
+    gap between the nearest and second-nearest center, from 0 (on the
+    boundary) to 1 (on the center).
+    """
+    
+    def __init__(self, predictor=None, batch_size=None):
+        self.predictor = predictor
+        self.batch_size = batch_size or Config.SCORING_BATCH_SIZE
+    
+    def load(self):
+        """Load the exported model parameters once"""
+        try:
+            self.predictor = NumpyPredictor.load()
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"Error loading model parameters: {e}")
+            return False
+        return True
+    
+    def score_matrix(self, feature_matrix):
+        """Score a raw feature matrix; returns (clusters, distances, margins)"""
+        clusters = np.empty(len(feature_matrix), dtype=int)
+        distances = np.empty((len(feature_matrix), self.predictor.n_clusters))
+        margins = np.empty(len(feature_matrix))
+        
+        for start in range(0, len(feature_matrix), self.batch_size):
+            stop = min(start + self.batch_size, len(feature_matrix))
+            clusters[start:stop], distances[start:stop], margins[start:stop] = self.predictor.score(
+                feature_matrix[start:stop]
+            )
+        
+        return clusters, distances, margins
+    
+    def score(self, processed_data):
+        """Score every worker in the processed data frame"""
+        feature_matrix = processed_data[self.predictor.feature_names].to_numpy(dtype=float)
+        clusters, distances, margins = self.score_matrix(feature_matrix)
+        
+        identity_columns = [column for column in ['userId', 'name', 'workerId'] if column in processed_data]
+        scores = processed_data[identity_columns].reset_index(drop=True)
+        scores['cluster'] = clusters
+        scores['performance_label'] = self.predictor.labels(clusters)
+        for cluster_id in range(distances.shape[1]):
+            scores[f'distance_{cluster_id}'] = distances[:, cluster_id]
+        scores['confidence_margin'] = margins
+        scores['scored_at'] = pd.Timestamp.now().isoformat()
+        
+        logger.info(f"Scored {len(scores)} workers")
+        return scores
+    
+    def write(self, scores, output_path):
+        """Write scores to CSV or Parquet, chosen by the file extension"""
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        if output_path.endswith('.parquet'):
+            scores.to_parquet(output_path, index=False)
+        else:
+            scores.to_csv(output_path, index=False)
+        logger.info(f"Scores written to {output_path}")
+    
+    def write_firestore(self, scores, db, collection=None):
+        """Write one document per worker using batched writes"""
+        collection_ref = db.collection(collection or Config.SCORES_COLLECTION)
+        records = scores.to_dict('records')
+        batch_limit = Config.FIRESTORE_BATCH_SIZE
+        
+        written = 0
+        for start in range(0, len(records), batch_limit):
+            batch = db.batch()
+            for record in records[start:start + batch_limit]:
+                batch.set(collection_ref.document(str(record['userId'])), {
+                    key: value.item() if isinstance(value, np.generic) else value
+                    for key, value in record.items()
+                })
+            batch.commit()
+            written += len(records[start:start + batch_limit])
+        
+        logger.info(f"Wrote {written} score documents to '{collection_ref.id}' in {-(-written // batch_limit)} batches")
+        return written
+
+def parse_args(argv=None):
+    """Parse command line options for batch scoring"""
+    parser = argparse.ArgumentParser(description="Score all workers with the saved K-means model")
+    parser.add_argument('--start-date', default=None, help="First attendance day (defaults to Config.START_DATE)")
+    parser.add_argument('--end-date', default=None, help="Last attendance day (defaults to Config.END_DATE)")
+    parser.add_argument(
+        '--output', default=Config.SCORES_PATH,
+        help="CSV or .parquet file for the scores (empty string to skip)"
+    )
+    parser.add_argument(
+        '--firestore', action='store_true',
+        help="Also write scores to Firestore with batched writes"
+    )
+    parser.add_argument(
+        '--use-cache', action='store_true',
+        help="Read users/attendance from the local columnar cache when valid"
+    )
+    parser.add_argument(
+        '--offline', action='store_true',
+        help="Run from the local cache only; --firestore writes go to an in-memory stand-in"
+    )
+    parser.add_argument('--batch-size', type=int, default=None, help="Workers per scoring batch")
+    return parser.parse_args(argv)
+
+def load_processed_data(firebase_client, args):
+    """Build worker features for the scoring window from the cache or Firestore"""
+    cache = AttendanceCache()
+    if (args.offline or args.use_cache) and cache.is_valid(ignore_age=args.offline):
+        workers_df, attendance_df = cache.read()
+    elif args.offline:
+        logger.error(f"No usable attendance cache at {cache.path} for offline mode")
+        return None
+    else:
+        result = firebase_client.get_worker_performance_data()
+        if not isinstance(result, tuple):
+            logger.error("No attendance data found for the scoring window")
+            return None
+        workers_df, attendance_df = result
+    
+    if workers_df.empty:
+        logger.error("No workers data found")
+        return None
+    
+    return DataProcessor().process_worker_data(workers_df, attendance_df)
+
+def main(args=None):
+    """Batch scoring pipeline"""
+    if args is None:
+        args = parse_args()
+    
+    # The window drives the fetch, the cache key and the working-day count
+    Config.START_DATE = args.start_date or Config.START_DATE
+    Config.END_DATE = args.end_date or Config.END_DATE
+    logger.info(f"Scoring workers on attendance from {Config.START_DATE} to {Config.END_DATE}")
+    
+    scorer = BatchScorer(batch_size=args.batch_size)
+    if not scorer.load():
+        logger.error("No saved model to score with, run main.py first")
+        return False
+    
+    if args.offline:
+        firebase_client = None
+        db = LocalFirestoreClient()
+    else:
+        # firebase_admin is slow to import, only load it when Firestore is used
+        from firebase_client import FirebaseClient
+        firebase_client = FirebaseClient()
+        db = firebase_client.db
+    
+    processed_data = load_processed_data(firebase_client, args)
+    if processed_data is None or processed_data.empty:
+        return False
+    
+    scores = scorer.score(processed_data)
+    
+    if args.output:
+        scorer.write(scores, args.output)
+    if args.firestore:
+        scorer.write_firestore(scores, db)
+    
+    logger.info(f"Performance distribution: {scores['performance_label'].value_counts().to_dict()}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
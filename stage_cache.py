@@ -0,0 +1,174 @@
+"""
+Content-addressed cache of pipeline stage outputs.
+
+A stage's fingerprint hashes everything its outputs depend on: input data
+(DataFrames and arrays are hashed by content), the Config values it reads
+and the source of the modules that implement it. On a match the stage's
+output files are restored and its in-memory result is loaded instead of
+recomputing. Every successful stage stores its outputs, so a rerun after a
+failure resumes at the first stage whose inputs changed or that never
+finished. Fetching is not a cached stage (its source is Firestore); use
+main.py --use-cache or --offline to skip re-reading it on a rerun.
+
+    <STAGE_CACHE_DIR>/<stage>/<fingerprint>/entry.json
+    <STAGE_CACHE_DIR>/<stage>/<fingerprint>/result.joblib
+    <STAGE_CACHE_DIR>/<stage>/<fingerprint>/files/<n>_<basename>
+    <STAGE_CACHE_DIR>/<stage>/<alias fingerprint>.alias
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import joblib
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _hash_value(digest, value):
+    """Feed one input into the digest, by content for frames and arrays"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([list(map(str, value.columns)), list(map(str, value.dtypes))]).encode())
+        try:
+            hashed = pd.util.hash_pandas_object(value, index=True)
+        except TypeError:
+            # Unhashable cells (lists, dicts from Firestore) are hashed by their text
+            hashed = pd.util.hash_pandas_object(value.astype(str), index=True)
+        digest.update(hashed.to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f'{value.dtype.str}{value.shape}'.encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, bytes):
+        digest.update(value)
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+def code_version(modules):
+    """Hash of the source files of the given modules (e.g. 'kmeans_model')"""
+    digest = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in sorted(modules):
+        with open(os.path.join(base_dir, f'{module}.py'), 'rb') as f:
+            digest.update(module.encode() + f.read())
+    return digest.hexdigest()
+
+def file_checksum(path):
+    """SHA-256 of a file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class StageCache:
+    def __init__(self, cache_dir=None, enabled=True):
+        self.cache_dir = cache_dir or Config.STAGE_CACHE_DIR
+        self.enabled = enabled
+    
+    def fingerprint(self, stage, data=(), config_names=(), modules=(), extra=None):
+        """Fingerprint of a stage's inputs, Config values and code"""
+        digest = hashlib.sha256(stage.encode())
+        for value in data:
+            _hash_value(digest, value)
+        _hash_value(digest, {name: getattr(Config, name) for name in config_names})
+        digest.update(code_version(modules).encode())
+        _hash_value(digest, extra)
+        return digest.hexdigest()
+    
+    def _entry_dir(self, stage, fingerprint):
+        alias_path = os.path.join(self.cache_dir, stage, f'{fingerprint}.alias')
+        if os.path.exists(alias_path):
+            with open(alias_path, 'r') as f:
+                fingerprint = f.read().strip()
+        return os.path.join(self.cache_dir, stage, fingerprint)
+    
+    def load(self, stage, fingerprint):
+        """Returns (hit, result); on a hit the stage's output files are restored"""
+        if not self.enabled:
+            return False, None
+        
+        entry_dir = self._entry_dir(stage, fingerprint)
+        entry_path = os.path.join(entry_dir, 'entry.json')
+        if not os.path.exists(entry_path):
+            logger.info(f"Stage cache miss for {stage} ({fingerprint[:12]})")
+            return False, None
+        
+        try:
+            with open(entry_path, 'r') as f:
+                entry = json.load(f)
+            for destination, stored in entry['outputs'].items():
+                os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+                shutil.copy2(os.path.join(entry_dir, 'files', stored), destination)
+            result_path = os.path.join(entry_dir, 'result.joblib')
+            result = joblib.load(result_path) if os.path.exists(result_path) else None
+        except Exception as e:
+            logger.warning(f"Stage cache entry for {stage} is unusable, recomputing: {e}")
+            return False, None
+        
+        os.utime(entry_path)  # Recently used entries survive pruning
+        logger.info(f"Stage cache hit for {stage} ({fingerprint[:12]}, from {entry['created_at']}), skipping it")
+        return True, result
+    
+    def store(self, stage, fingerprint, result=None, output_paths=(), aliases=()):
+        """Save a finished stage's result and output files under its fingerprint"""
+        if not self.enabled:
+            return
+        
+        stage_dir = os.path.join(self.cache_dir, stage)
+        entry_dir = os.path.join(stage_dir, fingerprint)
+        tmp_dir = f'{entry_dir}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_dir, 'files'))
+        
+        outputs = {}
+        for index, path in enumerate(output_paths):
+            if not os.path.exists(path):
+                continue
+            stored = f'{index}_{os.path.basename(path)}'
+            shutil.copy2(path, os.path.join(tmp_dir, 'files', stored))
+            outputs[path] = stored
+        if result is not None:
+            joblib.dump(result, os.path.join(tmp_dir, 'result.joblib'))
+        
+        with open(os.path.join(tmp_dir, 'entry.json'), 'w') as f:
+            json.dump({
+                'stage': stage,
+                'fingerprint': fingerprint,
+                'created_at': datetime.now().isoformat(),
+                'outputs': outputs
+            }, f, indent=2)
+        
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        for alias in aliases:
+            if alias != fingerprint:
+                with open(os.path.join(stage_dir, f'{alias}.alias'), 'w') as f:
+                    f.write(fingerprint)
+        
+        self._prune(stage_dir)
+        logger.info(f"Stage {stage} cached ({fingerprint[:12]})")
+    
+    def _prune(self, stage_dir):
+        """Keep the Config.STAGE_CACHE_KEEP most recently used entries of a stage"""
+        entries = sorted(
+            (name for name in os.listdir(stage_dir)
+             if os.path.exists(os.path.join(stage_dir, name, 'entry.json'))),
+            key=lambda name: os.path.getmtime(os.path.join(stage_dir, name, 'entry.json')),
+            reverse=True
+        )
+        for name in entries[Config.STAGE_CACHE_KEEP:]:
+            shutil.rmtree(os.path.join(stage_dir, name), ignore_errors=True)
+        
+        # Drop aliases whose entry is gone
+        for name in os.listdir(stage_dir):
+            if name.endswith('.alias'):
+                with open(os.path.join(stage_dir, name), 'r') as f:
+                    if not os.path.isdir(os.path.join(stage_dir, f.read().strip())):
+                        os.remove(os.path.join(stage_dir, name))
@@ -0,0 +1,95 @@
+import pandas as pd
+from data_processor import DataProcessor, parse_attendance_times
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAMING_COLUMNS = [
+    'total_records', 'approved_records', 'minutes_count',
+    'minutes_mean', 'minutes_m2', 'punctual_count'
+]
+
+class StreamingFeatureAggregator:
+    """Fold attendance chunks into per-worker running aggregates
+    
+    Work minutes are tracked as (count, mean, M2) and combined with the
+    parallel form of Welford's algorithm, so the standard deviation used by
+    the consistency score stays numerically stable. Memory is bounded by
+    one chunk plus one row per worker.
+    """
+    
+    def __init__(self, data_processor=None):
+        self.data_processor = data_processor or DataProcessor()
+        self.state = pd.DataFrame(columns=STREAMING_COLUMNS, dtype=float)
+        self.chunks = 0
+        self.records = 0
+    
+    def update(self, chunk):
+        """Merge one chunk of attendance records into the running aggregates"""
+        if chunk.empty:
+            return
+        
+        chunk = parse_attendance_times(chunk)
+        chunk = chunk[chunk['userId'].notna()]
+        user_ids = chunk['userId'].astype(str)
+        
+        approved_mask = (chunk['status'] == 'approved').to_numpy()
+        approved = chunk[approved_mask]
+        approved_ids = user_ids[approved_mask]
+        minutes = approved['workMinutes'].astype(float)
+        
+        grouped_minutes = minutes.groupby(approved_ids)
+        chunk_mean = grouped_minutes.mean()
+        deviations = (minutes - approved_ids.map(chunk_mean)) ** 2
+        
+        batch = pd.DataFrame({
+            'total_records': user_ids.groupby(user_ids).size(),
+            'approved_records': grouped_minutes.size(),
+            'minutes_count': grouped_minutes.count(),
+            'minutes_mean': chunk_mean,
+            'minutes_m2': deviations.groupby(approved_ids).sum(),
+            'punctual_count': self.data_processor.punctual_flags(approved).astype(int).groupby(approved_ids).sum()
+        })
+        
+        self.state = self._merge(self.state, batch)
+        self.chunks += 1
+        self.records += len(chunk)
+    
+    @staticmethod
+    def _merge(current, batch):
+        """Combine two aggregate frames (Chan et al. parallel variance update)"""
+        index = current.index.union(batch.index)
+        a = current.reindex(index).fillna(0)
+        b = batch.reindex(index).fillna(0)
+        
+        count = a['minutes_count'] + b['minutes_count']
+        safe_count = count.where(count > 0, 1)
+        delta = b['minutes_mean'] - a['minutes_mean']
+        
+        return pd.DataFrame({
+            'total_records': a['total_records'] + b['total_records'],
+            'approved_records': a['approved_records'] + b['approved_records'],
+            'minutes_count': count,
+            'minutes_mean': (a['minutes_mean'] + delta * b['minutes_count'] / safe_count).where(count > 0, 0),
+            'minutes_m2': a['minutes_m2'] + b['minutes_m2'] + delta ** 2 * a['minutes_count'] * b['minutes_count'] / safe_count,
+            'punctual_count': a['punctual_count'] + b['punctual_count']
+        })[STREAMING_COLUMNS]
+    
+    @property
+    def aggregates(self):
+        """Aggregates in the form DataProcessor.features_from_aggregates accepts"""
+        return pd.DataFrame({
+            'total_records': self.state['total_records'],
+            'approved_records': self.state['approved_records'],
+            'minutes_count': self.state['minutes_count'],
+            'minutes_sum': self.state['minutes_mean'] * self.state['minutes_count'],
+            'minutes_m2': self.state['minutes_m2'],
+            'punctual_count': self.state['punctual_count']
+        })
+    
+    def consume(self, chunks):
+        """Fold every chunk from an iterable of attendance frames"""
+        for chunk in chunks:
+            self.update(chunk)
+        logger.info(f"Streamed {self.records} attendance records in {self.chunks} chunks for {len(self.state)} workers")
+        return self
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic users and attendance for offline load and scale testing
+
+Workers are drawn from high/medium/low performer profiles and get one
+attendance record per working day they show up, in the schema Firestore
+holds and DataProcessor consumes (userId, status, workMinutes, date,
+clockInTime, clockOutTime). Output is deterministic for a seed and does
+not depend on the chunk size, so the same data can be generated in
+memory, loaded into a LocalFirestoreClient or written to the attendance
+cache:
+
+    python synthetic_data.py --workers 20000 --cache      # then main.py --offline
+    python synthetic_data.py --workers 5000 --through-firestore
+"""
+
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+from data_processor import DataProcessor, compact_attendance_frame
+from working_days import get_calendar
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+# Per-profile distributions: attendance probability per working day, mean
+# daily hours, day-to-day hours spread, clock-in hour and approval rate.
+# (mean, std) pairs vary each worker around the profile.
+PERFORMANCE_PROFILES = {
+    'high': {
+        'share': 0.3, 'attendance': (0.95, 0.03), 'work_hours': (8.3, 0.4),
+        'daily_hours_std': 0.4, 'clock_in_hour': (6.6, 0.3), 'approved': 0.97
+    },
+    'medium': {
+        'share': 0.5, 'attendance': (0.82, 0.06), 'work_hours': (7.2, 0.6),
+        'daily_hours_std': 1.0, 'clock_in_hour': (7.4, 0.5), 'approved': 0.92
+    },
+    'low': {
+        'share': 0.2, 'attendance': (0.6, 0.12), 'work_hours': (5.5, 1.0),
+        'daily_hours_std': 1.8, 'clock_in_hour': (8.1, 0.7), 'approved': 0.85
+    }
+}
+CLOCK_IN_DAILY_STD_HOURS = 0.4
+WORKERS_PER_BLOCK = 256  # Unit of generation; each block has its own seeded stream
+
+class SyntheticAttendanceGenerator:
+    """Generate users and attendance frames for a date range
+    
+    n_workers workers (plus about admin_share admins, which the pipeline
+    filters out) are spread over the given sites, each following that
+    site's working-day calendar.
+    """
+    
+    def __init__(self, n_workers, start_date=None, end_date=None, random_state=None, sites=None, admin_share=0.02):
+        self.n_workers = n_workers
+        self.start_date = start_date or Config.START_DATE
+        self.end_date = end_date or Config.END_DATE
+        self.random_state = Config.RANDOM_STATE if random_state is None else random_state
+        self.sites = list(sites) if sites else None
+        self.admin_share = admin_share
+        self.users_ = None
+        self._worker_params = None
+    
+    def generate_users(self):
+        """Users frame (workers and admins) with each worker's hidden profile parameters"""
+        if self.users_ is not None:
+            return self.users_
+        
+        rng = np.random.default_rng([self.random_state, 0])
+        n_admins = int(np.ceil(self.n_workers * self.admin_share))
+        n_users = self.n_workers + n_admins
+        
+        names = list(PERFORMANCE_PROFILES)
+        shares = np.array([PERFORMANCE_PROFILES[name]['share'] for name in names])
+        profile_index = rng.choice(len(names), size=self.n_workers, p=shares / shares.sum())
+        
+        params = {key: np.empty(self.n_workers) for key in ('attendance', 'work_hours', 'daily_hours_std', 'clock_in_hour', 'approved')}
+        for index, name in enumerate(names):
+            profile = PERFORMANCE_PROFILES[name]
+            members = profile_index == index
+            count = members.sum()
+            params['attendance'][members] = rng.normal(*profile['attendance'], count).clip(0.05, 1)
+            params['work_hours'][members] = rng.normal(*profile['work_hours'], count).clip(1, 12)
+            params['daily_hours_std'][members] = profile['daily_hours_std']
+            params['clock_in_hour'][members] = rng.normal(*profile['clock_in_hour'], count)
+            params['approved'][members] = profile['approved']
+        self._worker_params = params
+        
+        user_ids = pd.Series(np.arange(n_users)).astype(str).str.zfill(7)
+        self.users_ = pd.DataFrame({
+            'userId': 'user-' + user_ids,
+            'name': 'Worker ' + user_ids,
+            'email': 'user-' + user_ids + '@example.com',
+            'role': ['worker'] * self.n_workers + ['admin'] * n_admins,
+            'workerId': 'W' + user_ids,
+            'profile': [names[index] for index in profile_index] + [None] * n_admins
+        })
+        if self.sites:
+            self.users_[Config.SITE_COLUMN] = rng.choice(self.sites, size=n_users)
+        
+        return self.users_
+    
+    def _day_masks(self, days):
+        """Working-day mask over the date range for each site (None is the default calendar)"""
+        masks = {}
+        for site in (self.sites or [None]):
+            weekmask, holidays = get_calendar(site)
+            masks[site] = np.is_busday(days, weekmask=weekmask, holidays=list(holidays))
+        return masks
+    
+    def _generate_block(self, block, days, day_masks, first_id):
+        """Attendance records for one block of workers"""
+        rng = np.random.default_rng([self.random_state, block + 1])
+        workers = np.arange(block * WORKERS_PER_BLOCK, min((block + 1) * WORKERS_PER_BLOCK, self.n_workers))
+        params = {key: values[workers] for key, values in self._worker_params.items()}
+        
+        if self.sites:
+            sites = self.users_[Config.SITE_COLUMN].to_numpy()[workers]
+            calendar = np.stack([day_masks[site] for site in sites])
+        else:
+            calendar = np.broadcast_to(day_masks[None], (len(workers), len(days)))
+        present = calendar & (rng.random((len(workers), len(days))) < params['attendance'][:, None])
+        rows, columns = np.nonzero(present)
+        n_records = len(rows)
+        
+        work_minutes = np.rint(
+            rng.normal(params['work_hours'][rows], params['daily_hours_std'][rows]).clip(0.5, 16) * 60
+        ).astype(np.int32)
+        clock_in_seconds = np.rint(
+            rng.normal(params['clock_in_hour'][rows], CLOCK_IN_DAILY_STD_HOURS).clip(4, 14) * 3600
+        ).astype('timedelta64[s]')
+        approved = rng.random(n_records) < params['approved'][rows]
+        status = np.where(approved, 'approved', np.where(rng.random(n_records) < 0.5, 'pending', 'rejected'))
+        
+        dates = days[columns].astype('datetime64[ns]')
+        clock_in = dates + clock_in_seconds
+        ids = pd.Series(np.arange(first_id, first_id + n_records)).astype(str).str.zfill(10)
+        
+        return pd.DataFrame({
+            'attendanceId': ('att-' + ids).to_numpy(),
+            'userId': self.users_['userId'].to_numpy()[workers][rows],
+            'status': status,
+            'workMinutes': work_minutes,
+            'overtimeMinutes': np.maximum(work_minutes - 480, 0),
+            'date': dates,
+            'clockInTime': clock_in,
+            'clockOutTime': clock_in + work_minutes.astype('timedelta64[m]')
+        })
+    
+    def iter_attendance(self, chunk_size=None):
+        """Yield attendance frames of at least chunk_size records (the last may be smaller)"""
+        chunk_size = chunk_size or Config.STREAMING_CHUNK_SIZE
+        self.generate_users()
+        
+        days = np.arange(np.datetime64(self.start_date, 'D'), np.datetime64(self.end_date, 'D') + 1)
+        day_masks = self._day_masks(days)
+        
+        buffer = []
+        buffered = 0
+        generated = 0
+        for block in range(-(-self.n_workers // WORKERS_PER_BLOCK)):
+            frame = self._generate_block(block, days, day_masks, generated)
+            generated += len(frame)
+            buffer.append(frame)
+            buffered += len(frame)
+            if buffered >= chunk_size:
+                yield pd.concat(buffer, ignore_index=True)
+                buffer = []
+                buffered = 0
+        
+        if buffer:
+            yield pd.concat(buffer, ignore_index=True)
+    
+    def generate(self):
+        """(users_df, attendance_df) for the whole range, attendance in compact dtypes"""
+        started = time.perf_counter()
+        users_df = self.generate_users()
+        attendance_df = compact_attendance_frame(
+            pd.concat(list(self.iter_attendance()), ignore_index=True), log_memory=False
+        )
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Generated {len(users_df)} users and {len(attendance_df)} attendance records in {elapsed:.2f}s "
+            f"({len(attendance_df) / elapsed if elapsed > 0 else 0:.0f} records/s)"
+        )
+        return users_df, attendance_df
+    
+    def load_into(self, db, chunk_size=None):
+        """Write users and attendance documents with batched writes; returns the record count"""
+        self.generate_users()
+        batch_limit = Config.FIRESTORE_BATCH_SIZE
+        
+        users = self.users_.set_index('userId').replace({np.nan: None})
+        _write_documents(db, 'users', users.index, users.to_dict('records'), batch_limit)
+        
+        written = 0
+        for frame in self.iter_attendance(chunk_size):
+            # Firestore hands timestamps back as timezone-aware datetimes
+            frame = frame.set_index('attendanceId')
+            for column in ('date', 'clockInTime', 'clockOutTime'):
+                frame[column] = frame[column].dt.tz_localize('UTC')
+            _write_documents(db, 'attendance', frame.index, frame.to_dict('records'), batch_limit)
+            written += len(frame)
+        
+        logger.info(f"Loaded {len(users)} users and {written} attendance records into the database")
+        return written
+
+def _write_documents(db, collection, doc_ids, records, batch_limit):
+    collection_ref = db.collection(collection)
+    for start in range(0, len(records), batch_limit):
+        batch = db.batch()
+        for doc_id, record in zip(doc_ids[start:start + batch_limit], records[start:start + batch_limit]):
+            batch.set(collection_ref.document(doc_id), record)
+        batch.commit()
+
+def parse_args(argv=None):
+    """Parse command line options for the synthetic data generator"""
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic users and attendance")
+    parser.add_argument('--workers', type=int, default=1000, help="Number of workers")
+    parser.add_argument('--start-date', default=None, help="First attendance day (defaults to Config.START_DATE)")
+    parser.add_argument('--end-date', default=None, help="Last attendance day (defaults to Config.END_DATE)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed (defaults to Config.RANDOM_STATE)")
+    parser.add_argument('--sites', nargs='*', default=None, help="Spread workers over these sites")
+    parser.add_argument(
+        '--cache', action='store_true',
+        help="Write the data as the attendance cache snapshot for the range (for main.py/score.py --offline)"
+    )
+    parser.add_argument(
+        '--through-firestore', action='store_true',
+        help="Load the data into a LocalFirestoreClient and time ingestion and feature building end to end"
+    )
+    return parser.parse_args(argv)
+
+def run_through_firestore(generator):
+    """Load into the in-memory Firestore stand-in, then fetch and process like main.py"""
+    from local_firestore import LocalFirestoreClient
+    from firebase_client import FirebaseClient
+    
+    db = LocalFirestoreClient()
+    started = time.perf_counter()
+    generator.load_into(db)
+    logger.info(f"Load: {time.perf_counter() - started:.2f}s")
+    
+    firebase_client = FirebaseClient(db=db)
+    started = time.perf_counter()
+    result = firebase_client.get_worker_performance_data()
+    logger.info(f"Fetch: {time.perf_counter() - started:.2f}s ({firebase_client.last_ingest_stats})")
+    if not isinstance(result, tuple):
+        logger.error("No attendance data came back from the local database")
+        return None
+    
+    started = time.perf_counter()
+    processed_data = DataProcessor().process_worker_data(*result)
+    logger.info(f"Features: {time.perf_counter() - started:.2f}s")
+    return processed_data
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    
+    # The range also drives the working-day counts used by the features
+    Config.START_DATE = args.start_date or Config.START_DATE
+    Config.END_DATE = args.end_date or Config.END_DATE
+    
+    generator = SyntheticAttendanceGenerator(args.workers, random_state=args.seed, sites=args.sites)
+    
+    if args.through_firestore:
+        processed_data = run_through_firestore(generator)
+        if processed_data is None:
+            return False
+    else:
+        users_df, attendance_df = generator.generate()
+        if args.cache:
+            from attendance_cache import AttendanceCache
+            AttendanceCache().write(users_df[users_df['role'] != 'admin'], attendance_df)
+        processed_data = DataProcessor().process_worker_data(users_df[users_df['role'] != 'admin'], attendance_df)
+    
+    features = ['attendance_rate', 'avg_work_hours', 'punctuality_score', 'consistency_score']
+    profiles = generator.users_.set_index('userId')['profile']
+    summary = processed_data.assign(profile=processed_data['userId'].map(profiles)).groupby('profile')[features].mean()
+    logger.info(f"Mean features by generating profile:\n{summary.round(2)}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
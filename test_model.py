@@ -3,12 +3,16 @@
 Script untuk testing model yang sudah dilatih
 """
 
+import os
+import copy
 import numpy as np
 import pandas as pd
 import joblib
 import json
-import tensorflow as tf
 from config import Config
+from kmeans_model import WorkerKMeansModel
+from numpy_predictor import NumpyPredictor
+from tflite_converter import load_interpreter, invoke_batch
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -44,38 +48,43 @@ def test_sklearn_model():
         return False
 
 def test_tflite_model():
-    """Test TensorFlow Lite model"""
+    """Test every exported TensorFlow Lite variant with one batched invoke"""
     try:
-        # Load TFLite model
-        interpreter = tf.lite.Interpreter(model_path=Config.TFLITE_MODEL_PATH)
-        interpreter.allocate_tensors()
-        
-        # Get input and output details
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
-        
-        logger.info("TFLite Model Details:")
-        logger.info(f"Input details: {input_details}")
-        logger.info(f"Output details: {output_details}")
-        
-        # Sample data
-        sample_data = np.array([[95.0, 8.5, 90.0, 85.0]], dtype=np.float32)
-        
-        # Set input tensor
-        interpreter.set_tensor(input_details[0]['index'], sample_data)
-        
-        # Run inference
-        interpreter.invoke()
-        
-        # Get output
-        cluster_output = interpreter.get_tensor(output_details[0]['index'])
-        distance_output = interpreter.get_tensor(output_details[1]['index'])
-        
-        logger.info("TFLite Model Test Results:")
-        logger.info(f"Input: {sample_data}")
-        logger.info(f"Predicted Cluster: {cluster_output}")
-        logger.info(f"Distance: {distance_output}")
-        
+        # Sample data (the batch dimension is dynamic)
+        sample_data = np.array([
+            [95.0, 8.5, 90.0, 85.0],
+            [75.0, 7.0, 70.0, 60.0],
+            [50.0, 5.5, 40.0, 30.0]
+        ], dtype=np.float32)
+        
+        tested = 0
+        for variant, model_path in Config.TFLITE_VARIANT_PATHS.items():
+            if not os.path.exists(model_path):
+                continue
+            tested += 1
+            
+            # Load TFLite model
+            interpreter = load_interpreter(model_path)
+            
+            # Get input and output details
+            input_details = interpreter.get_input_details()
+            output_details = interpreter.get_output_details()
+            
+            logger.info(f"TFLite {variant} Model Details:")
+            logger.info(f"Input details: {input_details}")
+            logger.info(f"Output details: {output_details}")
+            
+            # Run inference on the whole batch
+            cluster_output, distance_output = invoke_batch(interpreter, sample_data)
+            
+            logger.info(f"TFLite {variant} Model Test Results:")
+            logger.info(f"Input: {sample_data}")
+            logger.info(f"Predicted Clusters: {cluster_output}")
+            logger.info(f"Distances: {distance_output}")
+        
+        if not tested:
+            logger.error(f"No TFLite model found ({', '.join(Config.TFLITE_VARIANT_PATHS.values())})")
+            return False
         return True
         
     except Exception as e:
@@ -89,11 +98,11 @@ def compare_models():
         sklearn_model = joblib.load(Config.MODEL_PATH)
         scaler = joblib.load(Config.SCALER_PATH)
         
+        # Load NumPy predictor
+        numpy_predictor = NumpyPredictor.load()
+        
         # Load TFLite model
-        interpreter = tf.lite.Interpreter(model_path=Config.TFLITE_MODEL_PATH)
-        interpreter.allocate_tensors()
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
+        interpreter = load_interpreter()
         
         # Test samples
         test_samples = np.array([
@@ -107,22 +116,17 @@ def compare_models():
         logger.info("Model Comparison Results:")
         logger.info("-" * 50)
         
+        # Predict every sample in one batch per model
+        sklearn_preds = sklearn_model.predict(scaler.transform(test_samples))
+        tflite_preds, _ = invoke_batch(interpreter, test_samples)
+        numpy_preds = numpy_predictor.predict(test_samples)
+        
         for i, sample in enumerate(test_samples):
-            # Sklearn prediction
-            sample_scaled = scaler.transform([sample])
-            sklearn_pred = sklearn_model.predict(sample_scaled)[0]
-            
-            # TFLite prediction
-            sample_tflite = sample.reshape(1, -1).astype(np.float32)
-            interpreter.set_tensor(input_details[0]['index'], sample_tflite)
-            interpreter.invoke()
-            tflite_pred = interpreter.get_tensor(output_details[0]['index'])[0]
-            
             # Compare
-            match = "✓" if sklearn_pred == int(tflite_pred) else "✗"
+            match = "✓" if sklearn_preds[i] == tflite_preds[i] == numpy_preds[i] else "✗"
             
             logger.info(f"Sample {i+1}: {sample}")
-            logger.info(f"  Sklearn: {sklearn_pred}, TFLite: {int(tflite_pred)} {match}")
+            logger.info(f"  Sklearn: {sklearn_preds[i]}, TFLite: {tflite_preds[i]}, NumPy: {numpy_preds[i]} {match}")
         
         return True
         
@@ -130,6 +134,40 @@ def compare_models():
         logger.error(f"Error comparing models: {e}")
         return False
 
+def test_matched_minibatch_partial_fit():
+    """Matching clusters keeps later partial_fit updates identical up to the renumbering"""
+    rng = np.random.default_rng(0)
+    feature_matrix = np.vstack([
+        rng.normal(loc, 2.0, size=(200, 4)) for loc in ([90, 8.5, 90, 85], [70, 7, 65, 60], [45, 5, 40, 30])
+    ])
+    feature_names = ['attendance_rate', 'avg_work_hours', 'punctuality_score', 'consistency_score']
+    
+    stable_ids = Config.STABLE_CLUSTER_IDS
+    Config.STABLE_CLUSTER_IDS = False
+    try:
+        model = WorkerKMeansModel(n_clusters=3)
+        model.train_model(feature_matrix, feature_names, mode='minibatch')
+    finally:
+        Config.STABLE_CLUSTER_IDS = stable_ids
+    # Random reassignment would pick centers by index, which renumbering changes
+    model.model.reassignment_ratio = 0
+    
+    # Previous centers in reversed order force a non-trivial renumbering
+    unmatched = copy.deepcopy(model)
+    model.match_previous_clusters(model.scaler.inverse_transform(model.model.cluster_centers_[::-1]))
+    permutation = np.array(model.cluster_matching_['permutation'])
+    assert (permutation != np.arange(3)).any()
+    
+    batch = model.scaler.transform(rng.normal([60, 6.5, 55, 50], 15.0, size=(300, 4)))
+    model.model.partial_fit(batch)
+    unmatched.model.partial_fit(batch)
+    
+    order = np.argsort(permutation)
+    np.testing.assert_allclose(model.model.cluster_centers_, unmatched.model.cluster_centers_[order])
+    np.testing.assert_allclose(model.model._counts, unmatched.model._counts[order])
+    np.testing.assert_array_equal(model.model.predict(batch), permutation[unmatched.model.predict(batch)])
+    logger.info("Matched mini-batch model updates consistently after partial_fit")
+
 def load_and_display_metadata():
     """Load and display model metadata"""
     try:
@@ -142,9 +180,8 @@ def load_and_display_metadata():
             logger.info(f"{key}: {value}")
         
         # Load TFLite info if exists
-        tflite_info_path = 'models/tflite_model_info.json'
         try:
-            with open(tflite_info_path, 'r') as f:
+            with open(Config.TFLITE_INFO_PATH, 'r') as f:
                 tflite_info = json.load(f)
             
             logger.info("\nTFLite Model Info:")
@@ -182,6 +219,10 @@ def main():
     logger.info("\n4. Comparing Model Outputs...")
     compare_models()
     
+    # Test 5: Cluster matching keeps mini-batch updates consistent
+    logger.info("\n5. Testing Matched Mini-batch Updates...")
+    test_matched_minibatch_partial_fit()
+    
     logger.info("\nTesting completed!")
 
 if __name__ == "__main__":
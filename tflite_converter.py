@@ -1,37 +1,85 @@
-import tensorflow as tf
 import numpy as np
-import joblib
 import json
+import os
+import time
 from config import Config
+from model_artifact import ModelArtifact
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _import_tensorflow():
+    """Import TensorFlow on first use; it dominates start-up time otherwise"""
+    import tensorflow as tf
+    return tf
+
+def load_interpreter(model_path=None):
+    """Create an interpreter for an exported TFLite model"""
+    tf = _import_tensorflow()
+    interpreter = tf.lite.Interpreter(model_path=model_path or Config.TFLITE_MODEL_PATH)
+    interpreter.allocate_tensors()
+    return interpreter
+
+def invoke_batch(interpreter, features):
+    """Classify a whole batch in one invoke; returns (clusters, min squared distances)
+    
+    The exported models have a dynamic batch dimension, so the input is
+    resized to the batch instead of invoking once per row.
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    
+    signatures = interpreter.get_signature_list()
+    if signatures:
+        signature_key = next(iter(signatures))
+        runner = interpreter.get_signature_runner(signature_key)
+        input_name = signatures[signature_key]['inputs'][0]
+        outputs = runner(**{input_name: features})
+        return outputs['cluster'].astype(int), outputs['distance']
+    
+    input_details = interpreter.get_input_details()[0]
+    interpreter.resize_tensor_input(input_details['index'], features.shape)
+    interpreter.allocate_tensors()
+    interpreter.set_tensor(input_details['index'], features)
+    interpreter.invoke()
+    
+    output_details = interpreter.get_output_details()
+    clusters = interpreter.get_tensor(output_details[0]['index'])
+    distances = interpreter.get_tensor(output_details[1]['index'])
+    return clusters.astype(int), distances
+
 class TFLiteConverter:
+    """Export the saved model to TFLite
+    
+    Everything is derived from the binary model artifact
+    (Config.ARTIFACT_PATH), so the TFLite graph, the Android metadata and
+    the server-side predictors share one source of parameters.
+    """
+    
     def __init__(self):
-        self.model = None
-        self.scaler = None
+        self.artifact = None
+        self.exported_variants = {}
     
-    def load_sklearn_model(self):
-        """Load the trained scikit-learn model"""
+    def load_artifact(self):
+        """Load the binary model artifact written by WorkerKMeansModel.save_model"""
         try:
-            self.model = joblib.load(Config.MODEL_PATH)
-            self.scaler = joblib.load(Config.SCALER_PATH)
-            logger.info("Scikit-learn model loaded successfully")
+            self.artifact = ModelArtifact.load()
+            logger.info(f"Model artifact loaded (checksum {self.artifact.checksum[:12]})")
             return True
         except Exception as e:
-            logger.error(f"Error loading sklearn model: {e}")
+            logger.error(f"Error loading model artifact: {e}")
             return False
     
     def create_tensorflow_model(self):
         """Create TensorFlow equivalent of the K-means model"""
-        if self.model is None or self.scaler is None:
-            raise ValueError("Sklearn model not loaded")
+        if self.artifact is None:
+            raise ValueError("Model artifact not loaded")
+        
+        tf = _import_tensorflow()
         
         # Get model parameters
-        cluster_centers = self.model.cluster_centers_
-        scaler_mean = self.scaler.mean_
-        scaler_scale = self.scaler.scale_
+        cluster_centers = np.array(self.artifact.centers)
+        scaler_mean = np.array(self.artifact.mean)
+        scaler_scale = np.array(self.artifact.scale)
         
         # Convert to float32 to avoid type mismatch
         cluster_centers = cluster_centers.astype(np.float32)
@@ -82,27 +130,66 @@ class TFLiteConverter:
         
         return tf_model
     
-    def convert_to_tflite(self):
-        """Convert the TensorFlow model to TFLite"""
+    def _configure_converter(self, converter, variant, calibration_data):
+        """Apply the optimization settings for one export variant"""
+        tf = _import_tensorflow()
+        
+        if variant == 'float32':
+            # No optimizations: Optimize.DEFAULT would quantize weights, and this is the reference variant
+            return
+        
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant == 'int8':
+            # Calibrate activation ranges on a sample of the real feature matrix
+            rng = np.random.default_rng(42)
+            sample_size = min(Config.TFLITE_CALIBRATION_SAMPLES, len(calibration_data))
+            sample = np.asarray(calibration_data, dtype=np.float32)[
+                rng.choice(len(calibration_data), size=sample_size, replace=False)
+            ]
+            converter.representative_dataset = lambda: ([row[None, :]] for row in sample)
+        else:
+            raise ValueError(f"Unknown TFLite variant: {variant}")
+    
+    def convert_to_tflite(self, calibration_data=None, variants=None):
+        """Convert the TensorFlow model to TFLite
+        
+        Exports the float32 model to Config.TFLITE_MODEL_PATH plus the
+        float16 and int8 variants in Config.TFLITE_VARIANTS. The int8 variant
+        is calibrated on calibration_data (the training feature matrix) and
+        skipped without it.
+        """
         try:
+            tf = _import_tensorflow()
+            
             # Create TensorFlow model
             tf_model = self.create_tensorflow_model()
+            self.exported_variants = {}
             
-            # Convert to TFLite
-            converter = tf.lite.TFLiteConverter.from_keras_model(tf_model)
-            
-            # Optimization settings
-            converter.optimizations = [tf.lite.Optimize.DEFAULT]
-            converter.target_spec.supported_types = [tf.float32]
-            
-            # Convert
-            tflite_model = converter.convert()
-            
-            # Save the model
-            with open(Config.TFLITE_MODEL_PATH, 'wb') as f:
-                f.write(tflite_model)
-            
-            logger.info(f"TFLite model saved to {Config.TFLITE_MODEL_PATH}")
+            for variant in variants or Config.TFLITE_VARIANTS:
+                if variant == 'int8' and calibration_data is None:
+                    logger.warning("Skipping int8 export: no calibration data")
+                    continue
+                
+                try:
+                    # Convert to TFLite
+                    converter = tf.lite.TFLiteConverter.from_keras_model(tf_model)
+                    self._configure_converter(converter, variant, calibration_data)
+                    tflite_model = converter.convert()
+                except Exception as e:
+                    if variant == 'float32':
+                        raise
+                    logger.warning(f"Could not export {variant} TFLite variant: {e}")
+                    continue
+                
+                # Save the model
+                model_path = Config.TFLITE_VARIANT_PATHS[variant]
+                with open(model_path, 'wb') as f:
+                    f.write(tflite_model)
+                self.exported_variants[variant] = model_path
+                
+                logger.info(f"TFLite {variant} model saved to {model_path} ({len(tflite_model)} bytes)")
             
             # Create model info for Android
             self._create_model_info()
@@ -122,60 +209,108 @@ class TFLiteConverter:
         tflite_info = {
             **metadata,
             'tflite_model_path': Config.TFLITE_MODEL_PATH,
-            'input_shape': [1, len(self.scaler.mean_)],
+            'input_shape': [1, len(self.artifact.mean)],
+            # The batch dimension is dynamic: resize the input to [n, features]
+            'input_shape_signature': [-1, len(self.artifact.mean)],
+            'dynamic_batch': True,
             'output_shape': [1],
             'input_names': ['input_features'],
             'output_names': ['cluster', 'distance'],
-            'feature_order': ['attendance_rate', 'avg_work_hours', 'punctuality_score', 'consistency_score'],
+            'feature_order': self.artifact.feature_names,
             'scaler_params': {
-                'mean': self.scaler.mean_.tolist(),
-                'scale': self.scaler.scale_.tolist()
+                'mean': self.artifact.mean.tolist(),
+                'scale': self.artifact.scale.tolist()
             },
-            'cluster_centers': self.model.cluster_centers_.tolist(),
+            'cluster_centers': self.artifact.centers.tolist(),
             'performance_mapping': {
-                '0': 'Low Performer',
-                '1': 'Medium Performer', 
-                '2': 'High Performer'
-            }
+                str(cluster_id): label for cluster_id, label in self.artifact.performance_mapping.items()
+            },
+            'artifact_checksum': self.artifact.checksum,
+            'variants': self.exported_variants
         }
         
         # Save updated metadata
-        tflite_metadata_path = 'models/tflite_model_info.json'
-        with open(tflite_metadata_path, 'w') as f:
+        with open(Config.TFLITE_INFO_PATH, 'w') as f:
             json.dump(tflite_info, f, indent=2)
         
-        logger.info(f"TFLite model info saved to {tflite_metadata_path}")
+        logger.info(f"TFLite model info saved to {Config.TFLITE_INFO_PATH}")
     
-    def test_tflite_model(self, test_data):
-        """Test the TFLite model with sample data"""
+    def test_tflite_model(self, test_data, model_path=None):
+        """Test the TFLite model with sample data, classifying the batch in one invoke"""
         try:
             # Load TFLite model
-            interpreter = tf.lite.Interpreter(model_path=Config.TFLITE_MODEL_PATH)
-            interpreter.allocate_tensors()
+            interpreter = load_interpreter(model_path)
             
             # Get input and output tensors
             input_details = interpreter.get_input_details()
             output_details = interpreter.get_output_details()
             
             logger.info("TFLite Model Details:")
-            logger.info(f"Input shape: {input_details[0]['shape']}")
+            logger.info(f"Input shape: {input_details[0]['shape']} (signature {input_details[0]['shape_signature']})")
             logger.info(f"Output shape: {output_details[0]['shape']}")
             
-            # Test with sample data
-            test_input = test_data.astype(np.float32)
-            interpreter.set_tensor(input_details[0]['index'], test_input)
-            
-            # Run inference
-            interpreter.invoke()
-            
-            # Get results
-            cluster_output = interpreter.get_tensor(output_details[0]['index'])
-            distance_output = interpreter.get_tensor(output_details[1]['index'])
+            # Run inference on the whole batch
+            cluster_output, distance_output = invoke_batch(interpreter, test_data)
             
-            logger.info(f"Test prediction - Cluster: {cluster_output}, Distance: {distance_output}")
+            logger.info(f"Test prediction for {len(cluster_output)} rows - Clusters: {cluster_output[:10]}, Distances: {distance_output[:10]}")
             
             return True
             
         except Exception as e:
             logger.error(f"Error testing TFLite model: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def evaluate_variants(self, feature_matrix, repeats=None):
+        """Size, latency and sklearn agreement for every exported variant
+        
+        The report is written to Config.TFLITE_REPORT_PATH and returned.
+        """
+        import joblib
+        
+        repeats = repeats or Config.TFLITE_BENCHMARK_REPEATS
+        feature_matrix = np.asarray(feature_matrix, dtype=np.float32)
+        
+        sklearn_model = joblib.load(Config.MODEL_PATH)
+        scaler = joblib.load(Config.SCALER_PATH)
+        X_scaled = scaler.transform(feature_matrix.astype(np.float64))
+        reference_clusters = sklearn_model.predict(X_scaled)
+        reference_distances = ((X_scaled[:, None, :] - sklearn_model.cluster_centers_[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        
+        report = {}
+        for variant, model_path in self.exported_variants.items():
+            interpreter = load_interpreter(model_path)
+            
+            batch_times = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                clusters, distances = invoke_batch(interpreter, feature_matrix)
+                batch_times.append(time.perf_counter() - started)
+            
+            row_times = []
+            for row in feature_matrix[:repeats]:
+                started = time.perf_counter()
+                invoke_batch(interpreter, row[None, :])
+                row_times.append(time.perf_counter() - started)
+            
+            report[variant] = {
+                'path': model_path,
+                'size_bytes': os.path.getsize(model_path),
+                'batch_rows': len(feature_matrix),
+                'batch_latency_ms': float(np.median(batch_times) * 1000),
+                'row_latency_p50_ms': float(np.percentile(row_times, 50) * 1000),
+                'row_latency_p99_ms': float(np.percentile(row_times, 99) * 1000),
+                'agreement_with_sklearn': float((clusters == reference_clusters).mean()),
+                'max_distance_error': float(np.abs(distances - reference_distances).max())
+            }
+            
+            logger.info(
+                f"TFLite {variant}: {report[variant]['size_bytes']} bytes, "
+                f"batch of {len(feature_matrix)} in {report[variant]['batch_latency_ms']:.2f}ms, "
+                f"agreement with sklearn {report[variant]['agreement_with_sklearn']:.4%}"
+            )
+        
+        with open(Config.TFLITE_REPORT_PATH, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"TFLite export report saved to {Config.TFLITE_REPORT_PATH}")
+        
+        return report
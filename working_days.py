@@ -0,0 +1,45 @@
+import numpy as np
+from functools import lru_cache
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1024)
+def count_working_days(start_date, end_date, weekmask='1111100', holidays=()):
+    """Count business days from start_date to end_date inclusive
+    
+    Dates are 'YYYY-MM-DD' strings, weekmask follows numpy's Monday-first
+    convention and holidays is a tuple of date strings. Results are
+    memoized by (start, end, calendar).
+    """
+    start = np.datetime64(start_date, 'D')
+    end = np.datetime64(end_date, 'D') + np.timedelta64(1, 'D')
+    
+    if end <= start:
+        return 0
+    
+    return int(np.busday_count(start, end, weekmask=weekmask, holidays=list(holidays)))
+
+def get_calendar(site=None):
+    """Resolve the (weekmask, holidays) calendar for a site
+    
+    Site holidays from Config.SITE_CALENDARS are added to Config.HOLIDAYS;
+    unknown or missing sites use the default calendar.
+    """
+    site_calendar = Config.SITE_CALENDARS.get(site, {}) if site is not None else {}
+    
+    weekmask = site_calendar.get('weekmask', Config.WEEKMASK)
+    holidays = tuple(sorted(set(Config.HOLIDAYS) | set(site_calendar.get('holidays', []))))
+    
+    return weekmask, holidays
+
+def working_days_in_range(start_date=None, end_date=None, site=None):
+    """Working days in a date range (defaults to the Config date range)"""
+    weekmask, holidays = get_calendar(site)
+    return count_working_days(
+        start_date or Config.START_DATE,
+        end_date or Config.END_DATE,
+        weekmask,
+        holidays
+    )